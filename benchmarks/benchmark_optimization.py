@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import warnings
+from statistics import mean
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from boxer import gameInfo  # noqa: E402
+from boxer.gameInfo import PotionIngredient, PotionStability, PotionType  # noqa: E402
+from boxer.optimization import (  # noqa: E402
+    PotionModel,
+    PotionOptimizationObjective,
+    formulations,
+    getPotionModel,
+    getProductionPlan,
+    needsPerfection,
+    solverEngines,
+)
+
+# Times building the MILP separately from solving it, over every objective, a
+# spread of cauldrons and synthetic inventories of 5 to 206 ingredients.
+# Results go to a JSON file; given an earlier one as a baseline, any phase that
+# got slower by more than the tolerance is reported as a regression. Timings
+# only compare on the same host, so record the baseline locally before making
+# a change (benchmarks/baseline.json is ignored by git), then check against it:
+#
+#   python benchmarks/benchmark_optimization.py --output benchmarks/baseline.json
+#   python benchmarks/benchmark_optimization.py --baseline benchmarks/baseline.json
+
+inventorySizes = [5, 25, 50, 100, len(PotionIngredient)]
+cauldronCount = 4
+starLevel = 6
+# Column generation rounds for plans, which otherwise dwarf everything else
+planRounds = 5
+
+
+def benchmarkCases(seed):
+    # Cauldrons evenly spread from the smallest to the largest, and one potion
+    # type and inventory per size, the same every run for a given seed
+    rng = random.Random(seed)
+    cauldrons = gameInfo.cauldronProperties.sort_values(
+        ["maxIngredients", "maxMagimins"]
+    ).index.tolist()
+    cauldrons = [
+        cauldrons[round(i * (len(cauldrons) - 1) / (cauldronCount - 1))]
+        for i in range(cauldronCount)
+    ]
+    cases = []
+    for size in inventorySizes:
+        potionType = rng.choice(list(PotionType))
+        inventory = {
+            name: rng.randint(1, 10)
+            for name in rng.sample(list(PotionIngredient), size)
+        }
+        for cauldron in cauldrons:
+            for objective in PotionOptimizationObjective:
+                cases.append(
+                    {
+                        "name": f"{objective.name}-{cauldron.name}-{size}",
+                        "cauldron": cauldron,
+                        "potionType": potionType,
+                        "objective": objective,
+                        "inventory": inventory,
+                    }
+                )
+    return cases
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def runCase(case, solver, formulation):
+    # Seconds spent in each phase of one getBestPotion-style solve
+    objective = case["objective"]
+    if objective == PotionOptimizationObjective.MOST_PROFITABLE_PLAN:
+        # Plans build and solve many models, so they are only timed as a whole
+        getPotionModel.cache_clear()
+        plan, seconds = timed(
+            getProductionPlan,
+            case["inventory"],
+            cauldrons=[case["cauldron"]],
+            potionTypes=[case["potionType"]],
+            rounds=planRounds,
+            solver=solver,
+            formulation=formulation,
+        )
+        return {"solve": seconds}, f"{len(plan)} batches"
+
+    model, buildSeconds = timed(
+        PotionModel,
+        case["cauldron"],
+        case["potionType"],
+        objective,
+        needsPerfection(objective, PotionStability.UNSTABLE),
+        formulation,
+    )
+    configureSeconds = timed(
+        model.configure,
+        case["inventory"],
+        starLevel=(
+            starLevel
+            if objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS
+            else None
+        ),
+    )[1]
+    presolveSeconds = timed(model.presolve)[1]
+    status, solveSeconds = timed(solverEngines[solver], model.prob)
+    extractSeconds = 0
+    if status == "Optimal":
+        extractSeconds = timed(model.extractSolution)[1]
+    return {
+        "build": buildSeconds,
+        "configure": configureSeconds,
+        "presolve": presolveSeconds,
+        "solve": solveSeconds,
+        "extract": extractSeconds,
+    }, status
+
+
+def runBenchmarks(cases, solver, formulation, repeat):
+    results = {}
+    for case in cases:
+        runs = []
+        try:
+            for _ in range(repeat):
+                phases, status = runCase(case, solver, formulation)
+                runs.append(phases)
+        except Exception as error:
+            # A broken case shouldn't take the rest of the run down with it
+            results[case["name"]] = {"status": repr(error), "phases": {}}
+            print(f"{case['name']}: {error!r}", flush=True)
+            continue
+        results[case["name"]] = {
+            "status": status,
+            "phases": {
+                phase: {
+                    "min": min(run[phase] for run in runs),
+                    "mean": mean(run[phase] for run in runs),
+                }
+                for phase in runs[0]
+            },
+        }
+        summary = ", ".join(
+            f"{phase} {timing['min'] * 1000:.1f}ms"
+            for phase, timing in results[case["name"]]["phases"].items()
+        )
+        print(f"{case['name']}: {status}; {summary}", flush=True)
+    return results
+
+
+def compareToBaseline(results, baseline, tolerance):
+    # Phases whose best time got slower than tolerance times the baseline's;
+    # anything under a millisecond is too noisy to count
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline["cases"]:
+            continue
+        for phase, timing in result["phases"].items():
+            before = baseline["cases"][name]["phases"].get(phase)
+            if before is None or timing["min"] < 0.001:
+                continue
+            if timing["min"] > tolerance * max(before["min"], 0.001):
+                regressions.append(
+                    f"{name} {phase}: {before['min'] * 1000:.1f}ms -> "
+                    f"{timing['min'] * 1000:.1f}ms"
+                )
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Time building and solving recipe models."
+    )
+    parser.add_argument("--solver", default="cbc", choices=sorted(solverEngines))
+    parser.add_argument("--formulation", default="bigM", choices=formulations)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--filter", default="", help="only run cases whose name contains this"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="slowdown factor reported as a regression",
+    )
+    arguments = parser.parse_args(arguments)
+    # Read before anything is run or written, so that a bad path fails fast
+    # and --output may overwrite the baseline it is compared with
+    baseline = None
+    if arguments.baseline:
+        with open(arguments.baseline) as infile:
+            baseline = json.load(infile)
+
+    warnings.filterwarnings("ignore")
+    cases = [
+        case
+        for case in benchmarkCases(arguments.seed)
+        if arguments.filter in case["name"]
+    ]
+    results = runBenchmarks(
+        cases, arguments.solver, arguments.formulation, arguments.repeat
+    )
+    # What the timings depend on besides the code
+    setup = {
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "solver": arguments.solver,
+        "formulation": arguments.formulation,
+    }
+
+    if arguments.output:
+        with open(arguments.output, "w") as outfile:
+            json.dump(
+                {
+                    **setup,
+                    "repeat": arguments.repeat,
+                    "seed": arguments.seed,
+                    "cases": results,
+                },
+                outfile,
+                indent=2,
+            )
+
+    if baseline is not None:
+        different = [k for k in setup if baseline.get(k) != setup[k]]
+        if different:
+            print(
+                f"Warning: the baseline has a different {', '.join(different)}, "
+                "so its timings don't compare with these"
+            )
+        regressions = compareToBaseline(results, baseline, arguments.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
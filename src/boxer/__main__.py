@@ -1,4 +1,12 @@
-from boxer.app import main
+import sys
 
 if __name__ == "__main__":
-    main().main_loop()
+    if len(sys.argv) > 1:
+        # Subcommands run headless, without ever importing the GUI toolkit
+        from boxer.cli import main
+
+        sys.exit(main())
+    else:
+        from boxer.app import main
+
+        main().main_loop()
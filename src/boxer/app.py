@@ -1,7 +1,12 @@
+import asyncio
+import time
+from functools import partial
+from threading import Event
+
 import toga
 from toga.style.pack import ROW, COLUMN, Pack
 from toga.constants import BOLD
-from boxer.backend import read_reagents
+from boxer.backend import SaveFileWatcher
 from boxer.gameInfo import (
     ingredientData,
     PotionTier,
@@ -11,28 +16,34 @@ from boxer.gameInfo import (
     filterStrings,
     enumToEnglish,
 )
-from boxer.optimization import getOptimumPotionRecipe
+from boxer.optimization import BoxerException, getOptimumPotionRecipe
 
 
 class Boxer(toga.App):
-    workingIngredientData = {}
     cauldron = None
     potionType = None
     potionTier = None
     starLevel = None
     starSliderLabel = None
     currentPotionRecipe = None
+    saveFileWatcher = None
+    saveFileWatchTask = None
 
     calculateButton = None
+    stopButton = None
+    stopEvent = None
 
     # Establish style base
     fontPath = "resources/font/static"
     styleBase = {"font_family": "Bitter", "font_size": 10, "font_weight": BOLD}
 
     def brewPotion(self, widget):
-        for i, j in self.currentPotionRecipe["ingredients"].items():
-            self.workingIngredientData[i] -= j
-        self.refreshReagents()
+        self.setReagentQuantities(
+            {
+                i: self.workingIngredientData.get(i, 0) - j
+                for i, j in self.currentPotionRecipe["ingredients"].items()
+            }
+        )
         widget.window.close()
 
     # Refresh reagents table
@@ -45,8 +56,39 @@ class Boxer(toga.App):
             ][::-1]
             for r in tableRows:
                 self.ingredientsTable.data.insert(0, r)
+            self.reagentRows = {
+                k: row
+                for k, row in zip(
+                    self.workingIngredientData, self.ingredientsTable.data
+                )
+            }
             self.adjustColumns()
 
+    # Update only the table rows whose quantities changed, dropping those of
+    # ingredients that ran out as a full refresh would
+    def setReagentQuantities(self, quantities):
+        for k, v in quantities.items():
+            if v > 0:
+                self.workingIngredientData[k] = v
+                if k in self.reagentRows:
+                    self.reagentRows[k].quantity = v
+                else:
+                    self.reagentRows[k] = self.ingredientsTable.data.append(
+                        (ingredientData[k]["name"], v)
+                    )
+            else:
+                self.workingIngredientData.pop(k, None)
+                if k in self.reagentRows:
+                    self.ingredientsTable.data.remove(self.reagentRows.pop(k))
+        self.adjustColumns()
+
+    # Follow the save file while the game is running. The save's own counts
+    # win over whatever was brewed here in the meantime, so that brewing the
+    # same recipe in the game doesn't take its ingredients away twice.
+    async def watchSaveFile(self, watcher):
+        async for delta in watcher.watch_async():
+            self.setReagentQuantities({k: watcher.inventory.get(k, 0) for k in delta})
+
     def starLabelCallback(self, widget):
         self.starSliderLabel.text = f"Stars: {'⭐'*int(widget.value)}"
 
@@ -58,34 +100,90 @@ class Boxer(toga.App):
         try:
             fname = await self.dialog(toga.OpenFileDialog("Open file with Toga"))
             if fname is not None:
-                self.workingIngredientData = read_reagents(fname)
+                watcher = SaveFileWatcher(fname)
+                try:
+                    watcher.poll()
+                except ValueError as error:
+                    # Not a save; keep following the last one, if any
+                    await self.dialog(toga.ErrorDialog("Not a save file", str(error)))
+                    return
+                if self.saveFileWatchTask is not None:
+                    self.saveFileWatchTask.cancel()
+                self.saveFileWatcher = watcher
+                self.workingIngredientData = dict(self.saveFileWatcher.inventory)
                 self.refreshReagents()
+                self.saveFileWatchTask = asyncio.create_task(
+                    self.watchSaveFile(self.saveFileWatcher)
+                )
         except ValueError:
             pass
 
+    async def showElapsedTime(self, started):
+        while True:
+            elapsed = time.perf_counter() - started
+            doing = "Stopping" if self.stopEvent.is_set() else "Calculating"
+            self.calculateButton.text = f"{doing}... {elapsed:.1f}s"
+            await asyncio.sleep(0.1)
+
+    def stopCalculation(self, widget):
+        # The solver gives up at its next chance; Calculate stays off until it
+        # has, so the next request doesn't queue up behind it
+        if self.stopEvent is not None:
+            self.stopEvent.set()
+            self.stopButton.enabled = False
+
     async def calculatePotionRecipe(self, widget):
-        self.calculateButton.text = "Calculating..."
         self.calculateButton.enabled = False
+        self.stopButton.enabled = True
+        self.stopEvent = Event()
+        elapsedTimeTask = asyncio.create_task(self.showElapsedTime(time.perf_counter()))
         # print(self.workingIngredientData)
-        self.currentPotionRecipe = getOptimumPotionRecipe(
-            ingredientInventory=self.workingIngredientData,
-            cauldron=self.cauldronSelect.value,
-            potionType=self.potionTypeSelect.value,
-            tier=self.tierSelect.value,
-            starLevel=self.starSlider.value,
-            minStability=PotionStability(self.qualitySlider.value),
-            sensoryData={
-                "taste": self.tasteSelectList.value,
-                "sensation": self.sensationSelectList.value,
-                "aroma": self.aromaSelectList.value,
-                "visual": self.visualSelectList.value,
-                "sound": self.soundSelectList.value,
-            },
+        # Solve on a worker thread so the UI stays responsive
+        pendingRecipe = asyncio.get_running_loop().run_in_executor(
+            None,
+            partial(
+                getOptimumPotionRecipe,
+                ingredientInventory=dict(self.workingIngredientData),
+                cauldron=self.cauldronSelect.value,
+                potionType=self.potionTypeSelect.value,
+                tier=self.tierSelect.value,
+                starLevel=self.starSlider.value,
+                minStability=PotionStability(self.qualitySlider.value),
+                # The last recipe is usually close to the next one
+                initialRecipe=(
+                    self.currentPotionRecipe["ingredients"]
+                    if self.currentPotionRecipe
+                    else None
+                ),
+                sensoryData={
+                    "taste": self.tasteSelectList.value,
+                    "sensation": self.sensationSelectList.value,
+                    "aroma": self.aromaSelectList.value,
+                    "visual": self.visualSelectList.value,
+                    "sound": self.soundSelectList.value,
+                },
+                stopEvent=self.stopEvent,
+            ),
         )
+        failure = "Please recheck your inputs and try again."
+        try:
+            recipe = await pendingRecipe
+        except BoxerException as error:
+            # Requests that can't work out say why
+            recipe = None
+            failure = str(error)
+        finally:
+            elapsedTimeTask.cancel()
+            self.stopButton.enabled = False
+            self.calculateButton.enabled = True
+            self.calculateButton.text = "Calculate"
+        if self.stopEvent.is_set():
+            return
+        self.currentPotionRecipe = recipe
         prettyRecipe = (
             self.prettyPrintPotionRecipe(self.currentPotionRecipe)
             if self.currentPotionRecipe
-            else "Sorry, no recipe found. Please recheck your inputs and try again."
+            else f"Sorry, no recipe found. {failure}"
         )
 
         # Set up recipe output window
@@ -113,9 +211,6 @@ class Boxer(toga.App):
 
         recipeOutputWindow.show()
 
-        self.calculateButton.enabled = True
-        self.calculateButton.text = "Calculate"
-
     def prettyPrintPotionRecipe(self, potionRecipe):
         ingredientsList = [
             f"- {enumToEnglish[k]}" + (f": x{v}" * (v > 1))
@@ -144,6 +239,9 @@ class Boxer(toga.App):
 
     # Build GUI
     def startup(self):
+        self.workingIngredientData = {}
+        self.reagentRows = {}
+
         # Register font
         toga.Font.register("Bitter", f"{self.fontPath}/Bitter-Regular.ttf")
         toga.Font.register("Bitter", f"{self.fontPath}/Bitter-Bold.ttf", weight=BOLD)
@@ -334,6 +432,19 @@ class Boxer(toga.App):
             style=Pack(**self.styleBase, direction=ROW, padding=5),
         )
 
+        # Stop button
+        self.stopButton = toga.Button(
+            "Stop",
+            on_press=self.stopCalculation,
+            enabled=False,
+            style=Pack(**self.styleBase, direction=ROW, padding=5),
+        )
+
+        calculationButtonBox = toga.Box(
+            style=Pack(direction=ROW, padding=5),
+        )
+        calculationButtonBox.add(self.calculateButton, self.stopButton)
+
         calculationTab.add(
             self.potionTypeSelect,
             self.tierSelect,
@@ -341,7 +452,7 @@ class Boxer(toga.App):
             qualitySelectBox,
             self.cauldronSelect,
             sensoryBox,
-            self.calculateButton,
+            calculationButtonBox,
         )
 
         container = toga.OptionContainer(
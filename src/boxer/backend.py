@@ -1,63 +1,237 @@
+import asyncio
+import mmap
+import os
+import time
+from hashlib import blake2b
+from struct import Struct
+
 from boxer.gameInfo import ingredientsNormalizedToProper
 from boxer.stringManip import normalizeName
 
+# type, amount, then three bytes of padding
+magiminEntry = Struct("BB3x")
 
-def read_reagents(filename):
-    output = {}
-    # print("Collecting data...")
-    with open(filename, "rb") as infile:
-        # Skip preamble
-        infile.read(0x1F)
-        reagentsToCount = int.from_bytes(infile.read(0x1))
-        infile.read(0x4)
-        reagentCounter = 0
-        # Read in inventory data
-        for r in range(reagentsToCount):
-            wideCheck = infile.read(0x3)
-            special = wideCheck == b"\xff\xff\xff"
-            name = b""
-            buff = b""
-            while (special and buff != b"\x00\x00") or (
-                not (special) and buff != b"\x00"
-            ):
-                name += buff
-                buff = infile.read(0x2) if special else infile.read(0x1)
-            if special:
-                name = name.decode("utf-16")
-            else:
-                name = name.decode("utf-8")
-            # read unknown0
-            infile.read(0xE0)
-
-            unknown0 = infile.read(0x1)
-            infile.read(0x3)
-
-            # read unknown1
-            unknown1 = []
-            for i in range(int.from_bytes(unknown0) + 2):
-                buff = infile.read(0x1)
-                unknown1.append(int.from_bytes(buff))
-
-            infile.read(0x3)
-            magiminsEntries = unknown1[-1]
-
-            # read magimins
-            magimins = {}
-            for i in range(magiminsEntries):
-                magiminType = "ABCDE"[int.from_bytes(infile.read(0x1))]
-                magiminAmount = int.from_bytes(infile.read(0x1))
-                magimins[magiminType] = magiminAmount
-                infile.read(0x3)
-            infile.read(0x9)
-            quantity = int.from_bytes(infile.read(0x1))
-            infile.read(0x3)
-            unknown3 = int.from_bytes(infile.read(0x1))
-            reagentCounter += 1
-
-            # display ingredient, quantity
-            # print(name, unknown2, unknown0, unknown1, unknown3, sep=",")
-            output[name] = quantity
-    result = {
+# Offset of the reagent count, and of the first record after it
+reagentCountOffset = 0x1F
+firstRecordOffset = reagentCountOffset + 0x1 + 0x4
+
+
+def find_terminator(data, start, wide):
+    # Names end in a null byte, or a null code unit for UTF-16 names, which
+    # has to start on a code unit boundary
+    if not wide:
+        end = data.find(b"\x00", start)
+    else:
+        end = data.find(b"\x00\x00", start)
+        while end != -1 and (end - start) % 2:
+            end = data.find(b"\x00\x00", end + 1)
+    if end == -1:
+        raise ValueError(f"Unterminated reagent name at offset {start:#x}")
+    return end
+
+
+class ReagentRecord:
+    # Lightweight view of one reagent record. Only the offsets needed to find
+    # the next record are worked out up front; every field is decoded from
+    # the underlying buffer when it is asked for.
+    __slots__ = (
+        "buffer",
+        "offset",
+        "wide",
+        "nameOffset",
+        "nameEnd",
+        "unknown0Offset",
+        "magiminsOffset",
+        "magiminsEntries",
+        "quantityOffset",
+        "end",
+    )
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+        self.wide = buffer[offset : offset + 0x3] == b"\xff\xff\xff"
+        self.nameOffset = offset + 0x3
+        self.nameEnd = find_terminator(buffer, self.nameOffset, self.wide)
+        self.unknown0Offset = self.nameEnd + (0x2 if self.wide else 0x1) + 0xE0
+        unknown0 = buffer[self.unknown0Offset]
+        unknown1End = self.unknown0Offset + 0x1 + 0x3 + unknown0 + 2
+        self.magiminsEntries = buffer[unknown1End - 1]
+        self.magiminsOffset = unknown1End + 0x3
+        self.quantityOffset = (
+            self.magiminsOffset + self.magiminsEntries * magiminEntry.size + 0x9
+        )
+        self.end = self.quantityOffset + 0x1 + 0x3 + 0x1
+
+    @property
+    def name(self):
+        raw = self.buffer[self.nameOffset : self.nameEnd]
+        return raw.decode("utf-16") if self.wide else raw.decode("utf-8")
+
+    @property
+    def ingredient(self):
+        return ingredientsNormalizedToProper[normalizeName(self.name)]
+
+    @property
+    def quantity(self):
+        return self.buffer[self.quantityOffset]
+
+    @property
+    def unknown0(self):
+        return self.buffer[self.unknown0Offset]
+
+    @property
+    def unknown1(self):
+        start = self.unknown0Offset + 0x1 + 0x3
+        return list(self.buffer[start : start + self.unknown0 + 2])
+
+    @property
+    def unknown3(self):
+        return self.buffer[self.quantityOffset + 0x1 + 0x3]
+
+    @property
+    def magimins(self):
+        end = self.magiminsOffset + self.magiminsEntries * magiminEntry.size
+        return {
+            "ABCDE"[magiminType]: magiminAmount
+            for magiminType, magiminAmount in magiminEntry.iter_unpack(
+                self.buffer[self.magiminsOffset : end]
+            )
+        }
+
+    def __repr__(self):
+        return f"ReagentRecord({self.name!r}, quantity={self.quantity})"
+
+
+def iter_reagent_records(buffer):
+    if len(buffer) <= reagentCountOffset:
+        return
+    offset = firstRecordOffset
+    for r in range(buffer[reagentCountOffset]):
+        record = ReagentRecord(buffer, offset)
+        yield record
+        offset = record.end
+
+
+def records_to_inventory(records):
+    # Later records win when a reagent name appears twice
+    output = {record.name: record.quantity for record in records}
+    return {
         ingredientsNormalizedToProper[normalizeName(k)]: v for k, v in output.items()
     }
-    return result
+
+
+class SaveFile:
+    # Memory-mapped save file whose reagent records are located on first use
+    # and decoded field by field on demand. Records are only readable while
+    # the SaveFile is open.
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b""
+        self._records = None
+
+    @property
+    def records(self):
+        if self._records is None:
+            self._records = list(iter_reagent_records(self.buffer))
+        return self._records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def inventory(self):
+        return records_to_inventory(self.records)
+
+    def close(self):
+        self._records = None
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_reagents(data):
+    return records_to_inventory(iter_reagent_records(bytes(data)))
+
+
+def read_reagents(filename):
+    with SaveFile(filename) as save:
+        return save.inventory()
+
+
+def inventory_delta(old, new):
+    return {
+        k: new.get(k, 0) - old.get(k, 0)
+        for k in old.keys() | new.keys()
+        if new.get(k, 0) != old.get(k, 0)
+    }
+
+
+class SaveFileWatcher:
+    # Polls a save file's mtime and size, re-parses it only when its content
+    # hash actually changed, and reports what changed as an inventory delta.
+    # Polling keeps this dependency-free and portable; saves are rewritten
+    # rarely enough that a one second interval is plenty. A file that can't
+    # be parsed the first time round isn't a save, and raises ValueError.
+    def __init__(self, filename, interval=1.0):
+        self.filename = filename
+        self.interval = interval
+        self.inventory = {}
+        self._stat = None
+        self._digest = None
+
+    def poll(self):
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return {}
+        stat = (stat.st_mtime_ns, stat.st_size)
+        if stat == self._stat:
+            return {}
+        with open(self.filename, "rb") as infile:
+            data = infile.read()
+        digest = blake2b(data).digest()
+        if digest == self._digest:
+            self._stat = stat
+            return {}
+        try:
+            inventory = parse_reagents(data)
+        except (ValueError, IndexError, KeyError) as error:
+            if self._digest is None:
+                raise ValueError(
+                    f"Couldn't read the reagents in {self.filename}: {error!r}"
+                ) from error
+            # Most likely caught the game halfway through writing the save;
+            # leave the stat unrecorded so the next poll tries again
+            return {}
+        self._stat = stat
+        self._digest = digest
+        delta = inventory_delta(self.inventory, inventory)
+        self.inventory = inventory
+        return delta
+
+    def watch(self):
+        while True:
+            delta = self.poll()
+            if delta:
+                yield delta
+            time.sleep(self.interval)
+
+    async def watch_async(self):
+        while True:
+            delta = self.poll()
+            if delta:
+                yield delta
+            await asyncio.sleep(self.interval)
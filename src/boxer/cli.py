@@ -0,0 +1,333 @@
+import argparse
+import json
+import logging
+import sys
+from enum import Enum
+
+from boxer import gameInfo
+from boxer.backend import read_reagents
+from boxer.optimization import (
+    BoxerException,
+    PotionOptimizationObjective,
+    formulations,
+    getOptimumPotionRecipe,
+    modes,
+    testOrComplain,
+)
+from boxer.solveStats import SolveStats
+
+logger = logging.getLogger(__name__)
+
+# Short names for the objectives on the command line and in queries
+objectiveNames = {
+    "best": PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE,
+    "cheapest": PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+    "batch": PotionOptimizationObjective.MOST_PROFITABLE_BATCH,
+    "plan": PotionOptimizationObjective.MOST_PROFITABLE_PLAN,
+}
+
+
+def toJson(value):
+    # Solutions are keyed and valued by enums and numpy scalars; JSON gets the
+    # English names and plain numbers instead
+    if isinstance(value, Enum):
+        return gameInfo.enumToEnglish.get(value, value.name)
+    if isinstance(value, dict):
+        return {toJson(k): toJson(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [toJson(v) for v in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def parseInventory(inventory):
+    # {"Troll Sweat": 3, ...} to the {PotionIngredient: 3, ...} the solver takes
+    return {gameInfo.englishToEnum[k]: int(v) for k, v in inventory.items()}
+
+
+def parseObjective(objective):
+    if objective in objectiveNames:
+        return objectiveNames[objective]
+    testOrComplain(
+        objective in PotionOptimizationObjective.__members__,
+        f"Unknown objective {objective!r}!",
+    )
+    return PotionOptimizationObjective[objective]
+
+
+def isWholeNumber(value):
+    # JSON's true and false come through as bools, which Python counts as ints
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def solveQuery(query, inventory=None, onPreliminary=None):
+    # Answers one query, a dict with the English names the GUI uses:
+    # {"cauldron": "Wooden Cauldron", "type": "Health Potion", "tier": "Minor",
+    #  "stars": 3, "objective": "cheapest", "minStability": "Stable",
+    #  "sensory": {"taste": "Good"}, "topK": 3, "solver": "cbc",
+    #  "mode": "exact"}
+    # The ingredients come from the query's "inventory" or "save", if it has
+    # either, and from inventory otherwise. "initialRecipe", in the same form
+    # as "inventory", gives the solver a recipe to start from. With "mode":
+    # "anytime", onPreliminary gets the heuristic's recipe, in the same form
+    # as the result, before the exact one is worked out.
+    testOrComplain(
+        query.get("sensory") is None or isinstance(query["sensory"], dict),
+        'The sensory qualities have to be an object, like {"taste": "Good"}!',
+    )
+    for key in ["stars", "topK"]:
+        testOrComplain(
+            query.get(key) is None or isWholeNumber(query[key]),
+            f"{key} has to be a whole number, not {query.get(key)!r}!",
+        )
+    if "inventory" in query:
+        inventory = parseInventory(query["inventory"])
+    elif "save" in query:
+        inventory = read_reagents(query["save"])
+    testOrComplain(
+        inventory is not None, "You have to specify ingredients with which to brew!"
+    )
+    objective = parseObjective(query.get("objective", "cheapest"))
+    tier = query.get("tier")
+    starLevel = query.get("stars")
+    if tier is not None and starLevel is None:
+        starLevel = 0
+    stats = SolveStats() if query.get("stats") else None
+    initialRecipe = query.get("initialRecipe")
+    if initialRecipe is not None:
+        initialRecipe = parseInventory(initialRecipe)
+    onHeuristicRecipe = None
+    if onPreliminary is not None:
+
+        def onHeuristicRecipe(recipe):
+            onPreliminary(toJson(recipe))
+
+    result = getOptimumPotionRecipe(
+        ingredientInventory=inventory,
+        cauldron=query.get("cauldron"),
+        potionType=query.get("type"),
+        objective=objective,
+        starLevel=starLevel,
+        tier=tier,
+        minStability=gameInfo.englishToEnum[query.get("minStability", "Unstable")],
+        sensoryData=query.get("sensory"),
+        useCache=query.get("useCache", True),
+        solver=query.get("solver"),
+        formulation=query.get("formulation"),
+        topK=query.get("topK"),
+        warmStart=query.get("warmStart", True),
+        initialRecipe=initialRecipe,
+        mode=query.get("mode", "exact"),
+        onHeuristicRecipe=onHeuristicRecipe,
+        stats=stats,
+    )
+    answer = {"result": toJson(result)}
+    if stats is not None:
+        answer["stats"] = stats.asDict()
+    return answer
+
+
+def answerQuery(query, inventory=None, onPreliminary=None):
+    # solveQuery, with any problem with the query reported rather than raised
+    try:
+        answer = solveQuery(query, inventory, onPreliminary)
+    except BoxerException as error:
+        answer = {"error": str(error)}
+    except KeyError as error:
+        answer = {"error": f"Unknown name {error}!"}
+    except (OSError, TypeError, ValueError) as error:
+        answer = {"error": str(error)}
+    if "id" in query:
+        answer = {"id": query["id"], **answer}
+    return answer
+
+
+def sensoryPair(value):
+    sense, separator, quality = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(
+            f"expected SENSE=QUALITY, like taste=Good, not {value!r}"
+        )
+    return sense, quality
+
+
+def commandSolve(arguments):
+    inventory = None
+    if arguments.save is not None:
+        inventory = read_reagents(arguments.save)
+    if arguments.inventory is not None:
+        with open(arguments.inventory) as infile:
+            inventory = parseInventory(json.load(infile))
+
+    # Flags fill in whatever a query leaves out
+    defaults = {
+        "cauldron": arguments.cauldron,
+        "type": arguments.type,
+        "tier": arguments.tier,
+        "stars": arguments.stars,
+        "objective": arguments.objective,
+        "minStability": arguments.min_stability,
+        "sensory": dict(arguments.sensory) or None,
+        "topK": arguments.top,
+        "solver": arguments.solver,
+        "formulation": arguments.formulation,
+        "mode": arguments.mode,
+        "useCache": not arguments.no_cache,
+        "stats": arguments.stats,
+    }
+    defaults = {k: v for k, v in defaults.items() if v is not None}
+
+    def printer(query):
+        # Anytime answers come in two lines: the heuristic's recipe first, as
+        # "preliminary", then the exact one as usual
+        def onPreliminary(result):
+            answer = {"preliminary": result}
+            if "id" in query:
+                answer = {"id": query["id"], **answer}
+            print(json.dumps(answer), flush=True)
+
+        return onPreliminary
+
+    if not arguments.jsonl:
+        answer = answerQuery(defaults, inventory, printer(defaults))
+        print(json.dumps(answer))
+        return 1 if "error" in answer else 0
+
+    # One query per line in, one answer per line out, as soon as it's ready
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            query = json.loads(line)
+        except json.JSONDecodeError as error:
+            answer = {"error": f"Invalid JSON: {error}"}
+        else:
+            if isinstance(query, dict):
+                query = {**defaults, **query}
+                # One query the solver didn't see coming shouldn't take the
+                # rest of the stream down with it
+                try:
+                    answer = answerQuery(query, inventory, printer(query))
+                except Exception as error:
+                    logger.exception("Failed to answer %s", line.strip())
+                    answer = {"error": f"Internal error: {error!r}"}
+                    if "id" in query:
+                        answer = {"id": query["id"], **answer}
+            else:
+                answer = {"error": "Each line has to be a JSON object!"}
+        print(json.dumps(answer), flush=True)
+    return 0
+
+
+def commandReagents(arguments):
+    print(json.dumps(toJson(read_reagents(arguments.save))))
+    return 0
+
+
+def commandServe(arguments):
+    # Imported here, as the server module builds on this one
+    from boxer.server import serve
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    serve(
+        host=arguments.host,
+        port=arguments.port,
+        save=arguments.save,
+        saveDirectory=arguments.save_dir,
+        cauldrons=[gameInfo.englishToEnum[c] for c in arguments.warm],
+    )
+    return 0
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(
+        prog="boxer", description="Potionomics recipe calculator, without the GUI."
+    )
+    subparsers = parser.add_subparsers(dest="commandName", required=True)
+
+    solve = subparsers.add_parser(
+        "solve",
+        help="find recipes",
+        description="Find a recipe and print it as JSON. With --jsonl, answer "
+        "one JSON query per line of standard input instead; the options then "
+        "act as defaults for every query.",
+    )
+    solve.add_argument("--save", help="read the ingredients from this save file")
+    solve.add_argument(
+        "--inventory", help='read the ingredients from a JSON {"name": count} file'
+    )
+    solve.add_argument("--cauldron", help='e.g. "Wooden Cauldron"')
+    solve.add_argument("--type", help='potion type, e.g. "Health Potion"')
+    solve.add_argument("--tier", help='e.g. "Minor"')
+    solve.add_argument("--stars", type=int, help="star level within the tier")
+    solve.add_argument("--objective", choices=list(objectiveNames))
+    solve.add_argument("--min-stability", help='e.g. "Very Stable"')
+    solve.add_argument(
+        "--sensory",
+        action="append",
+        default=[],
+        type=sensoryPair,
+        metavar="SENSE=QUALITY",
+        help='e.g. taste=Good or "sound=No Bad"; may be repeated',
+    )
+    solve.add_argument("--top", type=int, help="return this many best recipes")
+    solve.add_argument("--solver", help="cbc, highs, cpsat or search")
+    solve.add_argument("--formulation", choices=formulations)
+    solve.add_argument(
+        "--mode",
+        choices=modes,
+        help="fast: heuristic only; anytime: heuristic first, then exact",
+    )
+    solve.add_argument("--no-cache", action="store_true")
+    solve.add_argument(
+        "--stats", action="store_true", help="include timings with every answer"
+    )
+    solve.add_argument(
+        "--jsonl", action="store_true", help="read queries from standard input"
+    )
+    solve.set_defaults(handler=commandSolve)
+
+    reagents = subparsers.add_parser(
+        "reagents", help="print the ingredients in a save file"
+    )
+    reagents.add_argument("--save", required=True)
+    reagents.set_defaults(handler=commandReagents)
+
+    serve = subparsers.add_parser(
+        "serve",
+        help="answer queries over HTTP",
+        description="Serve recipes over HTTP, keeping the game data, models "
+        "and solutions warm between requests. POST a query like those of "
+        "solve --jsonl to /recipe, or a list of them to /recipes; GET "
+        "/reagents for the save file's ingredients.",
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument(
+        "--save", help="ingredients for queries that don't bring their own"
+    )
+    serve.add_argument(
+        "--save-dir",
+        help="let queries name save files in this directory too; otherwise "
+        "only --save may be read",
+    )
+    serve.add_argument(
+        "--warm",
+        action="append",
+        default=[],
+        metavar="CAULDRON",
+        help="build this cauldron's models before serving; may be repeated",
+    )
+    serve.set_defaults(handler=commandServe)
+
+    return parser
+
+
+def main(argv=None):
+    arguments = buildParser().parse_args(argv)
+    return arguments.handler(arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
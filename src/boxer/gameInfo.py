@@ -1,5 +1,5 @@
 from enum import Enum, IntEnum
-import pandas as pd
+from threading import RLock
 from boxer.stringManip import normalizeName, titleEnumName
 
 
@@ -20,22 +20,25 @@ class PotionStability(Enum):
 
 
 # fmt: off
-starRequirements = pd.DataFrame.from_dict(
-    {
-        i: {"tier": j, "magimins": k}
-        for i, j, k in zip(
-            range(36),
-            [list(PotionTier)[x // 6] for x in range(36)],
-            [   0,  10,  20,   30,   40,   50,
-               60,  75,  90,  105,  115,  130,
-              150, 170, 195,  215,  235,  260,
-              290, 315, 345,  370,  400,  430,
-              470, 505, 545,  580,  620,  660,
-              720, 800, 875,  960, 1040, 1125,     9999,
-            ],
-        )
-    }
-)
+def _buildStarRequirements():
+    import pandas as pd
+
+    return pd.DataFrame.from_dict(
+        {
+            i: {"tier": j, "magimins": k}
+            for i, j, k in zip(
+                range(36),
+                [list(PotionTier)[x // 6] for x in range(36)],
+                [   0,  10,  20,   30,   40,   50,
+                   60,  75,  90,  105,  115,  130,
+                  150, 170, 195,  215,  235,  260,
+                  290, 315, 345,  370,  400,  430,
+                  470, 505, 545,  580,  620,  660,
+                  720, 800, 875,  960, 1040, 1125,     9999,
+                ],
+            )
+        }
+    )
 # fmt: on
 
 
@@ -70,333 +73,342 @@ class PotionType(Enum):
 
 
 # fmt: off
-potionRatios = (
-    pd.DataFrame.from_dict(
-        {
-            PotionType.HEALTH_POTION:      {"A": 1, "B": 1,                       },
-            PotionType.MANA_POTION:        {        "B": 1, "C": 1,               },
-            PotionType.STAMINA_POTION:     {"A": 1,                         "E": 1},
-            PotionType.SPEED_POTION:       {                "C": 1, "D": 1,       },
-            PotionType.TOLERANCE_POTION:   {                        "D": 1, "E": 1},
-            PotionType.FIRE_TONIC:         {"A": 1,         "C": 1                },
-            PotionType.ICE_TONIC:          {"A": 1,                 "D": 1,       },
-            PotionType.THUNDER_TONIC:      {        "B": 1,         "D": 1,       },
-            PotionType.SHADOW_TONIC:       {        "B": 1,                 "E": 1},
-            PotionType.RADIATION_TONIC:    {                "C": 1,         "E": 1},
-            PotionType.SIGHT_ENHANCER:     {"A": 3, "B": 4, "C": 3,               },
-            PotionType.ALERTNESS_ENHANCER: {        "B": 3, "C": 4, "D": 3,       },
-            PotionType.INSIGHT_ENHANCER:   {"A": 4, "B": 3,                 "E": 3},
-            PotionType.DOWSING_ENHANCER:   {"A": 3,                 "D": 3, "E": 4},
-            PotionType.SEEKING_ENHANCER:   {                "C": 3, "D": 4, "E": 3},
-            PotionType.POISON_CURE:        {"A": 2,         "C": 1, "D": 1,       },
-            PotionType.DROWSINESS_CURE:    {"A": 1, "B": 1,         "D": 2,       },
-            PotionType.PETRIFICATION_CURE: {"A": 1,         "C": 2,         "E": 1},
-            PotionType.SILENCE_CURE:       {        "B": 2, "C": 1,         "E": 1},
-            PotionType.CURSE_CURE:         {        "B": 1, "C": 1,         "E": 2},
-        },
-        orient="index",
+def _buildPotionRatios():
+    import pandas as pd
+
+    return (
+        pd.DataFrame.from_dict(
+            {
+                PotionType.HEALTH_POTION:      {"A": 1, "B": 1,                       },
+                PotionType.MANA_POTION:        {        "B": 1, "C": 1,               },
+                PotionType.STAMINA_POTION:     {"A": 1,                         "E": 1},
+                PotionType.SPEED_POTION:       {                "C": 1, "D": 1,       },
+                PotionType.TOLERANCE_POTION:   {                        "D": 1, "E": 1},
+                PotionType.FIRE_TONIC:         {"A": 1,         "C": 1                },
+                PotionType.ICE_TONIC:          {"A": 1,                 "D": 1,       },
+                PotionType.THUNDER_TONIC:      {        "B": 1,         "D": 1,       },
+                PotionType.SHADOW_TONIC:       {        "B": 1,                 "E": 1},
+                PotionType.RADIATION_TONIC:    {                "C": 1,         "E": 1},
+                PotionType.SIGHT_ENHANCER:     {"A": 3, "B": 4, "C": 3,               },
+                PotionType.ALERTNESS_ENHANCER: {        "B": 3, "C": 4, "D": 3,       },
+                PotionType.INSIGHT_ENHANCER:   {"A": 4, "B": 3,                 "E": 3},
+                PotionType.DOWSING_ENHANCER:   {"A": 3,                 "D": 3, "E": 4},
+                PotionType.SEEKING_ENHANCER:   {                "C": 3, "D": 4, "E": 3},
+                PotionType.POISON_CURE:        {"A": 2,         "C": 1, "D": 1,       },
+                PotionType.DROWSINESS_CURE:    {"A": 1, "B": 1,         "D": 2,       },
+                PotionType.PETRIFICATION_CURE: {"A": 1,         "C": 2,         "E": 1},
+                PotionType.SILENCE_CURE:       {        "B": 2, "C": 1,         "E": 1},
+                PotionType.CURSE_CURE:         {        "B": 1, "C": 1,         "E": 2},
+            },
+            orient="index",
+        )
+        .fillna(0)
+        .reindex(list("ABCDE"), axis=1)
     )
-    .fillna(0)
-    .reindex(list("ABCDE"), axis=1)
-)
 # fmt: on
 
 # fmt: off
-potionBasePrices = (
-    pd.DataFrame.from_dict(
-        {
-            PotionType.HEALTH_POTION:       [  16,   18,   20,   23,   26,   29, 
-                                               36,   41,   46,   51,   58,   65,
-                                               81,   91,  103,  116,  130,  146, 
-                                              183,  206,  231,  260,  293,  330,
-                                              412,  463,  521,  587,  660,  742,
-                                              928, 1044, 1174, 1321,    0,    0],
-            PotionType.MANA_POTION:         [  20,   23,   25,   28,   32,   36, 
-                                               45,   51,   57,   64,   72,   81,
-                                              101,  114,  128,  144,  163,  183,
-                                              229,  257,  289,  325,  366,  412,
-                                              515,  579,  652,  733,  825,  928, 
-                                             1160, 1305, 1468, 1651,    0,    0],
-            PotionType.STAMINA_POTION:      [  22,   25,   28,   31,   35,   40,
-                                               50,   56,   63,   71,   79,   89,
-                                              112,  126,  141,  159,  179,  201,
-                                              251,  283,  318,  358,  403,  453,
-                                              566,  637,  717,  806,  907, 1021,
-                                             1276, 1435, 1615, 1817,    0,    0],
-            PotionType.SPEED_POTION:        [  24,   27,   30,   34,   38,   43,
-                                               54,   61,   68,   77,   87,   97,
-                                              122,  137,  154,  173,  195,  219,
-                                              274,  309,  347,  391,  439,  494,
-                                              618,  695,  782,  880,  990, 1113,
-                                             1392, 1566, 1761, 1982,    0,    0],
-            PotionType.TOLERANCE_POTION:    [  28,   32,   35,   40,   45,   50,
-                                               63,   71,   80,   90,  101,  114,
-                                              142,  160,  180,  202,  228,  256,
-                                              320,  360,  405,  456,  512,  577,
-                                              721,  811,  912, 1026, 1155, 1299,
-                                             1624, 1827, 2055, 2312,    0,    0],
-            PotionType.FIRE_TONIC:          [  18,   20,   23,   26,   29,   32,
-                                               41,   46,   51,   58,   65,   73,
-                                               91,  103,  116,  130,  146,  165,
-                                              206,  231,  260,  293,  330,  371,
-                                              463,  521,  587,  660,  742,  835,
-                                             1044, 1174, 1321, 1486,    0,    0],
-            PotionType.ICE_TONIC:           [  20,   23,   25,   28,   32,   36,
-                                               45,   51,   57,   64,   72,   81,
-                                              101,  114,  128,  144,  163,  183,
-                                              229,  257,  289,  325,  366,  412,
-                                              515,  579,  652,  733,  825,  928,
-                                             1160, 1305, 1468, 1651,    0,    0],
-            PotionType.THUNDER_TONIC:       [  22,   25,   28,   31,   35,   40,
-                                               50,   56,   63,   71,   79,   89,
-                                              112,  126,  141,  159,  179,  201,
-                                              251,  283,  318,  358,  403,  453,
-                                              566,  637,  717,  806,  907, 1021,
-                                             1276, 1435, 1615, 1817,    0,    0],
-            PotionType.SHADOW_TONIC:        [  24,   27,   30,   34,   38,   43,
-                                               54,   61,   68,   77,   87,   97,
-                                              122,  137,  154,  173,  195,  219,
-                                              274,  309,  347,  391,  439,  494,
-                                              618,  695,  782,  880,  990, 1113,
-                                             1392, 1566, 1761, 1982,    0,    0],
-            PotionType.RADIATION_TONIC:     [  26,   29,   33,   37,   42,   47,
-                                               59,   66,   74,   83,   94,  106,
-                                              132,  148,  167,  188,  211,  238,
-                                              297,  334,  376,  423,  476,  535,
-                                              669,  753,  847,  953, 1072, 1206,
-                                             1508, 1696, 1908, 2147,    0,    0],
-            PotionType.SIGHT_ENHANCER:      [  20,   23,   25,   28,   32,   36,
-                                               45,   51,   57,   64,   72,   81,
-                                              101,  114,  128,  144,  163,  183,
-                                              229,  257,  289,  325,  366,  412,
-                                              515,  579,  652,  733,  825,  928,
-                                             1160, 1305, 1468, 1651,    0,    0],
-            PotionType.ALERTNESS_ENHANCER:  [  26,   29,   33,   37,   42,   47,
-                                               59,   66,   74,   83,   94,  106,
-                                              132,  148,  167,  188,  211,  238,
-                                              297,  334,  376,  423,  476,  535,
-                                              669,  753,  847,  953, 1072, 1206,
-                                             1508, 1696, 1908, 2147,    0,    0],
-            PotionType.INSIGHT_ENHANCER:    [  24,   27,   30,   34,   38,   43,
-                                               54,   61,   68,   77,   87,   97,
-                                              122,  137,  154,  173,  195,  219,
-                                              274,  309,  347,  391,  439,  494,
-                                              618,  695,  782,  880,  990, 1113,
-                                             1392, 1566, 1761, 1982,    0,    0],
-            PotionType.DOWSING_ENHANCER:    [  28,   32,   35,   40,   45,   50,
-                                               63,   71,   80,   90,  101,  114,
-                                              142,  160,  180,  202,  228,  256,
-                                              320,  360,  405,  456,  512,  577,
-                                              721,  811,  912, 1026, 1155, 1299,
-                                             1624, 1827, 2055, 2312,    0,    0],
-            PotionType.SEEKING_ENHANCER:    [  32,   36,   41,   46,   51,   58,
-                                               72,   81,   91,  103,  115,  130,
-                                              162,  183,  205,  231,  260,  293,
-                                              366,  411,  463,  521,  586,  659,
-                                              824,  927, 1043, 1173, 1320, 1485,
-                                             1856, 2086, 2349, 2642,    0,    0],
-            PotionType.POISON_CURE:         [  19,   21,   24,   27,   30,   34,
-                                               43,   48,   54,   61,   69,   77,
-                                               96,  108,  122,  137,  154,  173,
-                                              217,  244,  275,  309,  348,  391,
-                                              489,  550,  619,  696,  784,  881,
-                                             1102, 1240, 1359, 1569,    0,    0],
-            PotionType.DROWSINESS_CURE:     [  21,   24,   27,   30,   34,   38,
-                                               47,   53,   60,   67,   76,   85,
-                                              107,  120,  135,  152,  171,  192,
-                                              240,  270,  304,  342,  384,  433,
-                                              541,  608,  684,  770,  866,  974,
-                                             1218, 1370, 1541, 1734,    0,    0],
-            PotionType.PETRIFICATION_CURE:  [  22,   25,   28,   31,   35,   40,
-                                               50,   56,   63,   71,   79,   89,
-                                              112,  126,  141,  159,  179,  201,
-                                              251,  283,  318,  358,  403,  453,
-                                              566,  637,  717,  806,  907, 1021,
-                                             1276, 1435, 1615, 1817,    0,    0],
-            PotionType.SILENCE_CURE:        [  20,   23,   25,   28,   32,   36,
-                                               45,   51,   57,   64,   72,   81,
-                                              101,  114,  128,  144,  163,  183,
-                                              229,  257,  289,  325,  366,  412,
-                                              515,  579,  652,  733,  825,  928,
-                                             1160, 1305, 1468, 1651,    0,    0],
-            PotionType.CURSE_CURE:          [  25,   28,   32,   36,   40,   45,
-                                               56,   63,   71,   80,   90,  101,
-                                              127,  143,  161,  181,  203,  229,
-                                              286,  321,  362,  407,  458,  515,
-                                              645,  725,  815,  915, 1030, 1160,
-                                             1450, 1630, 1835, 2065,    0,    0],
-        }
+def _buildPotionBasePrices():
+    import pandas as pd
+
+    return (
+        pd.DataFrame.from_dict(
+            {
+                PotionType.HEALTH_POTION:       [  16,   18,   20,   23,   26,   29, 
+                                                   36,   41,   46,   51,   58,   65,
+                                                   81,   91,  103,  116,  130,  146, 
+                                                  183,  206,  231,  260,  293,  330,
+                                                  412,  463,  521,  587,  660,  742,
+                                                  928, 1044, 1174, 1321,    0,    0],
+                PotionType.MANA_POTION:         [  20,   23,   25,   28,   32,   36, 
+                                                   45,   51,   57,   64,   72,   81,
+                                                  101,  114,  128,  144,  163,  183,
+                                                  229,  257,  289,  325,  366,  412,
+                                                  515,  579,  652,  733,  825,  928, 
+                                                 1160, 1305, 1468, 1651,    0,    0],
+                PotionType.STAMINA_POTION:      [  22,   25,   28,   31,   35,   40,
+                                                   50,   56,   63,   71,   79,   89,
+                                                  112,  126,  141,  159,  179,  201,
+                                                  251,  283,  318,  358,  403,  453,
+                                                  566,  637,  717,  806,  907, 1021,
+                                                 1276, 1435, 1615, 1817,    0,    0],
+                PotionType.SPEED_POTION:        [  24,   27,   30,   34,   38,   43,
+                                                   54,   61,   68,   77,   87,   97,
+                                                  122,  137,  154,  173,  195,  219,
+                                                  274,  309,  347,  391,  439,  494,
+                                                  618,  695,  782,  880,  990, 1113,
+                                                 1392, 1566, 1761, 1982,    0,    0],
+                PotionType.TOLERANCE_POTION:    [  28,   32,   35,   40,   45,   50,
+                                                   63,   71,   80,   90,  101,  114,
+                                                  142,  160,  180,  202,  228,  256,
+                                                  320,  360,  405,  456,  512,  577,
+                                                  721,  811,  912, 1026, 1155, 1299,
+                                                 1624, 1827, 2055, 2312,    0,    0],
+                PotionType.FIRE_TONIC:          [  18,   20,   23,   26,   29,   32,
+                                                   41,   46,   51,   58,   65,   73,
+                                                   91,  103,  116,  130,  146,  165,
+                                                  206,  231,  260,  293,  330,  371,
+                                                  463,  521,  587,  660,  742,  835,
+                                                 1044, 1174, 1321, 1486,    0,    0],
+                PotionType.ICE_TONIC:           [  20,   23,   25,   28,   32,   36,
+                                                   45,   51,   57,   64,   72,   81,
+                                                  101,  114,  128,  144,  163,  183,
+                                                  229,  257,  289,  325,  366,  412,
+                                                  515,  579,  652,  733,  825,  928,
+                                                 1160, 1305, 1468, 1651,    0,    0],
+                PotionType.THUNDER_TONIC:       [  22,   25,   28,   31,   35,   40,
+                                                   50,   56,   63,   71,   79,   89,
+                                                  112,  126,  141,  159,  179,  201,
+                                                  251,  283,  318,  358,  403,  453,
+                                                  566,  637,  717,  806,  907, 1021,
+                                                 1276, 1435, 1615, 1817,    0,    0],
+                PotionType.SHADOW_TONIC:        [  24,   27,   30,   34,   38,   43,
+                                                   54,   61,   68,   77,   87,   97,
+                                                  122,  137,  154,  173,  195,  219,
+                                                  274,  309,  347,  391,  439,  494,
+                                                  618,  695,  782,  880,  990, 1113,
+                                                 1392, 1566, 1761, 1982,    0,    0],
+                PotionType.RADIATION_TONIC:     [  26,   29,   33,   37,   42,   47,
+                                                   59,   66,   74,   83,   94,  106,
+                                                  132,  148,  167,  188,  211,  238,
+                                                  297,  334,  376,  423,  476,  535,
+                                                  669,  753,  847,  953, 1072, 1206,
+                                                 1508, 1696, 1908, 2147,    0,    0],
+                PotionType.SIGHT_ENHANCER:      [  20,   23,   25,   28,   32,   36,
+                                                   45,   51,   57,   64,   72,   81,
+                                                  101,  114,  128,  144,  163,  183,
+                                                  229,  257,  289,  325,  366,  412,
+                                                  515,  579,  652,  733,  825,  928,
+                                                 1160, 1305, 1468, 1651,    0,    0],
+                PotionType.ALERTNESS_ENHANCER:  [  26,   29,   33,   37,   42,   47,
+                                                   59,   66,   74,   83,   94,  106,
+                                                  132,  148,  167,  188,  211,  238,
+                                                  297,  334,  376,  423,  476,  535,
+                                                  669,  753,  847,  953, 1072, 1206,
+                                                 1508, 1696, 1908, 2147,    0,    0],
+                PotionType.INSIGHT_ENHANCER:    [  24,   27,   30,   34,   38,   43,
+                                                   54,   61,   68,   77,   87,   97,
+                                                  122,  137,  154,  173,  195,  219,
+                                                  274,  309,  347,  391,  439,  494,
+                                                  618,  695,  782,  880,  990, 1113,
+                                                 1392, 1566, 1761, 1982,    0,    0],
+                PotionType.DOWSING_ENHANCER:    [  28,   32,   35,   40,   45,   50,
+                                                   63,   71,   80,   90,  101,  114,
+                                                  142,  160,  180,  202,  228,  256,
+                                                  320,  360,  405,  456,  512,  577,
+                                                  721,  811,  912, 1026, 1155, 1299,
+                                                 1624, 1827, 2055, 2312,    0,    0],
+                PotionType.SEEKING_ENHANCER:    [  32,   36,   41,   46,   51,   58,
+                                                   72,   81,   91,  103,  115,  130,
+                                                  162,  183,  205,  231,  260,  293,
+                                                  366,  411,  463,  521,  586,  659,
+                                                  824,  927, 1043, 1173, 1320, 1485,
+                                                 1856, 2086, 2349, 2642,    0,    0],
+                PotionType.POISON_CURE:         [  19,   21,   24,   27,   30,   34,
+                                                   43,   48,   54,   61,   69,   77,
+                                                   96,  108,  122,  137,  154,  173,
+                                                  217,  244,  275,  309,  348,  391,
+                                                  489,  550,  619,  696,  784,  881,
+                                                 1102, 1240, 1359, 1569,    0,    0],
+                PotionType.DROWSINESS_CURE:     [  21,   24,   27,   30,   34,   38,
+                                                   47,   53,   60,   67,   76,   85,
+                                                  107,  120,  135,  152,  171,  192,
+                                                  240,  270,  304,  342,  384,  433,
+                                                  541,  608,  684,  770,  866,  974,
+                                                 1218, 1370, 1541, 1734,    0,    0],
+                PotionType.PETRIFICATION_CURE:  [  22,   25,   28,   31,   35,   40,
+                                                   50,   56,   63,   71,   79,   89,
+                                                  112,  126,  141,  159,  179,  201,
+                                                  251,  283,  318,  358,  403,  453,
+                                                  566,  637,  717,  806,  907, 1021,
+                                                 1276, 1435, 1615, 1817,    0,    0],
+                PotionType.SILENCE_CURE:        [  20,   23,   25,   28,   32,   36,
+                                                   45,   51,   57,   64,   72,   81,
+                                                  101,  114,  128,  144,  163,  183,
+                                                  229,  257,  289,  325,  366,  412,
+                                                  515,  579,  652,  733,  825,  928,
+                                                 1160, 1305, 1468, 1651,    0,    0],
+                PotionType.CURSE_CURE:          [  25,   28,   32,   36,   40,   45,
+                                                   56,   63,   71,   80,   90,  101,
+                                                  127,  143,  161,  181,  203,  229,
+                                                  286,  321,  362,  407,  458,  515,
+                                                  645,  725,  815,  915, 1030, 1160,
+                                                 1450, 1630, 1835, 2065,    0,    0],
+            }
+        )
     )
-)
 
 # fmt: on
 
 
 # fmt: off
-potionBrewingTimes = pd.DataFrame.from_dict(
-    {
-        PotionType.HEALTH_POTION: {
-            PotionTier.MINOR:       2,
-            PotionTier.COMMON:      4,
-            PotionTier.GREATER:     6,
-            PotionTier.GRAND:       8,
-            PotionTier.SUPERIOR:   11,
-            PotionTier.MASTERWORK: 14,
-        },
-        PotionType.MANA_POTION: {
-            PotionTier.MINOR:       3,
-            PotionTier.COMMON:      5,
-            PotionTier.GREATER:     7,
-            PotionTier.GRAND:       9,
-            PotionTier.SUPERIOR:   12,
-            PotionTier.MASTERWORK: 15,
-        },
-        PotionType.STAMINA_POTION: {
-            PotionTier.MINOR:       4,
-            PotionTier.COMMON:      6,
-            PotionTier.GREATER:     8,
-            PotionTier.GRAND:      10,
-            PotionTier.SUPERIOR:   13,
-            PotionTier.MASTERWORK: 16,
-        },
-        PotionType.SPEED_POTION: {
-            PotionTier.MINOR:       5,
-            PotionTier.COMMON:      7,
-            PotionTier.GREATER:     9,
-            PotionTier.GRAND:      12,
-            PotionTier.SUPERIOR:   15,
-            PotionTier.MASTERWORK: 18,
-        },
-        PotionType.TOLERANCE_POTION: {
-            PotionTier.MINOR:       7,
-            PotionTier.COMMON:      9,
-            PotionTier.GREATER:    11,
-            PotionTier.GRAND:      14,
-            PotionTier.SUPERIOR:   17,
-            PotionTier.MASTERWORK: 21,
-        },
-        PotionType.FIRE_TONIC: {
-            PotionTier.MINOR:       2,
-            PotionTier.COMMON:      4,
-            PotionTier.GREATER:     6,
-            PotionTier.GRAND:       8,
-            PotionTier.SUPERIOR:   11,
-            PotionTier.MASTERWORK: 14,
-        },
-        PotionType.ICE_TONIC: {
-            PotionTier.MINOR:       3,
-            PotionTier.COMMON:      5,
-            PotionTier.GREATER:     7,
-            PotionTier.GRAND:       9,
-            PotionTier.SUPERIOR:   12,
-            PotionTier.MASTERWORK: 15,
-        },
-        PotionType.THUNDER_TONIC: {
-            PotionTier.MINOR:       4,
-            PotionTier.COMMON:      6,
-            PotionTier.GREATER:     8,
-            PotionTier.GRAND:      10,
-            PotionTier.SUPERIOR:   13,
-            PotionTier.MASTERWORK: 16,
-        },
-        PotionType.SHADOW_TONIC: {
-            PotionTier.MINOR:       5,
-            PotionTier.COMMON:      7,
-            PotionTier.GREATER:     9,
-            PotionTier.GRAND:      12,
-            PotionTier.SUPERIOR:   15,
-            PotionTier.MASTERWORK: 18,
-        },
-        PotionType.RADIATION_TONIC: {
-            PotionTier.MINOR:       6,
-            PotionTier.COMMON:      9,
-            PotionTier.GREATER:    11,
-            PotionTier.GRAND:      14,
-            PotionTier.SUPERIOR:   17,
-            PotionTier.MASTERWORK: 19,
-        },
-        PotionType.SIGHT_ENHANCER: {
-            PotionTier.MINOR:       3,
-            PotionTier.COMMON:      5,
-            PotionTier.GREATER:     7,
-            PotionTier.GRAND:       9,
-            PotionTier.SUPERIOR:   12,
-            PotionTier.MASTERWORK: 15,
-        },
-        PotionType.ALERTNESS_ENHANCER: {
-            PotionTier.MINOR:       5,
-            PotionTier.COMMON:      7,
-            PotionTier.GREATER:     9,
-            PotionTier.GRAND:      12,
-            PotionTier.SUPERIOR:   15,
-            PotionTier.MASTERWORK: 18,
-        },
-        PotionType.INSIGHT_ENHANCER: {
-            PotionTier.MINOR:       4,
-            PotionTier.COMMON:      6,
-            PotionTier.GREATER:     8,
-            PotionTier.GRAND:      10,
-            PotionTier.SUPERIOR:   13,
-            PotionTier.MASTERWORK: 16,
-        },
-        PotionType.DOWSING_ENHANCER: {
-            PotionTier.MINOR:       7,
-            PotionTier.COMMON:      9,
-            PotionTier.GREATER:    11,
-            PotionTier.GRAND:      14,
-            PotionTier.SUPERIOR:   17,
-            PotionTier.MASTERWORK: 21,
-        },
-        PotionType.SEEKING_ENHANCER: {
-            PotionTier.MINOR:       9,
-            PotionTier.COMMON:     12,
-            PotionTier.GREATER:    15,
-            PotionTier.GRAND:      18,
-            PotionTier.SUPERIOR:   21,
-            PotionTier.MASTERWORK: 25,
-        },
-        PotionType.POISON_CURE: {
-            PotionTier.MINOR:       2,
-            PotionTier.COMMON:      4,
-            PotionTier.GREATER:     6,
-            PotionTier.GRAND:       8,
-            PotionTier.SUPERIOR:   11,
-            PotionTier.MASTERWORK: 14,
-        },
-        PotionType.DROWSINESS_CURE: {
-            PotionTier.MINOR:       3,
-            PotionTier.COMMON:      5,
-            PotionTier.GREATER:     7,
-            PotionTier.GRAND:       9,
-            PotionTier.SUPERIOR:   12,
-            PotionTier.MASTERWORK: 15,
-        },
-        PotionType.PETRIFICATION_CURE: {
-            PotionTier.MINOR:       4,
-            PotionTier.COMMON:      6,
-            PotionTier.GREATER:     8,
-            PotionTier.GRAND:      10,
-            PotionTier.SUPERIOR:   13,
-            PotionTier.MASTERWORK: 16,
-        },
-        PotionType.SILENCE_CURE: {
-            PotionTier.MINOR:       3,
-            PotionTier.COMMON:      5,
-            PotionTier.GREATER:     7,
-            PotionTier.GRAND:       9,
-            PotionTier.SUPERIOR:   12,
-            PotionTier.MASTERWORK: 15,
-        },
-        PotionType.CURSE_CURE: {
-            PotionTier.MINOR:       5,
-            PotionTier.COMMON:      7,
-            PotionTier.GREATER:     9,
-            PotionTier.GRAND:      12,
-            PotionTier.SUPERIOR:   15,
-            PotionTier.MASTERWORK: 18,
-        },
-    }
-)
+def _buildPotionBrewingTimes():
+    import pandas as pd
+
+    return pd.DataFrame.from_dict(
+        {
+            PotionType.HEALTH_POTION: {
+                PotionTier.MINOR:       2,
+                PotionTier.COMMON:      4,
+                PotionTier.GREATER:     6,
+                PotionTier.GRAND:       8,
+                PotionTier.SUPERIOR:   11,
+                PotionTier.MASTERWORK: 14,
+            },
+            PotionType.MANA_POTION: {
+                PotionTier.MINOR:       3,
+                PotionTier.COMMON:      5,
+                PotionTier.GREATER:     7,
+                PotionTier.GRAND:       9,
+                PotionTier.SUPERIOR:   12,
+                PotionTier.MASTERWORK: 15,
+            },
+            PotionType.STAMINA_POTION: {
+                PotionTier.MINOR:       4,
+                PotionTier.COMMON:      6,
+                PotionTier.GREATER:     8,
+                PotionTier.GRAND:      10,
+                PotionTier.SUPERIOR:   13,
+                PotionTier.MASTERWORK: 16,
+            },
+            PotionType.SPEED_POTION: {
+                PotionTier.MINOR:       5,
+                PotionTier.COMMON:      7,
+                PotionTier.GREATER:     9,
+                PotionTier.GRAND:      12,
+                PotionTier.SUPERIOR:   15,
+                PotionTier.MASTERWORK: 18,
+            },
+            PotionType.TOLERANCE_POTION: {
+                PotionTier.MINOR:       7,
+                PotionTier.COMMON:      9,
+                PotionTier.GREATER:    11,
+                PotionTier.GRAND:      14,
+                PotionTier.SUPERIOR:   17,
+                PotionTier.MASTERWORK: 21,
+            },
+            PotionType.FIRE_TONIC: {
+                PotionTier.MINOR:       2,
+                PotionTier.COMMON:      4,
+                PotionTier.GREATER:     6,
+                PotionTier.GRAND:       8,
+                PotionTier.SUPERIOR:   11,
+                PotionTier.MASTERWORK: 14,
+            },
+            PotionType.ICE_TONIC: {
+                PotionTier.MINOR:       3,
+                PotionTier.COMMON:      5,
+                PotionTier.GREATER:     7,
+                PotionTier.GRAND:       9,
+                PotionTier.SUPERIOR:   12,
+                PotionTier.MASTERWORK: 15,
+            },
+            PotionType.THUNDER_TONIC: {
+                PotionTier.MINOR:       4,
+                PotionTier.COMMON:      6,
+                PotionTier.GREATER:     8,
+                PotionTier.GRAND:      10,
+                PotionTier.SUPERIOR:   13,
+                PotionTier.MASTERWORK: 16,
+            },
+            PotionType.SHADOW_TONIC: {
+                PotionTier.MINOR:       5,
+                PotionTier.COMMON:      7,
+                PotionTier.GREATER:     9,
+                PotionTier.GRAND:      12,
+                PotionTier.SUPERIOR:   15,
+                PotionTier.MASTERWORK: 18,
+            },
+            PotionType.RADIATION_TONIC: {
+                PotionTier.MINOR:       6,
+                PotionTier.COMMON:      9,
+                PotionTier.GREATER:    11,
+                PotionTier.GRAND:      14,
+                PotionTier.SUPERIOR:   17,
+                PotionTier.MASTERWORK: 19,
+            },
+            PotionType.SIGHT_ENHANCER: {
+                PotionTier.MINOR:       3,
+                PotionTier.COMMON:      5,
+                PotionTier.GREATER:     7,
+                PotionTier.GRAND:       9,
+                PotionTier.SUPERIOR:   12,
+                PotionTier.MASTERWORK: 15,
+            },
+            PotionType.ALERTNESS_ENHANCER: {
+                PotionTier.MINOR:       5,
+                PotionTier.COMMON:      7,
+                PotionTier.GREATER:     9,
+                PotionTier.GRAND:      12,
+                PotionTier.SUPERIOR:   15,
+                PotionTier.MASTERWORK: 18,
+            },
+            PotionType.INSIGHT_ENHANCER: {
+                PotionTier.MINOR:       4,
+                PotionTier.COMMON:      6,
+                PotionTier.GREATER:     8,
+                PotionTier.GRAND:      10,
+                PotionTier.SUPERIOR:   13,
+                PotionTier.MASTERWORK: 16,
+            },
+            PotionType.DOWSING_ENHANCER: {
+                PotionTier.MINOR:       7,
+                PotionTier.COMMON:      9,
+                PotionTier.GREATER:    11,
+                PotionTier.GRAND:      14,
+                PotionTier.SUPERIOR:   17,
+                PotionTier.MASTERWORK: 21,
+            },
+            PotionType.SEEKING_ENHANCER: {
+                PotionTier.MINOR:       9,
+                PotionTier.COMMON:     12,
+                PotionTier.GREATER:    15,
+                PotionTier.GRAND:      18,
+                PotionTier.SUPERIOR:   21,
+                PotionTier.MASTERWORK: 25,
+            },
+            PotionType.POISON_CURE: {
+                PotionTier.MINOR:       2,
+                PotionTier.COMMON:      4,
+                PotionTier.GREATER:     6,
+                PotionTier.GRAND:       8,
+                PotionTier.SUPERIOR:   11,
+                PotionTier.MASTERWORK: 14,
+            },
+            PotionType.DROWSINESS_CURE: {
+                PotionTier.MINOR:       3,
+                PotionTier.COMMON:      5,
+                PotionTier.GREATER:     7,
+                PotionTier.GRAND:       9,
+                PotionTier.SUPERIOR:   12,
+                PotionTier.MASTERWORK: 15,
+            },
+            PotionType.PETRIFICATION_CURE: {
+                PotionTier.MINOR:       4,
+                PotionTier.COMMON:      6,
+                PotionTier.GREATER:     8,
+                PotionTier.GRAND:      10,
+                PotionTier.SUPERIOR:   13,
+                PotionTier.MASTERWORK: 16,
+            },
+            PotionType.SILENCE_CURE: {
+                PotionTier.MINOR:       3,
+                PotionTier.COMMON:      5,
+                PotionTier.GREATER:     7,
+                PotionTier.GRAND:       9,
+                PotionTier.SUPERIOR:   12,
+                PotionTier.MASTERWORK: 15,
+            },
+            PotionType.CURSE_CURE: {
+                PotionTier.MINOR:       5,
+                PotionTier.COMMON:      7,
+                PotionTier.GREATER:     9,
+                PotionTier.GRAND:      12,
+                PotionTier.SUPERIOR:   15,
+                PotionTier.MASTERWORK: 18,
+            },
+        }
+    )
 # fmt: on
 
 
@@ -441,8 +453,8 @@ class Cauldron(Enum):
     MAGICAL_WASTELAND_CAULDRON_III = 38
 
 
-cauldronProperties = pd.DataFrame.from_dict(
-    {
+def _cauldronRecords():
+    return {
         Cauldron.WOODEN_CAULDRON: {
             "maxIngredients": 4,
             "maxMagimins": 75,
@@ -596,7 +608,12 @@ cauldronProperties = pd.DataFrame.from_dict(
             "maxMagimins": 2000,
         },
     }
-).transpose()
+
+
+def _buildCauldronProperties():
+    import pandas as pd
+
+    return pd.DataFrame.from_dict(_cauldronRecords()).transpose()
 
 
 class SensoryQuality(IntEnum):
@@ -614,35 +631,38 @@ class SensoryType(Enum):
     SOUND = 5
 
 
-sensoryAdjectives = pd.DataFrame.from_dict(
-    {
-        SensoryType.TASTE: {
-            SensoryQuality.NEGATIVE: "Disgusting",
-            SensoryQuality.NEUTRAL: "-",
-            SensoryQuality.POSITIVE: "Delicious",
-        },
-        SensoryType.SENSATION: {
-            SensoryQuality.NEGATIVE: "Painful",
-            SensoryQuality.NEUTRAL: "-",
-            SensoryQuality.POSITIVE: "Pleasant",
-        },
-        SensoryType.AROMA: {
-            SensoryQuality.NEGATIVE: "Repulsive",
-            SensoryQuality.NEUTRAL: "-",
-            SensoryQuality.POSITIVE: "Redolent",
-        },
-        SensoryType.VISUAL: {
-            SensoryQuality.NEGATIVE: "Apalling",
-            SensoryQuality.NEUTRAL: "-",
-            SensoryQuality.POSITIVE: "Aesthetic",
-        },
-        SensoryType.SOUND: {
-            SensoryQuality.NEGATIVE: "Mangled",
-            SensoryQuality.NEUTRAL: "-",
-            SensoryQuality.POSITIVE: "Melodious",
-        },
-    }
-)
+def _buildSensoryAdjectives():
+    import pandas as pd
+
+    return pd.DataFrame.from_dict(
+        {
+            SensoryType.TASTE: {
+                SensoryQuality.NEGATIVE: "Disgusting",
+                SensoryQuality.NEUTRAL: "-",
+                SensoryQuality.POSITIVE: "Delicious",
+            },
+            SensoryType.SENSATION: {
+                SensoryQuality.NEGATIVE: "Painful",
+                SensoryQuality.NEUTRAL: "-",
+                SensoryQuality.POSITIVE: "Pleasant",
+            },
+            SensoryType.AROMA: {
+                SensoryQuality.NEGATIVE: "Repulsive",
+                SensoryQuality.NEUTRAL: "-",
+                SensoryQuality.POSITIVE: "Redolent",
+            },
+            SensoryType.VISUAL: {
+                SensoryQuality.NEGATIVE: "Apalling",
+                SensoryQuality.NEUTRAL: "-",
+                SensoryQuality.POSITIVE: "Aesthetic",
+            },
+            SensoryType.SOUND: {
+                SensoryQuality.NEGATIVE: "Mangled",
+                SensoryQuality.NEUTRAL: "-",
+                SensoryQuality.POSITIVE: "Melodious",
+            },
+        }
+    )
 
 
 class PotionIngredient(Enum):
@@ -903,8 +923,8 @@ ingredientsNormalizedToProper["dragontears"] = PotionIngredient.DRAGON_TEAR
 # print(ingredientsNormalizedToProper)
 
 
-ingredientData = pd.DataFrame.from_dict(
-    {
+def _ingredientRecords():
+    return {
         PotionIngredient.FAIRY_FLOWER_BULB: {
             "name": "Fairy Flower Bulb",
             "rarity": 1,
@@ -4614,7 +4634,106 @@ ingredientData = pd.DataFrame.from_dict(
             "zone": AdventureLocation.MAGICAL_WASTELAND,
         },
     }
-)
+
+
+def _buildIngredientData():
+    import pandas as pd
+
+    return pd.DataFrame.from_dict(_ingredientRecords())
+
+
+# Dense, read-only structure-of-arrays view of ingredientData for hot paths.
+# Row i of every array describes ingredientOrder[i]; magimin columns are
+# A through E and sensory columns follow the SensoryType declaration order.
+sensoryIndex = {s: i for i, s in enumerate(SensoryType)}
+
+
+def _buildIngredientOrder():
+    return tuple(_loadTable("ingredientData").columns)
+
+
+def _buildIngredientIndex():
+    return {k: i for i, k in enumerate(_loadTable("ingredientOrder"))}
+
+
+def _readOnly(array):
+    array.setflags(write=False)
+    return array
+
+
+def _buildIngredientMagimins():
+    import numpy as np
+
+    ingredientData = _loadTable("ingredientData")
+    return _readOnly(ingredientData.loc[list("ABCDE")].T.to_numpy(dtype=np.int16))
+
+
+def _buildIngredientSensory():
+    import numpy as np
+
+    ingredientData = _loadTable("ingredientData")
+    return _readOnly(ingredientData.loc[list(SensoryType)].T.to_numpy(dtype=np.int8))
+
+
+def _buildIngredientPrices():
+    import numpy as np
+
+    ingredientData = _loadTable("ingredientData")
+    return _readOnly(ingredientData.loc["basePrice"].to_numpy(dtype=np.int32))
+
+
+def _buildPotionCompatibility():
+    # For every potion type, the ingredients with no magimins outside the
+    # potion's ratio (the only ones a perfect potion can contain), and for
+    # every ingredient the ones that could always stand in for it, cheapest
+    # first. Magimins outside the ratio all count alike against stability, so
+    # two ingredients match when they agree inside the ratio and in their total
+    # outside it; a stand-in must then cost no more and be no worse in any
+    # sense. Of identical ingredients the first one stands in for the rest.
+    # Groups of ingredients that match each other are kept as well, so that
+    # requests caring about fewer senses can find more stand-ins.
+    potionRatios = _loadTable("potionRatios")
+    ingredientOrder = _loadTable("ingredientOrder")
+    magimins = _loadTable("ingredientMagimins")
+    sensory = _loadTable("ingredientSensory")
+    prices = _loadTable("ingredientPrices")
+    compatibility = {}
+    for potionType in PotionType:
+        used = potionRatios.loc[potionType].to_numpy() > 0
+        outside = magimins[:, ~used].sum(axis=1)
+        groups = {}
+        for i in range(len(ingredientOrder)):
+            groups.setdefault((*magimins[i, used], outside[i]), []).append(i)
+        dominators = {}
+        for members in groups.values():
+            for j in members:
+                better = [
+                    i
+                    for i in members
+                    if i != j
+                    and (sensory[i] >= sensory[j]).all()
+                    and prices[i] <= prices[j]
+                    and (
+                        i < j
+                        or (sensory[i] > sensory[j]).any()
+                        or prices[i] < prices[j]
+                    )
+                ]
+                if better:
+                    dominators[ingredientOrder[j]] = tuple(
+                        ingredientOrder[i]
+                        for i in sorted(better, key=prices.__getitem__)
+                    )
+        compatibility[potionType] = {
+            "balanced": frozenset(k for k, o in zip(ingredientOrder, outside) if not o),
+            "dominators": dominators,
+            "groups": tuple(
+                tuple(ingredientOrder[i] for i in members)
+                for members in groups.values()
+                if len(members) > 1
+            ),
+        }
+    return compatibility
 
 
 enumerables = [
@@ -4630,19 +4749,67 @@ enumerables = [
     AdventureLocation,
 ]
 
-enumToEnglish = dict(
-    zip(
-        sum(map(list, enumerables), start=[]),
-        map(
-            titleEnumName,
-            sum(map(lambda x: list(x.__members__.keys()), enumerables), start=[]),
-        ),
+
+def _buildEnumToEnglish():
+    return dict(
+        zip(
+            sum(map(list, enumerables), start=[]),
+            map(
+                titleEnumName,
+                sum(map(lambda x: list(x.__members__.keys()), enumerables), start=[]),
+            ),
+        )
     )
-)
 
-englishToEnum = {j: i for i, j in enumToEnglish.items()}
-# print(englishToEnum)
+
+def _buildEnglishToEnum():
+    return {j: i for i, j in _loadTable("enumToEnglish").items()}
+
+
+# Tables are built on first access through the module's __getattr__, so that
+# importing gameInfo (and pandas) stays cheap until something needs the data
+_tableBuilders = {
+    "starRequirements": _buildStarRequirements,
+    "potionRatios": _buildPotionRatios,
+    "potionBasePrices": _buildPotionBasePrices,
+    "potionBrewingTimes": _buildPotionBrewingTimes,
+    "cauldronProperties": _buildCauldronProperties,
+    "sensoryAdjectives": _buildSensoryAdjectives,
+    "ingredientData": _buildIngredientData,
+    "ingredientOrder": _buildIngredientOrder,
+    "ingredientIndex": _buildIngredientIndex,
+    "ingredientMagimins": _buildIngredientMagimins,
+    "ingredientSensory": _buildIngredientSensory,
+    "ingredientPrices": _buildIngredientPrices,
+    "potionCompatibility": _buildPotionCompatibility,
+    "enumToEnglish": _buildEnumToEnglish,
+    "englishToEnum": _buildEnglishToEnum,
+}
+
+_tableLock = RLock()
+
+
+def _loadTable(name):
+    with _tableLock:
+        if name not in globals():
+            globals()[name] = _tableBuilders[name]()
+        return globals()[name]
+
+
+def __getattr__(name):
+    if name in _tableBuilders:
+        return _loadTable(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def loadAllTables():
+    # Builds every table now rather than on first use
+    return {name: _loadTable(name) for name in _tableBuilders}
 
 
 def filterStrings(enumType):
-    return {i: j for i, j in enumToEnglish.items() if i.name in [*map(lambda x: x.name, enumType)]}
+    return {
+        i: j
+        for i, j in _loadTable("enumToEnglish").items()
+        if i.name in [*map(lambda x: x.name, enumType)]
+    }
@@ -0,0 +1,223 @@
+import numpy as np
+
+from boxer import gameInfo
+from boxer.gameInfo import PotionIngredient, PotionStability, SensoryQuality
+from boxer.gameInfo import sensoryIndex
+from boxer.optimization import (
+    PotionOptimizationObjective,
+    dominatedIngredients,
+    openCapacities,
+    recipeSolution,
+)
+from boxer.search import stabilityRanks, stabilityShares, stabilityStars
+
+# How much anything that keeps a recipe from being brewed as asked weighs
+# against the objective; enough for any fix to beat any gain
+penaltyWeight = 1e9
+# Recipes kept from one round of additions to the next
+beamWidth = 8
+# Local search moves made before giving up, per ingredient the cauldron holds
+movesPerSlot = 4
+
+
+def heuristicBestPotion(
+    ingredientInventory=None,
+    cauldron=None,
+    potionType=None,
+    objective=PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+    minStability=PotionStability.UNSTABLE,
+    starLevel=None,
+    sensoryData=None,
+):
+    # A quick guess at what getBestPotion would find: a beam search fills the
+    # cauldron one ingredient at a time, then local search trades ingredients
+    # for better ones. Milliseconds rather than seconds, but only as good as
+    # the local optimum it stops at; None if it finds nothing that can be
+    # brewed as asked.
+    sensoryData = sensoryData or {}
+    profitable = objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH
+    cheapest = objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS
+
+    workingCauldron = gameInfo.cauldronProperties.loc[cauldron]
+    maxIngredients = int(workingCauldron["maxIngredients"])
+    maxMagimins = int(workingCauldron["maxMagimins"])
+    thresholds = gameInfo.starRequirements.loc["magimins"].to_numpy().astype(np.int64)
+    basePrices = gameInfo.potionBasePrices[potionType].to_numpy()
+    ratios = gameInfo.potionRatios.loc[potionType].to_numpy().astype(np.int64)
+    ratioSum = ratios.sum()
+    worstRank = max(
+        rank
+        for rank, stability in enumerate(stabilityRanks)
+        if stability.value >= minStability.value
+    )
+    if profitable:
+        worstRank = 0
+    # Past the last rank, a recipe is too unstable to brew at all
+    shares = np.array(stabilityShares)
+    starsOfRank = np.array(stabilityStars + [stabilityStars[-1]])
+
+    constrainedSenses = [
+        s
+        for s, quality in sensoryData.items()
+        if quality not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]
+    ]
+    goodSenses = [
+        s for s in constrainedSenses if sensoryData[s] == SensoryQuality.POSITIVE
+    ]
+    capacities = openCapacities(
+        ingredientInventory, cauldron, potionType, objective, minStability, sensoryData
+    )
+    for name in dominatedIngredients(
+        potionType, capacities, maxIngredients, constrainedSenses
+    ):
+        del capacities[name]
+    if not capacities:
+        return None
+
+    names = [name for name in PotionIngredient if name in capacities]
+    rows = [gameInfo.ingredientIndex[name] for name in names]
+    magimins = gameInfo.ingredientMagimins[rows].astype(np.int64)
+    prices = gameInfo.ingredientPrices[rows].astype(np.float64)
+    caps = np.array([capacities[name] for name in names])
+    good = (
+        gameInfo.ingredientSensory[rows][:, [sensoryIndex[s] for s in goodSenses]]
+        == SensoryQuality.POSITIVE
+    ).astype(np.int64)
+    # Any difference in quantity outweighs any difference in cost, as in the
+    # cheapest recipe's MILP objective
+    quantityWeight = prices.max() * maxIngredients + 1
+
+    def scoresOf(recipeMagimins, quantity, cost, goodCounts):
+        # One score per recipe (row), the higher the better; those that can't
+        # be brewed as asked lose penaltyWeight for each thing wrong with them,
+        # in proportion to how far off they are
+        total = recipeMagimins.sum(axis=1)
+        deviance = (
+            -(-np.abs(recipeMagimins * ratioSum - np.outer(total, ratios)) // ratioSum)
+        ).sum(axis=1)
+        rank = (10 * deviance[:, None] > np.outer(total, shares)).sum(axis=1)
+        baseStars = np.minimum(
+            np.searchsorted(thresholds, total, side="right") - 1, len(thresholds) - 2
+        )
+        totalStars = baseStars + starsOfRank[rank]
+
+        penalty = np.maximum(0, 10 * deviance - shares[worstRank] * total) / (
+            10 * np.maximum(total, 1)
+        )
+        penalty += ((recipeMagimins == 0) & (ratios > 0)).sum(axis=1)
+        penalty += (goodCounts == 0).sum(axis=1)
+        penalty += quantity == 0
+        if cheapest:
+            neededStars = starLevel - starsOfRank[np.minimum(rank, worstRank)]
+            needed = thresholds[np.clip(neededStars, 0, len(thresholds) - 2)]
+            penalty += np.maximum(0, needed - total) / maxMagimins
+            penalty += np.maximum(0, neededStars - (len(thresholds) - 2))
+            value = quantity * quantityWeight - cost
+        elif profitable:
+            penalty += maxIngredients - quantity
+            value = basePrices[baseStars] * maxIngredients - cost
+        else:
+            # Cheaper recipes break ties between equally good ones
+            value = totalStars * quantityWeight - cost
+        scores = value - penaltyWeight * penalty
+        scores[total > maxMagimins] = -np.inf
+        return scores, penalty
+
+    # Recipes are told apart by the sum of a random key per ingredient in them
+    keys = np.random.default_rng(0).integers(0, 2**62, size=len(names), dtype=np.int64)
+
+    # Beam search over additions: from the beamWidth best recipes so far,
+    # every way of adding one more ingredient is scored, and the best
+    # distinct ones go on to the next round
+    beamCounts = np.zeros((1, len(names)), dtype=np.int64)
+    beamMagimins = np.zeros((1, len(ratios)), dtype=np.int64)
+    beamCost = np.zeros(1)
+    beamGood = np.zeros((1, len(goodSenses)), dtype=np.int64)
+    beamKeys = np.zeros(1, dtype=np.int64)
+    bestScore = -np.inf
+    bestCounts = None
+    for slot in range(maxIngredients):
+        states, additions = np.nonzero(beamCounts < caps)
+        if not len(states):
+            break
+        childMagimins = beamMagimins[states] + magimins[additions]
+        childCost = beamCost[states] + prices[additions]
+        childGood = beamGood[states] + good[additions]
+        childKeys = beamKeys[states] + keys[additions]
+        scores, penalties = scoresOf(
+            childMagimins, np.full(len(states), slot + 1), childCost, childGood
+        )
+
+        brewable = np.flatnonzero(penalties == 0)
+        if len(brewable):
+            top = brewable[np.argmax(scores[brewable])]
+            if scores[top] > bestScore:
+                bestScore = scores[top]
+                bestCounts = beamCounts[states[top]].copy()
+                bestCounts[additions[top]] += 1
+
+        order = np.argsort(-scores, kind="stable")
+        order = order[np.isfinite(scores[order])]
+        kept = order[np.sort(np.unique(childKeys[order], return_index=True)[1])]
+        kept = kept[:beamWidth]
+        if not len(kept):
+            break
+        beamCounts = beamCounts[states[kept]]
+        beamCounts[np.arange(len(kept)), additions[kept]] += 1
+        beamMagimins = childMagimins[kept]
+        beamCost = childCost[kept]
+        beamGood = childGood[kept]
+        beamKeys = childKeys[kept]
+
+    if bestCounts is None:
+        return None
+
+    # Then local search from the best of them: move by move, add, remove or
+    # swap one ingredient, whichever helps most, until nothing does
+    counts = bestCounts
+    recipeMagimins = counts @ magimins
+    quantity = int(counts.sum())
+    cost = float(counts @ prices)
+    goodCounts = counts @ good
+    score = bestScore
+    everything = np.arange(len(names))
+    for move in range(movesPerSlot * maxIngredients):
+        used = np.flatnonzero(counts)
+        room = counts < caps
+        adds = everything[room] if quantity < maxIngredients else everything[:0]
+        swapsOut, swapsIn = np.nonzero(
+            room[None, :] & (used[:, None] != everything[None, :])
+        )
+        ins = np.concatenate([adds, np.full(len(used), -1), swapsIn])
+        outs = np.concatenate([np.full(len(adds), -1), used, used[swapsOut]])
+        movedIn = (ins >= 0)[:, None]
+        movedOut = (outs >= 0)[:, None]
+
+        moveMagimins = (
+            recipeMagimins + magimins[ins] * movedIn - magimins[outs] * movedOut
+        )
+        moveQuantity = quantity + movedIn[:, 0].astype(np.int64) - movedOut[:, 0]
+        moveCost = cost + (prices[ins] * movedIn[:, 0] - prices[outs] * movedOut[:, 0])
+        moveGood = goodCounts + good[ins] * movedIn - good[outs] * movedOut
+        scores, penalties = scoresOf(moveMagimins, moveQuantity, moveCost, moveGood)
+        scores[penalties > 0] = -np.inf
+        if not len(scores):
+            break
+        best = int(np.argmax(scores))
+        if scores[best] <= score:
+            break
+        score = scores[best]
+        if ins[best] >= 0:
+            counts[ins[best]] += 1
+        if outs[best] >= 0:
+            counts[outs[best]] -= 1
+        recipeMagimins = moveMagimins[best]
+        quantity = int(moveQuantity[best])
+        cost = float(moveCost[best])
+        goodCounts = moveGood[best]
+
+    return recipeSolution(
+        {names[i]: int(counts[i]) for i in np.flatnonzero(counts)},
+        potionType,
+        cauldron,
+    )
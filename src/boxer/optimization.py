@@ -1,40 +1,60 @@
+import logging
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
 from enum import Enum
+from fractions import Fraction
+from functools import lru_cache, partial
+from hashlib import sha256
+from math import ceil, floor, lcm
+from threading import Lock
+
+import numpy as np
 from pulp import (
     LpVariable,
     LpProblem,
     LpMaximize,
     LpMinimize,
     LpConstraint,
-    LpConstraintEQ,
     LpConstraintGE,
+    LpAffineExpression,
     LpStatus,
+    LpStatusInfeasible,
+    LpStatusNotSolved,
+    LpStatusOptimal,
+    LpConstraintLE,
+    LpInteger,
+    HiGHS,
     lpSum,
     PULP_CBC_CMD,
 )
 
+from boxer import gameInfo
 from boxer.gameInfo import (
     PotionTier,
     PotionType,
-    potionRatios,
-    starRequirements,
-    cauldronProperties,
     SensoryQuality,
     SensoryType,
-    ingredientData,
+    PotionIngredient,
+    sensoryIndex,
     PotionStability,
-    potionBasePrices,
-    englishToEnum,
 )
+from boxer.solutionCache import cacheVersion, missing, solutionCache
+from boxer.solveStats import span
 from boxer.stringManip import titleEnumName
 
 M = 8000
 eenyminy = 0.00001
 
+logger = logging.getLogger(__name__)
+
 
 class PotionOptimizationObjective(Enum):
     BEST_FOR_GIVEN_TYPE = 1
     CHEAPEST_FOR_GIVEN_STARS = 2
     MOST_PROFITABLE_BATCH = 3
+    MOST_PROFITABLE_PLAN = 4
 
 
 class BoxerException(Exception):
@@ -75,7 +95,10 @@ def assertProblemIsComplete(
         objective in PotionOptimizationObjective,
         "You have to specify a valid optimization objective!",
     )
-    if objective == PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE:
+    if objective in [
+        PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE,
+        PotionOptimizationObjective.MOST_PROFITABLE_PLAN,
+    ]:
         testOrComplain(
             starLevel is None and tier is None,
             "You can't specify star level or tier for this objective!",
@@ -87,427 +110,1605 @@ def assertProblemIsComplete(
         )
 
 
-def getBestPotion(
-    ingredientInventory=None,
-    cauldron=None,
-    potionType=None,
-    objective=PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+def assertNotStopped(stopEvent):
+    # Whoever asked for a recipe can give up on it by setting stopEvent, a
+    # threading.Event, which solves look at between phases
+    testOrComplain(stopEvent is None or not stopEvent.is_set(), "Stopped!")
+
+
+class StoppableCbc(PULP_CBC_CMD):
+    # PuLP's CBC, except that the subprocess is killed once stopEvent is set.
+    # PULP_CBC_CMD gives no hold on the subprocess it waits on, so this runs
+    # CBC the same way PuLP does for a MIP with these options, and checks on
+    # it every stopInterval seconds instead.
+    stopInterval = 0.02
+
+    def __init__(self, stopEvent, **kwargs):
+        super().__init__(**kwargs)
+        self.stopEvent = stopEvent
+
+    def solve_CBC(self, lp, use_mps=True):
+        tmpMps, tmpSol, tmpMst = self.create_tmp_files(lp.name, "mps", "sol", "mst")
+        vs, variablesNames, constraintsNames, _ = lp.writeMPS(tmpMps, rename=1)
+        args = [self.path, tmpMps]
+        if lp.sense == LpMaximize:
+            args.append("-max")
+        if self.optionsDict.get("warmStart", False):
+            self.writesol(tmpMst, lp, vs, variablesNames, constraintsNames)
+            args += ["-mips", tmpMst]
+        args += ["-solve", "-printingOptions", "all", "-solution", tmpSol]
+        try:
+            cbc = subprocess.Popen(
+                args,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+            )
+            while True:
+                try:
+                    returnCode = cbc.wait(self.stopInterval)
+                    break
+                except subprocess.TimeoutExpired:
+                    if self.stopEvent.is_set():
+                        cbc.kill()
+                        cbc.wait()
+                        raise BoxerException("Stopped!")
+            testOrComplain(
+                returnCode == 0 and os.path.exists(tmpSol),
+                f"CBC failed with exit code {returnCode}!",
+            )
+            status, values, reducedCosts, shadowPrices, slacks, solStatus = (
+                self.readsol_MPS(tmpSol, lp, vs, variablesNames, constraintsNames)
+            )
+        finally:
+            self.delete_tmp_files(tmpMps, tmpSol, tmpMst)
+        lp.assignVarsVals(values)
+        lp.assignVarsDj(reducedCosts)
+        lp.assignConsPi(shadowPrices)
+        lp.assignConsSlack(slacks, activity=True)
+        lp.assignStatus(status, solStatus)
+        return status
+
+
+def solveWithCbc(prob, warmStart=False, stopEvent=None):
+    # Runs CBC as a subprocess, exchanging the model through temporary files;
+    # with a stopEvent, the subprocess is killed as soon as it is set
+    if stopEvent is None:
+        prob.solve(PULP_CBC_CMD(msg=0, warmStart=warmStart))
+    else:
+        prob.solve(StoppableCbc(stopEvent, msg=0, warmStart=warmStart))
+    return LpStatus[prob.status]
+
+
+def solveWithHighs(prob, warmStart=False, stopEvent=None):
+    # In-process HiGHS through highspy. MIP starts made no difference to how
+    # long HiGHS takes on these models, so warmStart is ignored.
+    # HiGHS stops at a relative gap by default, which the quantity-weighted
+    # objectives turn into whole coins of cost
+    solver = HiGHS(msg=False, gapRel=0)
+    testOrComplain(
+        solver.available(), "The HiGHS solver needs the highspy package installed!"
+    )
+    if stopEvent is not None:
+        # Branch and bound checks in every so often, and gives up once stopped
+        def interrupt(callbackType, message, dataOut, dataIn, userData):
+            dataIn.user_interrupt = stopEvent.is_set()
+
+        solver.callbackTuple = (interrupt, None)
+        solver.callbacksToActivate = [
+            HiGHS.hscb.HighsCallbackType.kCallbackMipInterrupt
+        ]
+    prob.solve(solver)
+    # HiGHS reports integers to within its tolerance; snap them back so the
+    # solution reads exactly as it does from CBC
+    for v in prob.variables():
+        if v.cat == LpInteger and v.varValue is not None:
+            v.varValue = round(v.varValue)
+    return LpStatus[prob.status]
+
+
+def solveWithCpSat(prob, warmStart=False, stopEvent=None):
+    # In-process OR-Tools CP-SAT. The model only needs its coefficients scaled
+    # up to integers; the few continuous helper variables are carried as
+    # fixed-point integers in steps of continuousStep.
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError as error:
+        # Not only a missing package: ortools can also fail to load its own
+        # libraries, such as next to an already loaded highspy
+        raise BoxerException(
+            f"The CP-SAT solver needs the ortools package, which failed to load: "
+            f"{error}"
+        ) from error
+
+    continuousStep = Fraction(1, 10**6)
+    steps = {
+        v.name: 1 if v.cat == LpInteger else continuousStep for v in prob.variables()
+    }
+
+    def integerTerms(expression, constant=0):
+        coefficients = {
+            v: Fraction(float(c)).limit_denominator(10**6) * steps[v.name]
+            for v, c in expression.items()
+        }
+        constant = Fraction(float(constant)).limit_denominator(10**6)
+        scale = lcm(
+            constant.denominator, *(c.denominator for c in coefficients.values())
+        )
+        return (
+            {v: int(c * scale) for v, c in coefficients.items()},
+            int(constant * scale),
+        )
+
+    model = cp_model.CpModel()
+    variables = {}
+    for v in prob.variables():
+        variables[v.name] = model.NewIntVar(
+            -(2**31) if v.lowBound is None else ceil(v.lowBound / steps[v.name]),
+            2**31 if v.upBound is None else floor(v.upBound / steps[v.name]),
+            v.name,
+        )
+
+    for constraint in prob.constraints.values():
+        coefficients, constant = integerTerms(constraint, constraint.constant)
+        expression = (
+            sum(c * variables[v.name] for v, c in coefficients.items()) + constant
+        )
+        if constraint.sense == LpConstraintLE:
+            model.Add(expression <= 0)
+        elif constraint.sense == LpConstraintGE:
+            model.Add(expression >= 0)
+        else:
+            model.Add(expression == 0)
+
+    if warmStart:
+        for v in prob.variables():
+            if v.varValue is not None:
+                model.AddHint(variables[v.name], round(v.varValue / steps[v.name]))
+
+    coefficients, constant = integerTerms(prob.objective)
+    objective = sum(c * variables[v.name] for v, c in coefficients.items())
+    if prob.sense == LpMaximize:
+        model.Maximize(objective)
+    else:
+        model.Minimize(objective)
+
+    solver = cp_model.CpSolver()
+    status = solver.Solve(model)
+    if status == cp_model.OPTIMAL:
+        for v in prob.variables():
+            v.varValue = solver.Value(variables[v.name]) * steps[v.name]
+            if v.cat != LpInteger:
+                v.varValue = float(v.varValue)
+        prob.status = LpStatusOptimal
+    elif status == cp_model.INFEASIBLE:
+        prob.status = LpStatusInfeasible
+    else:
+        prob.status = LpStatusNotSolved
+    return LpStatus[prob.status]
+
+
+# Solver engines take a PuLP problem, solve it in place (leaving the optimum
+# in the variables' values) and return its PuLP status string. With
+# warmStart, the variables' values going in are a recipe to start from; those
+# that can give up part way once stopEvent is set.
+solverEngines = {
+    "cbc": solveWithCbc,
+    "highs": solveWithHighs,
+    "cpsat": solveWithCpSat,
+}
+defaultSolver = os.environ.get("BOXER_SOLVER", "cbc")
+
+# How PotionModel encodes star levels and stability: "bigM", with indicator
+# binaries and M, or "interval", which is tighter and answers the same
+formulations = ["bigM", "interval"]
+defaultFormulation = os.environ.get("BOXER_FORMULATION", "bigM")
+
+
+# How getOptimumPotionRecipe answers: "exact" solves to optimality, "fast"
+# only runs the heuristic, and "anytime" hands the heuristic's recipe to a
+# callback straight away and then solves exactly, starting from it
+modes = ["fast", "exact", "anytime"]
+
+
+def registerSolver(name, engine):
+    solverEngines[name] = engine
+
+
+def excludedBySenses(senses):
+    # Mask over ingredientOrder of ingredients that are bad in any of the senses
+    return (
+        gameInfo.ingredientSensory[:, [sensoryIndex[s] for s in senses]]
+        == SensoryQuality.NEGATIVE
+    ).any(axis=1)
+
+
+def dominatedIngredients(potionType, capacities, maxIngredients, senses):
+    # Ingredients that some optimal recipe can always do without, given how
+    # many of each (capacities) may be used and which senses are constrained.
+    # An ingredient goes when stand-ins costing no more, with the same
+    # magimins as far as the potion is concerned and no worse in those senses,
+    # have room for a full cauldron between them: every unit of it could move
+    # over to them.
+    senseColumns = [sensoryIndex[s] for s in senses]
+    sensory = gameInfo.ingredientSensory[:, senseColumns]
+    prices = gameInfo.ingredientPrices
+    ingredientIndex = gameInfo.ingredientIndex
+    dominated = set()
+    for members in gameInfo.potionCompatibility[potionType]["groups"]:
+        # Stand-ins always come before the ingredients they stand in for
+        members = sorted(
+            (ingredientIndex[name] for name in members if capacities.get(name)),
+            key=lambda i: (prices[i], -sensory[i].sum(), i),
+        )
+        kept = []
+        for j in members:
+            room = sum(
+                capacities[gameInfo.ingredientOrder[i]]
+                for i in kept
+                if (sensory[i] >= sensory[j]).all()
+            )
+            if room >= maxIngredients:
+                dominated.add(gameInfo.ingredientOrder[j])
+            else:
+                kept.append(j)
+    return dominated
+
+
+def reachableStarLevels(maxMagimins):
+    # How many base star levels a total of at most maxMagimins magimins can
+    # land in; the last threshold only closes off the level before it
+    thresholds = gameInfo.starRequirements.loc["magimins"].values
+    return min(
+        int(np.searchsorted(thresholds, maxMagimins, side="right")),
+        len(thresholds) - 1,
+    )
+
+
+def attainableMagimins(capacities, maxIngredients, maxMagimins):
+    # The most magimins a cauldron could hold with capacities, how many of each
+    # ingredient may be used, regardless of balance
+    totals = sorted(
+        (
+            (
+                int(gameInfo.ingredientMagimins[gameInfo.ingredientIndex[name]].sum()),
+                cap,
+            )
+            for name, cap in capacities.items()
+            if cap
+        ),
+        reverse=True,
+    )
+    room = maxIngredients
+    total = 0
+    for magimins, cap in totals:
+        used = min(int(cap), room)
+        total += magimins * used
+        room -= used
+        if not room:
+            break
+    return min(total, int(maxMagimins))
+
+
+def starLevelName(starLevel):
+    return f"{titleEnumName(PotionTier(starLevel // 6).name)} {starLevel % 6}-star"
+
+
+def openCapacities(
+    ingredientInventory,
+    cauldron,
+    potionType,
+    objective,
+    minStability=PotionStability.UNSTABLE,
+    sensoryData=None,
+):
+    # How many of each ingredient the model would be free to use once
+    # configured, leaving out those it can't use at all
+    maxIngredients = int(gameInfo.cauldronProperties.loc[cauldron]["maxIngredients"])
+    constrainedSenses = [
+        s
+        for s, quality in (sensoryData or {}).items()
+        if quality not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]
+    ]
+    excluded = excludedBySenses(constrainedSenses)
+    perfectOnly = needsPerfection(objective, minStability)
+    balanced = gameInfo.potionCompatibility[potionType]["balanced"]
+    capacities = {}
+    for name, quantity in ingredientInventory.items():
+        if excluded[gameInfo.ingredientIndex[name]]:
+            continue
+        if perfectOnly and name not in balanced:
+            continue
+        if objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH:
+            capacities[name] = maxIngredients
+        elif quantity > 0:
+            capacities[name] = min(int(quantity), maxIngredients)
+    return capacities
+
+
+def infeasibilityReasons(
+    ingredientInventory,
+    cauldron,
+    potionType,
+    objective,
     minStability=PotionStability.UNSTABLE,
     starLevel=None,
     sensoryData=None,
 ):
-    # Establish common vars
-    workingCauldron = cauldronProperties.loc[cauldron]
-    magiminThresholds = starRequirements.loc["magimins"]
+    # Why no recipe can possibly meet the request, found without a solver from
+    # what the model would have to work with; empty when one might. Only
+    # cases that are certain are caught, so the solver can still come back
+    # with nothing.
+    workingCauldron = gameInfo.cauldronProperties.loc[cauldron]
+    maxIngredients = int(workingCauldron["maxIngredients"])
+    potionName = gameInfo.enumToEnglish[potionType]
+    constrainedSenses = [
+        s
+        for s, quality in (sensoryData or {}).items()
+        if quality not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]
+    ]
 
-    # Declare maximization problem
-    prob = None
-    if objective == PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE:
-        prob = LpProblem("Best Potion", LpMaximize)
-    elif objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
-        prob = LpProblem("Cheapest Potion", LpMinimize)
-    elif objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH:
-        prob = LpProblem("Most Profitable Batch", LpMaximize)
+    perfectOnly = needsPerfection(objective, minStability)
+    capacities = openCapacities(
+        ingredientInventory, cauldron, potionType, objective, minStability, sensoryData
+    )
+
+    leftOut = []
+    if constrainedSenses:
+        leftOut.append("those bad in a sense asked for")
+    if perfectOnly:
+        leftOut.append("those unfit for a perfect potion")
+    leftOut = f" (leaving out {' and '.join(leftOut)})" if leftOut else ""
+    rows = [gameInfo.ingredientIndex[name] for name in capacities]
+
+    reasons = []
+    ratios = gameInfo.potionRatios.loc[potionType]
+    for column, (dimension, ratio) in enumerate(ratios.items()):
+        if ratio and not gameInfo.ingredientMagimins[rows, column].any():
+            reasons.append(
+                f"a {potionName} needs {dimension} magimins, and no ingredient has "
+                f"any{leftOut}"
+            )
+    for s in constrainedSenses:
+        if (
+            sensoryData[s] == SensoryQuality.POSITIVE
+            and not (
+                gameInfo.ingredientSensory[rows, sensoryIndex[s]]
+                == SensoryQuality.POSITIVE
+            ).any()
+        ):
+            reasons.append(
+                f"no ingredient has a good {titleEnumName(s.name).lower()}{leftOut}"
+            )
+    if starLevel is not None:
+        # Even brewed perfectly, the most magimins they fit in the cauldron
+        # have to reach the star level
+        magimins = attainableMagimins(
+            capacities, maxIngredients, workingCauldron["maxMagimins"]
+        )
+        mostStars = min(reachableStarLevels(magimins) + 1, len(PotionTier) * 6 - 1)
+        if starLevel > mostStars:
+            reasons.append(
+                f"a {starLevelName(int(starLevel))} potion is out of reach, as "
+                f"this cauldron tops out at {starLevelName(mostStars)} with "
+                "these ingredients"
+            )
+    return reasons
+
+
+def assertFeasible(*args, **kwargs):
+    # infeasibilityReasons, raised as a BoxerException
+    reasons = infeasibilityReasons(*args, **kwargs)
+    testOrComplain(not reasons, f"No recipe is possible: {'; '.join(reasons)}!")
+
+
+class PotionModel:
+    # Constraint skeleton for one (cauldron, potionType, objective) combination.
+    # Everything that depends on the request itself (inventory, sensory
+    # requirements, minimum stability and star level) is expressed through
+    # variable bounds and right-hand sides, so the same model can be re-solved
+    # without being rebuilt. Models for potions that have to come out perfect
+    # leave out every ingredient with magimins outside the potion's ratio.
+    def __init__(
+        self, cauldron, potionType, objective, perfectOnly=False, formulation="bigM"
+    ):
+        self.cauldron = cauldron
+        self.potionType = potionType
+        self.objective = objective
+        self.perfectOnly = perfectOnly
+        self.formulation = formulation
+        self.lock = Lock()
+        # The ingredients of the last recipe solved for, to start the next
+        # solve from if nothing better is given
+        self.lastRecipe = None
+
+        # Establish common vars
+        workingCauldron = gameInfo.cauldronProperties.loc[cauldron]
+        self.maxIngredients = workingCauldron["maxIngredients"]
+        self.maxMagimins = workingCauldron["maxMagimins"]
+        magiminThresholds = gameInfo.starRequirements.loc["magimins"]
+        ingredientIndex = gameInfo.ingredientIndex
+        magiminRows = gameInfo.ingredientMagimins.tolist()
+        sensoryRows = gameInfo.ingredientSensory.tolist()
+        prices = gameInfo.ingredientPrices.tolist()
+
+        # Declare maximization problem
+        prob = None
+        if objective == PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE:
+            prob = LpProblem("Best Potion", LpMaximize)
+        elif objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
+            prob = LpProblem("Cheapest Potion", LpMinimize)
+        elif objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH:
+            prob = LpProblem("Most Profitable Batch", LpMaximize)
+        self.prob = prob
+
+        # One LpVariable per usable ingredient; configure() sets the upper bounds
+        balanced = gameInfo.potionCompatibility[potionType]["balanced"]
+        inventoryVariables = {
+            name: LpVariable(
+                f"Ingredient_{name}",
+                cat="Integer",
+                lowBound=0,
+                upBound=0,
+            )
+            for name in PotionIngredient
+            if not perfectOnly or name in balanced
+        }
+        self.inventoryVariables = inventoryVariables
 
-    # Convert inventory dataframe to LpVariables
-    inventoryVariables = {
-        name: LpVariable(
-            f"Ingredient_{name}",
+        ingredientQuantity = lpSum(inventoryVariables.values())
+
+        # Add sensory constraints, switched on by raising their right-hand side
+        self.sensoryConstraints = {}
+        for s in SensoryType:
+            for quality in [SensoryQuality.NEUTRAL, SensoryQuality.POSITIVE]:
+                constraint = LpConstraint(
+                    lpSum(
+                        v
+                        for k, v in inventoryVariables.items()
+                        if sensoryRows[ingredientIndex[k]][sensoryIndex[s]] >= quality
+                    ),
+                    sense=LpConstraintGE,
+                    rhs=0,
+                    name=f"_Sensory_{s}_{quality.name}_MustInclude",
+                )
+                prob += constraint
+                self.sensoryConstraints[s, quality] = constraint
+
+        # Define magimin counts for each type based on ingredients used
+        magiminAmount_A = LpAffineExpression(
+            (v, magiminRows[ingredientIndex[k]][0])
+            for k, v in inventoryVariables.items()
+            if magiminRows[ingredientIndex[k]][0]
+        )
+        magiminAmount_B = LpAffineExpression(
+            (v, magiminRows[ingredientIndex[k]][1])
+            for k, v in inventoryVariables.items()
+            if magiminRows[ingredientIndex[k]][1]
+        )
+        magiminAmount_C = LpAffineExpression(
+            (v, magiminRows[ingredientIndex[k]][2])
+            for k, v in inventoryVariables.items()
+            if magiminRows[ingredientIndex[k]][2]
+        )
+        magiminAmount_D = LpAffineExpression(
+            (v, magiminRows[ingredientIndex[k]][3])
+            for k, v in inventoryVariables.items()
+            if magiminRows[ingredientIndex[k]][3]
+        )
+        magiminAmount_E = LpAffineExpression(
+            (v, magiminRows[ingredientIndex[k]][4])
+            for k, v in inventoryVariables.items()
+            if magiminRows[ingredientIndex[k]][4]
+        )
+
+        # Define total magimins affine expression
+        totalMagimins = lpSum(
+            [
+                magiminAmount_A,
+                magiminAmount_B,
+                magiminAmount_C,
+                magiminAmount_D,
+                magiminAmount_E,
+            ]
+        )
+
+        # Define a few constants
+        ratioSum = gameInfo.potionRatios.loc[potionType].sum()
+
+        # Normalize potion ratios to sum to 1
+        magiminRatioA = gameInfo.potionRatios.loc[potionType]["A"] / ratioSum
+        magiminRatioB = gameInfo.potionRatios.loc[potionType]["B"] / ratioSum
+        magiminRatioC = gameInfo.potionRatios.loc[potionType]["C"] / ratioSum
+        magiminRatioD = gameInfo.potionRatios.loc[potionType]["D"] / ratioSum
+        magiminRatioE = gameInfo.potionRatios.loc[potionType]["E"] / ratioSum
+
+        # Make sure at least 1 magimin of each required piece is present
+        if magiminRatioA > 0:
+            prob += magiminAmount_A >= 1
+        if magiminRatioB > 0:
+            prob += magiminAmount_B >= 1
+        if magiminRatioC > 0:
+            prob += magiminAmount_C >= 1
+        if magiminRatioD > 0:
+            prob += magiminAmount_D >= 1
+        if magiminRatioE > 0:
+            prob += magiminAmount_E >= 1
+
+        magiminOff_A = LpVariable(
+            "magiminDeviance_A",
+            lowBound=0,
+            upBound=workingCauldron["maxMagimins"],
             cat="Integer",
+        )
+        prob += magiminOff_A >= totalMagimins * magiminRatioA - magiminAmount_A
+        prob += magiminOff_A >= magiminAmount_A - totalMagimins * magiminRatioA
+
+        magiminOff_B = LpVariable(
+            "magiminDeviance_B",
             lowBound=0,
-            upBound=workingCauldron["maxIngredients"]
-            if objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH
-            else min(quantity, workingCauldron["maxIngredients"]),
+            upBound=workingCauldron["maxMagimins"],
+            cat="Integer",
+        )
+        prob += magiminOff_B >= totalMagimins * magiminRatioB - magiminAmount_B
+        prob += magiminOff_B >= magiminAmount_B - totalMagimins * magiminRatioB
+
+        magiminOff_C = LpVariable(
+            "magiminDeviance_C",
+            lowBound=0,
+            upBound=workingCauldron["maxMagimins"],
+            cat="Integer",
+        )
+        prob += magiminOff_C >= totalMagimins * magiminRatioC - magiminAmount_C
+        prob += magiminOff_C >= magiminAmount_C - totalMagimins * magiminRatioC
+
+        magiminOff_D = LpVariable(
+            "magiminDeviance_D",
+            lowBound=0,
+            upBound=workingCauldron["maxMagimins"],
+            cat="Integer",
+        )
+        prob += magiminOff_D >= totalMagimins * magiminRatioD - magiminAmount_D
+        prob += magiminOff_D >= magiminAmount_D - totalMagimins * magiminRatioD
+
+        magiminOff_E = LpVariable(
+            "magiminDeviance_E",
+            lowBound=0,
+            upBound=workingCauldron["maxMagimins"],
+            cat="Integer",
+        )
+        prob += magiminOff_E >= totalMagimins * magiminRatioE - magiminAmount_E
+        prob += magiminOff_E >= magiminAmount_E - totalMagimins * magiminRatioE
+
+        totalDeviance = lpSum(
+            [magiminOff_A, magiminOff_B, magiminOff_C, magiminOff_D, magiminOff_E]
         )
-        for name, quantity in ingredientInventory.items()
-    }
 
-    ingredientQuantity = lpSum(inventoryVariables.values())
+        prob += totalDeviance <= totalMagimins / 2
 
-    # Add sensory constraints
-    for s in sensoryData.keys():
-        if sensoryData[s] not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]:
-            prob += LpConstraint(
-                lpSum(
-                    v
-                    for k, v in inventoryVariables.items()
-                    if ingredientData[k][s] == SensoryQuality.NEGATIVE
+        # Star levels past the cauldron's magimin cap can never be reached
+        starLevels = reachableStarLevels(workingCauldron["maxMagimins"])
+
+        # Variables only the bigM model has, for setStart() to fill in
+        starDummies = []
+        stabilityHelpers = []
+
+        if formulation == "interval":
+            # One binary per star level, picking the interval of magimin
+            # totals that level covers; no big-M needed
+            magiminStarVariables = {
+                f"magiminStar_{i}": LpVariable(f"magiminStar_{i}", cat="Binary")
+                for i in range(starLevels)
+            }
+            prob += totalMagimins >= lpSum(
+                a * v
+                for v, a in zip(magiminStarVariables.values(), magiminThresholds.values)
+            )
+            prob += totalMagimins <= lpSum(
+                (b - 1) * v
+                for v, b in zip(
+                    magiminStarVariables.values(), magiminThresholds.values[1:]
+                )
+            )
+
+            perfectStarBonus = LpVariable("perfectStarBonus", cat="Binary")
+            veryStableStarBonus = LpVariable("veryStableStarBonus", cat="Binary")
+            stableStarBonus = LpVariable("stableStarBonus", cat="Binary")
+            unstableStarPenalty = LpVariable("unstableStarPenalty", cat="Binary")
+
+            # Each stability allows a deviance of up to so many tenths of the
+            # magimins and needs more than the one before it. Counting in
+            # tenths keeps every edge a whole number, and since the deviance
+            # never passes half the magimins, the cauldron's magimin cap bounds
+            # how far off an edge can be
+            maxMagimins = int(workingCauldron["maxMagimins"])
+            previousShare = None
+            for share, variable in zip(
+                [0, 1, 3, 5],
+                [
+                    perfectStarBonus,
+                    veryStableStarBonus,
+                    stableStarBonus,
+                    unstableStarPenalty,
+                ],
+            ):
+                prob += 10 * totalDeviance - share * totalMagimins <= (
+                    5 - share
+                ) * maxMagimins * (1 - variable)
+                if previousShare is not None:
+                    prob += 10 * totalDeviance >= previousShare * totalMagimins + 1 - (
+                        previousShare * maxMagimins + 1
+                    ) * (1 - variable)
+                previousShare = share
+        else:
+            # Convert magimin count to star count
+            magiminStarVariables = {
+                f"magiminStar_{i}": LpVariable(f"magiminStar_{i}", cat="Binary")
+                for i in range(starLevels)
+            }
+            magiminStarDummyArray_0 = {
+                f"magiminStar_{i}_dummy0": LpVariable(
+                    f"magiminStar_{i}_dummy0", cat="Binary"
+                )
+                for i in range(starLevels)
+            }
+            magiminStarDummyArray_1 = {
+                f"magiminStar_{i}_dummy1": LpVariable(
+                    f"magiminStar_{i}_dummy1", cat="Binary"
+                )
+                for i in range(starLevels)
+            }
+            for v, t_0, t_1, a, b in zip(
+                magiminStarVariables.values(),
+                magiminStarDummyArray_0.values(),
+                magiminStarDummyArray_1.values(),
+                magiminThresholds.values,
+                magiminThresholds.values[1:],
+            ):
+                prob += a * v <= totalMagimins
+                prob += totalMagimins <= (b - 1) * v + M * (1 - v)
+                prob += totalMagimins - a <= M * t_0
+                prob += (b - 1) - totalMagimins <= M * t_1
+                prob += v >= t_0 + t_1 - 1
+
+            # Convert stability to star bonus
+            perfectStarBonus = LpVariable("perfectStarBonus", cat="Binary")
+            veryStableStarBonus = LpVariable("veryStableStarBonus", cat="Binary")
+            veryStableStarLowerBoundProduct = LpVariable(
+                "veryStableStarProduct", cat="Continuous"
+            )
+            veryStableStarDummy0 = LpVariable("veryStableStarDummy0", cat="Binary")
+            veryStableStarDummy1 = LpVariable("veryStableStarDummy1", cat="Binary")
+            stableStarBonus = LpVariable("stableStarBonus", cat="Binary")
+            stableStarLowerBoundProduct = LpVariable(
+                "stableStarProduct", cat="Continuous"
+            )
+            stableStarDummy0 = LpVariable("stableStarDummy0", cat="Binary")
+            stableStarDummy1 = LpVariable("stableStarDummy1", cat="Binary")
+            unstableStarPenalty = LpVariable("unstableStarPenalty", cat="Binary")
+            unstableStarLowerBoundProduct = LpVariable(
+                "unstableStarProduct", cat="Continuous"
+            )
+            unstableStarDummy0 = LpVariable("unstableStarDummy0", cat="Binary")
+            unstableStarDummy1 = LpVariable("unstableStarDummy1", cat="Binary")
+
+            # Perfect potions require a perfect balance
+            prob += totalDeviance <= M * (1 - perfectStarBonus)
+            prob += (1 - perfectStarBonus) <= M * totalDeviance
+
+            # Very stable potions require no more than 10% deviance
+            lowerBound_veryStable = eenyminy
+            upperBound_veryStable = 0.1
+            prob += veryStableStarLowerBoundProduct <= M * veryStableStarBonus
+            prob += (
+                veryStableStarLowerBoundProduct <= totalMagimins * lowerBound_veryStable
+            )
+            prob += veryStableStarLowerBoundProduct >= lowerBound_veryStable - M * (
+                1 - veryStableStarBonus
+            )
+            prob += veryStableStarLowerBoundProduct >= 0
+            prob += veryStableStarLowerBoundProduct <= totalDeviance
+            prob += totalDeviance <= upperBound_veryStable * totalMagimins + M * (
+                1 - veryStableStarBonus
+            )
+            prob += (
+                totalDeviance - (totalMagimins * lowerBound_veryStable)
+                <= M * veryStableStarDummy0
+            )
+            prob += (
+                totalMagimins * upperBound_veryStable
+            ) - totalDeviance <= M * veryStableStarDummy1
+            prob += (
+                veryStableStarBonus >= veryStableStarDummy0 + veryStableStarDummy1 - 1
+            )
+
+            # Stable potions require between (10% and 30%] deviance
+            lowerBound_stable = 0.1 + eenyminy
+            upperBound_stable = 0.30
+            prob += stableStarLowerBoundProduct <= M * stableStarBonus
+            prob += stableStarLowerBoundProduct <= totalMagimins * lowerBound_stable
+            prob += stableStarLowerBoundProduct >= lowerBound_stable - M * (
+                1 - stableStarBonus
+            )
+            prob += stableStarLowerBoundProduct >= 0
+            prob += stableStarLowerBoundProduct <= totalDeviance
+            prob += totalDeviance <= upperBound_stable * totalMagimins + M * (
+                1 - stableStarBonus
+            )
+            prob += totalDeviance - lowerBound_stable <= M * stableStarDummy0
+            prob += upperBound_stable - totalDeviance <= M * stableStarDummy1
+            prob += stableStarBonus >= stableStarDummy0 + stableStarDummy1 - 1
+
+            # Unstable potions require at most 50% deviance
+            lowerBound_unstable = 0.30 + eenyminy
+            upperBound_unstable = 0.5
+            prob += unstableStarLowerBoundProduct <= M * unstableStarPenalty
+            prob += unstableStarLowerBoundProduct <= totalMagimins * lowerBound_unstable
+            prob += unstableStarLowerBoundProduct >= lowerBound_unstable - M * (
+                1 - unstableStarPenalty
+            )
+            prob += unstableStarLowerBoundProduct >= 0
+            prob += unstableStarLowerBoundProduct <= totalDeviance
+            prob += totalDeviance <= upperBound_unstable * totalMagimins + M * (
+                1 - unstableStarPenalty
+            )
+            prob += (
+                totalDeviance - (totalMagimins * lowerBound_unstable)
+                <= M * unstableStarDummy0
+            )
+            prob += (
+                totalMagimins * upperBound_unstable
+            ) - totalDeviance <= M * unstableStarDummy1
+            prob += unstableStarPenalty >= unstableStarDummy0 + unstableStarDummy1 - 1
+
+            starDummies = list(
+                zip(magiminStarDummyArray_0.values(), magiminStarDummyArray_1.values())
+            )
+            # The stable band's dummies compare with its bounds as they are,
+            # the others' with them as shares of the magimins
+            stabilityHelpers = [
+                (
+                    veryStableStarBonus,
+                    veryStableStarLowerBoundProduct,
+                    veryStableStarDummy0,
+                    veryStableStarDummy1,
+                    lowerBound_veryStable,
+                    upperBound_veryStable,
+                    True,
                 ),
-                sense=LpConstraintEQ,
-                rhs=0,
-                name=f"_Sensory_{s}_MustExclude",
-            )
-            prob += LpConstraint(
-                lpSum(
-                    v
-                    for k, v in inventoryVariables.items()
-                    if ingredientData[k][s] >= sensoryData[s]
+                (
+                    stableStarBonus,
+                    stableStarLowerBoundProduct,
+                    stableStarDummy0,
+                    stableStarDummy1,
+                    lowerBound_stable,
+                    upperBound_stable,
+                    False,
                 ),
-                sense=LpConstraintGE,
-                rhs=1,
-                name=f"_Sensory_{s}_MustInclude",
+                (
+                    unstableStarPenalty,
+                    unstableStarLowerBoundProduct,
+                    unstableStarDummy0,
+                    unstableStarDummy1,
+                    lowerBound_unstable,
+                    upperBound_unstable,
+                    True,
+                ),
+            ]
+
+        # Anything else is, of course, unstable
+        prob += (
+            perfectStarBonus
+            + veryStableStarBonus
+            + stableStarBonus
+            + unstableStarPenalty
+            == 1
+        )
+
+        # Stability may not be less than 50%
+        prob += totalDeviance <= totalMagimins * 0.5
+
+        # Specify cauldron constraints
+        prob += totalMagimins <= workingCauldron["maxMagimins"]
+        prob += ingredientQuantity <= workingCauldron["maxIngredients"]
+        prob += 1 <= ingredientQuantity
+
+        starsFromStability = (
+            2 * perfectStarBonus
+            + 1 * veryStableStarBonus
+            + 0 * stableStarBonus
+            - 1 * unstableStarPenalty
+        )
+        starsFromMagimins = lpSum(
+            [index * i for index, i in enumerate(magiminStarVariables.values())]
+        )
+        totalStars = starsFromMagimins + starsFromStability
+        prob += sum(magiminStarVariables.values()) == 1
+
+        basePotionPrice = lpSum(
+            [
+                v * p
+                for v, p in zip(
+                    magiminStarVariables.values(), gameInfo.potionBasePrices[potionType]
+                )
+            ]
+        )
+
+        ingredientCosts = LpAffineExpression(
+            (v, prices[ingredientIndex[k]]) for k, v in inventoryVariables.items()
+        )
+
+        # Fiddle with the objective a bit
+        self.starLevelConstraint = None
+        if objective == PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE:
+            prob += totalStars  # + ingredientQuantity / 2
+        elif objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
+            self.starLevelConstraint = starsFromMagimins + starsFromStability >= 0
+            prob += self.starLevelConstraint
+            prob += ingredientCosts - (M * ingredientQuantity)
+        elif objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH:
+            prob += ingredientQuantity == workingCauldron["maxIngredients"]
+            prob += perfectStarBonus == 1
+            # Product of base potion price and the number of ingredients
+
+            prob += (
+                basePotionPrice * workingCauldron["maxIngredients"] - ingredientCosts
             )
 
-    # Define magimin counts for each type based on ingredients used
-    magiminAmount_A = lpSum(
-        ingredientData[k]["A"] * v for k, v in inventoryVariables.items()
-    )
-    magiminAmount_B = lpSum(
-        ingredientData[k]["B"] * v for k, v in inventoryVariables.items()
-    )
-    magiminAmount_C = lpSum(
-        ingredientData[k]["C"] * v for k, v in inventoryVariables.items()
-    )
-    magiminAmount_D = lpSum(
-        ingredientData[k]["D"] * v for k, v in inventoryVariables.items()
-    )
-    magiminAmount_E = lpSum(
-        ingredientData[k]["E"] * v for k, v in inventoryVariables.items()
-    )
+        self.ingredientQuantity = ingredientQuantity
+        self.magiminAmounts = {
+            "A": magiminAmount_A,
+            "B": magiminAmount_B,
+            "C": magiminAmount_C,
+            "D": magiminAmount_D,
+            "E": magiminAmount_E,
+        }
+        self.totalMagimins = totalMagimins
+        self.totalDeviance = totalDeviance
+        self.devianceVariables = [
+            magiminOff_A,
+            magiminOff_B,
+            magiminOff_C,
+            magiminOff_D,
+            magiminOff_E,
+        ]
+        self.magiminStarVariables = magiminStarVariables
+        self.starDummies = starDummies
+        self.stabilityHelpers = stabilityHelpers
+        self.stabilityVariables = {
+            PotionStability.PERFECT: perfectStarBonus,
+            PotionStability.VERY_STABLE: veryStableStarBonus,
+            PotionStability.STABLE: stableStarBonus,
+            PotionStability.UNSTABLE: unstableStarPenalty,
+        }
+        self.totalStars = totalStars
+        self.basePotionPrice = basePotionPrice
+        self.ingredientCosts = ingredientCosts
 
-    # Define total magimins affine expression
-    totalMagimins = lpSum(
-        [
-            magiminAmount_A,
-            magiminAmount_B,
-            magiminAmount_C,
-            magiminAmount_D,
-            magiminAmount_E,
+    def configure(
+        self,
+        ingredientInventory,
+        minStability=PotionStability.UNSTABLE,
+        starLevel=None,
+        sensoryData=None,
+        ownedOnly=False,
+    ):
+        sensoryData = sensoryData or {}
+
+        # Senses with a requirement rule out every ingredient that is bad in them
+        constrainedSenses = [
+            s
+            for s, quality in sensoryData.items()
+            if quality not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]
         ]
-    )
 
-    # Define a few constants
-    ratioSum = potionRatios.loc[potionType].sum()
-
-    # Normalize potion ratios to sum to 1
-    magiminRatioA = potionRatios.loc[potionType]["A"] / ratioSum
-    magiminRatioB = potionRatios.loc[potionType]["B"] / ratioSum
-    magiminRatioC = potionRatios.loc[potionType]["C"] / ratioSum
-    magiminRatioD = potionRatios.loc[potionType]["D"] / ratioSum
-    magiminRatioE = potionRatios.loc[potionType]["E"] / ratioSum
-
-    # Make sure at least 1 magimin of each required piece is present
-    if magiminRatioA > 0:
-        prob += magiminAmount_A >= 1
-    if magiminRatioB > 0:
-        prob += magiminAmount_B >= 1
-    if magiminRatioC > 0:
-        prob += magiminAmount_C >= 1
-    if magiminRatioD > 0:
-        prob += magiminAmount_D >= 1
-    if magiminRatioE > 0:
-        prob += magiminAmount_E >= 1
-
-    magiminOff_A = LpVariable(
-        "magiminDeviance_A",
-        lowBound=0,
-        upBound=workingCauldron["maxMagimins"],
-        cat="Integer",
-    )
-    prob += magiminOff_A >= totalMagimins * magiminRatioA - magiminAmount_A
-    prob += magiminOff_A >= magiminAmount_A - totalMagimins * magiminRatioA
-
-    magiminOff_B = LpVariable(
-        "magiminDeviance_B",
-        lowBound=0,
-        upBound=workingCauldron["maxMagimins"],
-        cat="Integer",
-    )
-    prob += magiminOff_B >= totalMagimins * magiminRatioB - magiminAmount_B
-    prob += magiminOff_B >= magiminAmount_B - totalMagimins * magiminRatioB
-
-    magiminOff_C = LpVariable(
-        "magiminDeviance_C",
-        lowBound=0,
-        upBound=workingCauldron["maxMagimins"],
-        cat="Integer",
+        excluded = excludedBySenses(constrainedSenses)
+
+        # Inventory quantities become the ingredient variables' upper bounds
+        for name, variable in self.inventoryVariables.items():
+            if (
+                name not in ingredientInventory
+                or excluded[gameInfo.ingredientIndex[name]]
+            ):
+                variable.upBound = 0
+            elif (
+                self.objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH
+                and not ownedOnly
+            ):
+                # Profitable batches may buy whatever is missing
+                variable.upBound = self.maxIngredients
+            else:
+                variable.upBound = min(ingredientInventory[name], self.maxIngredients)
+
+        # Star levels beyond what the open ingredients can fill stay off
+        reachable = reachableStarLevels(
+            attainableMagimins(
+                {k: v.upBound for k, v in self.inventoryVariables.items()},
+                self.maxIngredients,
+                self.maxMagimins,
+            )
+        )
+        for i, variable in enumerate(self.magiminStarVariables.values()):
+            variable.upBound = 1 if i < reachable else 0
+
+        for (s, quality), constraint in self.sensoryConstraints.items():
+            constraint.changeRHS(
+                1 if s in constrainedSenses and sensoryData[s] == quality else 0
+            )
+
+        # Minimum stability requirement
+        for stability, variable in self.stabilityVariables.items():
+            variable.upBound = 1 if stability.value >= minStability.value else 0
+
+        if self.starLevelConstraint is not None:
+            self.starLevelConstraint.changeRHS(starLevel)
+
+    def presolve(self, sensoryData=None):
+        # Closes off the dominated ingredients among those configure() left
+        # open. Only for plain best-recipe solves: other recipes that tie with
+        # the best one, or a change of prices, can still need them.
+        constrainedSenses = [
+            s
+            for s, quality in (sensoryData or {}).items()
+            if quality not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]
+        ]
+        dominated = dominatedIngredients(
+            self.potionType,
+            {k: v.upBound for k, v in self.inventoryVariables.items()},
+            self.maxIngredients,
+            constrainedSenses,
+        )
+        for name in dominated:
+            self.inventoryVariables[name].upBound = 0
+        logger.info(
+            "Presolve fixed %d of %d open ingredient variables at zero",
+            len(dominated),
+            sum(1 for v in self.inventoryVariables.values() if v.upBound)
+            + len(dominated),
+        )
+        return dominated
+
+    def excludeRecipe(self, prob, ingredients, cut):
+        # Adds no-good cut number cut to prob (a copy of self.prob), forcing
+        # its next solve to differ from ingredients in the amount of at least
+        # one ingredient: one of those it uses has to go down or up, or
+        # something else has to come in
+        bigM = self.maxIngredients + 1
+        changes = []
+        for slot, (name, amount) in enumerate(ingredients.items()):
+            variable = self.inventoryVariables[name]
+            fewer = LpVariable(f"_NoGood_{cut}_{slot}_Fewer", cat="Binary")
+            more = LpVariable(f"_NoGood_{cut}_{slot}_More", cat="Binary")
+            prob += variable <= amount - 1 + bigM * (1 - fewer)
+            prob += variable >= (amount + 1) * more
+            changes += [fewer, more]
+        other = LpVariable(f"_NoGood_{cut}_Other", cat="Binary")
+        prob += (
+            lpSum(v for k, v in self.inventoryVariables.items() if k not in ingredients)
+            >= other
+        )
+        prob += lpSum(changes + [other]) >= 1
+
+    def setStart(self, ingredients):
+        # Loads a recipe into the variables for the solver to start from,
+        # along with the values of everything else that follows from it. Does
+        # nothing and returns False if the recipe can't be brewed as the model
+        # is configured.
+        if any(
+            name not in self.inventoryVariables
+            or amount > (self.inventoryVariables[name].upBound or 0)
+            for name, amount in ingredients.items()
+        ):
+            return False
+        figures = evaluateRecipes(
+            recipeArray([ingredients]), self.potionType, self.cauldron
+        )
+        baseStars = int(figures["baseStars"][0])
+        stabilityIndex = int(figures["stabilityIndex"][0])
+        if (
+            not figures["feasible"][0]
+            or baseStars >= len(self.magiminStarVariables)
+            or not list(self.magiminStarVariables.values())[baseStars].upBound
+            or not list(self.stabilityVariables.values())[stabilityIndex].upBound
+        ):
+            return False
+
+        for name, variable in self.inventoryVariables.items():
+            variable.setInitialValue(ingredients.get(name, 0))
+        total = int(figures["totalMagimins"][0])
+        deviance = int(figures["deviance"][0])
+        ratios = gameInfo.potionRatios.loc[self.potionType].astype(int).tolist()
+        ratioSum = sum(ratios)
+        for variable, magimins, ratio in zip(
+            self.devianceVariables, figures["magimins"][0].tolist(), ratios
+        ):
+            variable.setInitialValue(
+                -(-abs(magimins * ratioSum - total * ratio) // ratioSum)
+            )
+        for i, variable in enumerate(self.magiminStarVariables.values()):
+            variable.setInitialValue(int(i == baseStars))
+        for i, variable in enumerate(self.stabilityVariables.values()):
+            variable.setInitialValue(int(i == stabilityIndex))
+
+        thresholds = gameInfo.starRequirements.loc["magimins"].values
+        for (above, below), a, b in zip(self.starDummies, thresholds, thresholds[1:]):
+            above.setInitialValue(int(total > a))
+            below.setInitialValue(int(total < b - 1))
+        for (
+            variable,
+            product,
+            above,
+            below,
+            lowerBound,
+            upperBound,
+            relative,
+        ) in self.stabilityHelpers:
+            scale = total if relative else 1
+            product.setInitialValue(
+                min(total * lowerBound, deviance) if variable.varValue else 0
+            )
+            above.setInitialValue(int(deviance > scale * lowerBound))
+            below.setInitialValue(int(deviance < scale * upperBound))
+        return True
+
+    def extractSolution(self):
+        return buildSolution(
+            self.potionType,
+            ingredients={
+                i: int(j.value())
+                for i, j in self.inventoryVariables.items()
+                if j.value()
+            },
+            magimins={k: int(v.value()) for k, v in self.magiminAmounts.items()},
+            totalMagimins=self.totalMagimins.value(),
+            deviance=self.totalDeviance.value(),
+            baseStars=sum(
+                ind * i.value()
+                for ind, i in enumerate(self.magiminStarVariables.values())
+                if i.value()
+            ),
+            stabilityIndex=sum(
+                [
+                    ind
+                    for ind, i in enumerate(self.stabilityVariables.values())
+                    if i.value()
+                ]
+            ),
+            totalStars=self.totalStars.value(),
+            ingredientsQuantity=self.ingredientQuantity.value(),
+            basePotionPrice=self.basePotionPrice.value(),
+            ingredientCosts=self.ingredientCosts.value(),
+        )
+
+
+def buildSolution(
+    potionType,
+    ingredients,
+    magimins,
+    totalMagimins,
+    deviance,
+    baseStars,
+    stabilityIndex,
+    totalStars,
+    ingredientsQuantity,
+    basePotionPrice,
+    ingredientCosts,
+):
+    # Assembles the solution dict handed back to callers from a solved recipe's
+    # figures; stabilityIndex counts from Perfect (0) down to Unstable (3)
+    solution = {}
+    solution["ingredients"] = ingredients
+    solution["magimins"] = magimins
+    solution["sensory"] = {}
+    for sense in SensoryType:
+        goodCount = badCount = 0
+        for item, amt in solution["ingredients"].items():
+            quality = gameInfo.ingredientSensory[
+                gameInfo.ingredientIndex[item], sensoryIndex[sense]
+            ]
+            if quality == SensoryQuality.POSITIVE:
+                goodCount += amt
+            elif quality == SensoryQuality.NEGATIVE:
+                badCount += amt
+        if goodCount and badCount:
+            totalCount = goodCount + badCount
+            goodFraction = goodCount / totalCount
+            badFraction = badCount / totalCount
+            solution["sensory"][sense] = {
+                "good": goodFraction,
+                "bad": badFraction,
+            }
+        elif goodCount:
+            solution["sensory"][sense] = {
+                "good": 1,
+                "bad": 0,
+            }
+        elif badCount:
+            solution["sensory"][sense] = {
+                "good": 0,
+                "bad": 1,
+            }
+    solution["totalMagimins"] = totalMagimins
+    solution["deviance"] = deviance
+    solution["rawStability"] = deviance / totalMagimins
+    stabilityPercenttString = 100 - round(deviance / totalMagimins * 100, 2)
+    solution["percentStability"] = f"{stabilityPercenttString:.2f}"
+    solution["baseStars"] = baseStars
+    solution["stabilityRank"] = ["Perfect", "Very Stable", "Stable", "Unstable"][
+        stabilityIndex
+    ]
+    solution["stabilityStars"] = [2, 1, 0, -1][stabilityIndex]
+    # Nothing goes past Masterwork 5-star, however perfect
+    totalStars = min(totalStars, len(PotionTier) * 6 - 1)
+    solution["totalStars"] = totalStars
+    solution["baseTier"] = titleEnumName(PotionTier(totalStars // 6).name)
+    solution["normalizedStars"] = int(totalStars % 6)
+    solution["ingredientsQuantity"] = ingredientsQuantity
+    solution["basePotionPrice"] = basePotionPrice
+    solution["ingredientCosts"] = ingredientCosts
+    solution["baseBatchPrice"] = basePotionPrice * ingredientsQuantity
+    solution["baseNetProfit"] = basePotionPrice * ingredientsQuantity - ingredientCosts
+    solution["actualBatchPrice"] = (
+        gameInfo.potionBasePrices[potionType][totalStars] * ingredientsQuantity
     )
-    prob += magiminOff_C >= totalMagimins * magiminRatioC - magiminAmount_C
-    prob += magiminOff_C >= magiminAmount_C - totalMagimins * magiminRatioC
-
-    magiminOff_D = LpVariable(
-        "magiminDeviance_D",
-        lowBound=0,
-        upBound=workingCauldron["maxMagimins"],
-        cat="Integer",
+    solution["actualNetProfit"] = (
+        gameInfo.potionBasePrices[potionType][totalStars] * ingredientsQuantity
+        - ingredientCosts
     )
-    prob += magiminOff_D >= totalMagimins * magiminRatioD - magiminAmount_D
-    prob += magiminOff_D >= magiminAmount_D - totalMagimins * magiminRatioD
-
-    magiminOff_E = LpVariable(
-        "magiminDeviance_E",
-        lowBound=0,
-        upBound=workingCauldron["maxMagimins"],
-        cat="Integer",
+    return solution
+
+
+def recipeArray(recipes):
+    # Rows for evaluateRecipes from ingredient dicts such as solution["ingredients"]
+    rows = np.zeros((len(recipes), len(gameInfo.ingredientOrder)), dtype=np.int64)
+    for row, recipe in zip(rows, recipes):
+        for name, amount in recipe.items():
+            row[gameInfo.ingredientIndex[name]] = amount
+    return rows
+
+
+def evaluateRecipes(candidates, potionType, cauldron):
+    # Scores any number of recipes at once, without a solver. candidates has
+    # one recipe per row and one column per ingredient of
+    # gameInfo.ingredientOrder. Returns arrays with one entry per recipe for
+    # the figures buildSolution reports, along with whether the recipe could
+    # be brewed in the cauldron at all. Recipes too unstable to brew get a
+    # stabilityIndex of 4 and score like unstable ones.
+    candidates = np.atleast_2d(np.asarray(candidates, dtype=np.int64))
+    testOrComplain(
+        candidates.ndim == 2 and candidates.shape[1] == len(gameInfo.ingredientOrder),
+        f"Recipes need one column for each of the {len(gameInfo.ingredientOrder)} "
+        "ingredients!",
     )
-    prob += magiminOff_E >= totalMagimins * magiminRatioE - magiminAmount_E
-    prob += magiminOff_E >= magiminAmount_E - totalMagimins * magiminRatioE
+    workingCauldron = gameInfo.cauldronProperties.loc[cauldron]
+    ratios = gameInfo.potionRatios.loc[potionType].to_numpy().astype(np.int64)
+    ratioSum = ratios.sum()
+    thresholds = gameInfo.starRequirements.loc["magimins"].to_numpy().astype(np.int64)
+    basePrices = gameInfo.potionBasePrices[potionType].to_numpy()
+
+    magimins = candidates @ gameInfo.ingredientMagimins.astype(np.int64)
+    totalMagimins = magimins.sum(axis=1)
+    ingredientsQuantity = candidates.sum(axis=1)
+    ingredientCosts = candidates @ gameInfo.ingredientPrices.astype(np.int64)
+
+    # Whole magimins off the potion's ratio in each dimension, rounded up
+    deviance = (
+        -(-np.abs(magimins * ratioSum - np.outer(totalMagimins, ratios)) // ratioSum)
+    ).sum(axis=1)
 
-    totalDeviance = lpSum(
-        [magiminOff_A, magiminOff_B, magiminOff_C, magiminOff_D, magiminOff_E]
+    # Deviance allowed for each stability, in tenths of the total magimins
+    shares = np.array([0, 1, 3, 5])
+    stabilityIndex = (10 * deviance[:, None] > np.outer(totalMagimins, shares)).sum(
+        axis=1
     )
+    stabilityStars = np.array([2, 1, 0, -1, -1])[stabilityIndex]
 
-    prob += totalDeviance <= totalMagimins / 2
+    # Star levels stop one short of the last threshold
+    baseStars = np.searchsorted(thresholds, totalMagimins, side="right") - 1
+    baseStars = np.minimum(baseStars, len(thresholds) - 2)
+    totalStars = np.minimum(baseStars + stabilityStars, len(PotionTier) * 6 - 1)
+    basePotionPrice = basePrices[baseStars]
 
-    # Convert magimin count to star count
-    magiminStarVariables = {
-        f"magiminStar_{i}": LpVariable(f"magiminStar_{i}", cat="Binary")
-        for i in range(len(magiminThresholds) - 1)
-    }
-    magiminStarDummyArray_0 = {
-        f"magiminStar_{i}_dummy0": LpVariable(f"magiminStar_{i}_dummy0", cat="Binary")
-        for i in range(len(magiminThresholds) - 1)
+    feasible = (
+        (candidates >= 0).all(axis=1)
+        & (ingredientsQuantity >= 1)
+        & (ingredientsQuantity <= workingCauldron["maxIngredients"])
+        & (totalMagimins <= workingCauldron["maxMagimins"])
+        & (totalMagimins < thresholds[-1])
+        & (stabilityIndex < 4)
+        & ((magimins > 0) | (ratios == 0)).all(axis=1)
+    )
+
+    return {
+        "feasible": feasible,
+        "magimins": magimins,
+        "totalMagimins": totalMagimins,
+        "deviance": deviance,
+        "baseStars": baseStars,
+        "stabilityIndex": stabilityIndex,
+        "stabilityStars": stabilityStars,
+        "totalStars": totalStars,
+        "ingredientsQuantity": ingredientsQuantity,
+        "basePotionPrice": basePotionPrice,
+        "ingredientCosts": ingredientCosts,
+        "baseBatchPrice": basePotionPrice * ingredientsQuantity,
+        "baseNetProfit": basePotionPrice * ingredientsQuantity - ingredientCosts,
     }
-    magiminStarDummyArray_1 = {
-        f"magiminStar_{i}_dummy1": LpVariable(f"magiminStar_{i}_dummy1", cat="Binary")
-        for i in range(len(magiminThresholds) - 1)
+
+
+def recipeSolution(ingredients, potionType, cauldron):
+    # The solution dict for a recipe given only its ingredients
+    figures = {
+        k: v[0]
+        for k, v in evaluateRecipes(
+            recipeArray([ingredients]), potionType, cauldron
+        ).items()
     }
-    for v, t_0, t_1, a, b in zip(
-        magiminStarVariables.values(),
-        magiminStarDummyArray_0.values(),
-        magiminStarDummyArray_1.values(),
-        magiminThresholds.values,
-        magiminThresholds.values[1:],
-    ):
-        prob += a * v <= totalMagimins
-        prob += totalMagimins <= (b - 1) * v + M * (1 - v)
-        prob += totalMagimins - a <= M * t_0
-        prob += (b - 1) - totalMagimins <= M * t_1
-        prob += v >= t_0 + t_1 - 1
-
-    # Convert stability to star bonus
-    perfectStarBonus = LpVariable("perfectStarBonus", cat="Binary")
-    veryStableStarBonus = LpVariable("veryStableStarBonus", cat="Binary")
-    veryStableStarLowerBoundProduct = LpVariable("veryStableStarProduct", cat="Integer")
-    veryStableStarDummy0 = LpVariable("veryStableStarDummy0", cat="Binary")
-    veryStableStarDummy1 = LpVariable("veryStableStarDummy1", cat="Binary")
-    stableStarBonus = LpVariable("stableStarBonus", cat="Binary")
-    stableStarLowerBoundProduct = LpVariable("stableStarProduct", cat="Integer")
-    stableStarDummy0 = LpVariable("stableStarDummy0", cat="Binary")
-    stableStarDummy1 = LpVariable("stableStarDummy1", cat="Binary")
-    unstableStarPenalty = LpVariable("unstableStarPenalty", cat="Binary")
-    unstableStarLowerBoundProduct = LpVariable("unstableStarProduct", cat="Integer")
-    unstableStarDummy0 = LpVariable("unstableStarDummy0", cat="Binary")
-    unstableStarDummy1 = LpVariable("unstableStarDummy1", cat="Binary")
-
-    # Perfect potions require a perfect balance
-    prob += totalDeviance <= M * (1 - perfectStarBonus)
-    prob += (1 - perfectStarBonus) <= M * totalDeviance
-
-    # Very stable potions require no more than 10% deviance
-    lowerBound_veryStable = eenyminy
-    upperBound_veryStable = 0.1
-    prob += veryStableStarLowerBoundProduct <= M * veryStableStarBonus
-    prob += veryStableStarLowerBoundProduct <= totalMagimins * lowerBound_veryStable
-    prob += veryStableStarLowerBoundProduct >= lowerBound_veryStable - M * (
-        1 - veryStableStarBonus
+    return buildSolution(
+        potionType,
+        ingredients=dict(ingredients),
+        magimins=dict(zip("ABCDE", figures["magimins"].tolist())),
+        totalMagimins=float(figures["totalMagimins"]),
+        deviance=float(figures["deviance"]),
+        baseStars=float(figures["baseStars"]),
+        stabilityIndex=int(figures["stabilityIndex"]),
+        totalStars=float(figures["totalStars"]),
+        ingredientsQuantity=float(figures["ingredientsQuantity"]),
+        basePotionPrice=float(figures["basePotionPrice"]),
+        ingredientCosts=float(figures["ingredientCosts"]),
     )
-    prob += veryStableStarLowerBoundProduct >= 0
-    prob += veryStableStarLowerBoundProduct <= totalDeviance
-    prob += totalDeviance <= upperBound_veryStable * totalMagimins + M * (
-        1 - veryStableStarBonus
-    )
-    prob += (
-        totalDeviance - (totalMagimins * lowerBound_veryStable)
-        <= M * veryStableStarDummy0
+
+
+def needsPerfection(objective, minStability):
+    return (
+        objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH
+        or minStability == PotionStability.PERFECT
     )
-    prob += (
-        totalMagimins * upperBound_veryStable
-    ) - totalDeviance <= M * veryStableStarDummy1
-    prob += veryStableStarBonus >= veryStableStarDummy0 + veryStableStarDummy1 - 1
-
-    # Stable potions require between (10% and 30%] deviance
-    lowerBound_stable = 0.1 + eenyminy
-    upperBound_stable = 0.30
-    prob += stableStarLowerBoundProduct <= M * stableStarBonus
-    prob += stableStarLowerBoundProduct <= totalMagimins * lowerBound_stable
-    prob += stableStarLowerBoundProduct >= lowerBound_stable - M * (1 - stableStarBonus)
-    prob += stableStarLowerBoundProduct >= 0
-    prob += stableStarLowerBoundProduct <= totalDeviance
-    prob += totalDeviance <= upperBound_stable * totalMagimins + M * (
-        1 - stableStarBonus
+
+
+@lru_cache(maxsize=64)
+def getPotionModel(
+    cauldron, potionType, objective, perfectOnly=False, formulation="bigM"
+):
+    return PotionModel(cauldron, potionType, objective, perfectOnly, formulation)
+
+
+def problemSignature(
+    ingredientInventory,
+    cauldron,
+    potionType,
+    objective,
+    minStability,
+    starLevel,
+    sensoryData,
+    solver,
+    formulation,
+):
+    # Recipes are keyed on the engine that found them too: engines agree on
+    # the objective's value, but not always on which of equally good recipes
+    # they come back with
+    maxIngredients = gameInfo.cauldronProperties.loc[cauldron]["maxIngredients"]
+    constrainedSenses = [
+        s
+        for s, quality in (sensoryData or {}).items()
+        if quality not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]
+    ]
+
+    # Only ingredients the model could actually use matter, and any quantity
+    # past the cauldron's capacity is indistinguishable from the capacity
+    excluded = excludedBySenses(constrainedSenses)
+    relevantInventory = []
+    for name, quantity in ingredientInventory.items():
+        if excluded[gameInfo.ingredientIndex[name]]:
+            continue
+        if objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH:
+            relevantInventory.append((name.name, maxIngredients))
+        elif quantity > 0:
+            relevantInventory.append((name.name, min(int(quantity), maxIngredients)))
+
+    signature = repr(
+        (
+            cacheVersion,
+            cauldron.name,
+            potionType.name,
+            objective.name,
+            minStability.name,
+            None if starLevel is None else int(starLevel),
+            sorted((s.name, sensoryData[s].name) for s in constrainedSenses),
+            sorted(relevantInventory),
+            solver,
+            formulation,
+        )
     )
-    prob += totalDeviance - lowerBound_stable <= M * stableStarDummy0
-    prob += upperBound_stable - totalDeviance <= M * stableStarDummy1
-    prob += stableStarBonus >= stableStarDummy0 + stableStarDummy1 - 1
-
-    # Unstable potions require at most 50% deviance
-    lowerBound_unstable = 0.30 + eenyminy
-    upperBound_unstable = 0.5
-    prob += unstableStarLowerBoundProduct <= M * unstableStarPenalty
-    prob += unstableStarLowerBoundProduct <= totalMagimins * lowerBound_unstable
-    prob += unstableStarLowerBoundProduct >= lowerBound_unstable - M * (
-        1 - unstableStarPenalty
+    return sha256(signature.encode("utf-8")).hexdigest()
+
+
+def getBestPotion(
+    ingredientInventory=None,
+    cauldron=None,
+    potionType=None,
+    objective=PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+    minStability=PotionStability.UNSTABLE,
+    starLevel=None,
+    sensoryData=None,
+    useCache=True,
+    solver=None,
+    formulation=None,
+    warmStart=True,
+    initialRecipe=None,
+    stopEvent=None,
+    stats=None,
+):
+    # stats, a SolveStats, collects where the time went and what was solved.
+    # With warmStart, MILP engines start from initialRecipe, if given and it
+    # fits, and otherwise from the last recipe the cached model came up with.
+    # Setting stopEvent makes the solve raise a BoxerException as soon as it
+    # can, rather than finish.
+    testOrComplain(
+        (solver or defaultSolver) in solverEngines
+        or (solver or defaultSolver) in ["search", "heuristic"],
+        f"Unknown solver {solver or defaultSolver!r}!",
     )
-    prob += unstableStarLowerBoundProduct >= 0
-    prob += unstableStarLowerBoundProduct <= totalDeviance
-    prob += totalDeviance <= upperBound_unstable * totalMagimins + M * (
-        1 - unstableStarPenalty
+    testOrComplain(
+        objective != PotionOptimizationObjective.MOST_PROFITABLE_PLAN,
+        "Production plans come from getProductionPlan!",
     )
-    prob += (
-        totalDeviance - (totalMagimins * lowerBound_unstable) <= M * unstableStarDummy0
+    testOrComplain(
+        (formulation or defaultFormulation) in formulations,
+        f"Unknown formulation {formulation or defaultFormulation!r}!",
     )
-    prob += (
-        totalMagimins * upperBound_unstable
-    ) - totalDeviance <= M * unstableStarDummy1
-    prob += unstableStarPenalty >= unstableStarDummy0 + unstableStarDummy1 - 1
-
-    # Anything else is, of course, unstable
-    prob += (
-        perfectStarBonus + veryStableStarBonus + stableStarBonus + unstableStarPenalty
-        == 1
+    assertFeasible(
+        ingredientInventory,
+        cauldron,
+        potionType,
+        objective,
+        minStability,
+        starLevel,
+        sensoryData,
     )
+    if stats is not None:
+        stats.solver = solver or defaultSolver
+
+    if (solver or defaultSolver) == "heuristic":
+        # Quick but not exact, so kept out of the solution cache
+        from boxer.heuristic import heuristicBestPotion
+
+        with span(stats, "solve"):
+            solution = heuristicBestPotion(
+                ingredientInventory=ingredientInventory,
+                cauldron=cauldron,
+                potionType=potionType,
+                objective=objective,
+                minStability=minStability,
+                starLevel=starLevel,
+                sensoryData=sensoryData,
+            )
+        if stats is not None:
+            stats.recordProblem(None, "Infeasible" if solution is None else "Heuristic")
+        return solution
+
+    if useCache:
+        signature = problemSignature(
+            ingredientInventory,
+            cauldron,
+            potionType,
+            objective,
+            minStability,
+            starLevel,
+            sensoryData,
+            solver or defaultSolver,
+            formulation or defaultFormulation,
+        )
+        with span(stats, "cache"):
+            solution = solutionCache.get(signature)
+        if stats is not None:
+            stats.cached = solution is not missing
+        if solution is missing:
+            solution = getBestPotion(
+                ingredientInventory=ingredientInventory,
+                cauldron=cauldron,
+                potionType=potionType,
+                objective=objective,
+                minStability=minStability,
+                starLevel=starLevel,
+                sensoryData=sensoryData,
+                useCache=False,
+                solver=solver,
+                formulation=formulation,
+                warmStart=warmStart,
+                initialRecipe=initialRecipe,
+                stopEvent=stopEvent,
+                stats=stats,
+            )
+            solutionCache.put(signature, solution)
+        return solution
+
+    if (solver or defaultSolver) == "search":
+        # The combinatorial engine skips the MILP altogether
+        from boxer.search import searchBestPotion
+
+        assertNotStopped(stopEvent)
+        with span(stats, "solve"):
+            solution = searchBestPotion(
+                ingredientInventory=ingredientInventory,
+                cauldron=cauldron,
+                potionType=potionType,
+                objective=objective,
+                minStability=minStability,
+                starLevel=starLevel,
+                sensoryData=sensoryData,
+            )
+        if stats is not None:
+            stats.recordProblem(None, "Infeasible" if solution is None else "Optimal")
+        return solution
 
-    # Minimum stability requirement
-    if minStability == PotionStability.PERFECT:
-        prob += veryStableStarBonus == 0
-        prob += stableStarBonus == 0
-        prob += unstableStarPenalty == 0
-    elif minStability == PotionStability.VERY_STABLE:
-        prob += stableStarBonus == 0
-        prob += unstableStarPenalty == 0
-    elif minStability == PotionStability.STABLE:
-        prob += unstableStarPenalty == 0
-
-    # Stability may not be less than 50%
-    prob += totalDeviance <= totalMagimins * 0.5
-
-    # Specify cauldron constraints
-    prob += totalMagimins <= workingCauldron["maxMagimins"]
-    prob += ingredientQuantity <= workingCauldron["maxIngredients"]
-    prob += 1 <= ingredientQuantity
-
-    starsFromStability = (
-        2 * perfectStarBonus
-        + 1 * veryStableStarBonus
-        + 0 * stableStarBonus
-        - 1 * unstableStarPenalty
+    assertNotStopped(stopEvent)
+    with span(stats, "build"):
+        model = getPotionModel(
+            cauldron,
+            potionType,
+            objective,
+            needsPerfection(objective, minStability),
+            formulation or defaultFormulation,
+        )
+    with model.lock:
+        # Another request may have held the model for a while
+        assertNotStopped(stopEvent)
+        with span(stats, "configure"):
+            model.configure(
+                ingredientInventory,
+                minStability=minStability,
+                starLevel=starLevel,
+                sensoryData=sensoryData,
+            )
+        with span(stats, "presolve"):
+            model.presolve(sensoryData)
+        # The values the last solve left behind may not fit this request's
+        # bounds, so only a recipe setStart() has checked makes a start
+        started = warmStart and any(
+            recipe is not None and model.setStart(recipe)
+            for recipe in [initialRecipe, model.lastRecipe]
+        )
+        assertNotStopped(stopEvent)
+        with span(stats, "solve"):
+            status = solverEngines[solver or defaultSolver](
+                model.prob, warmStart=started, stopEvent=stopEvent
+            )
+        assertNotStopped(stopEvent)
+        if stats is not None:
+            stats.recordProblem(model.prob, status)
+        if status == "Optimal":
+            with span(stats, "extract"):
+                solution = model.extractSolution()
+            model.lastRecipe = solution["ingredients"]
+            return solution
+
+
+def getTopPotions(
+    ingredientInventory=None,
+    cauldron=None,
+    potionType=None,
+    objective=PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+    minStability=PotionStability.UNSTABLE,
+    starLevel=None,
+    sensoryData=None,
+    count=5,
+    useCache=True,
+    solver=None,
+    formulation=None,
+    stats=None,
+):
+    # The count best distinct recipes, best first. MILP engines re-solve the
+    # cached model, cutting off every recipe already found, rather than
+    # starting over for each one.
+    testOrComplain(count >= 1, "You have to ask for at least one recipe!")
+    testOrComplain(
+        (solver or defaultSolver) in solverEngines
+        or (solver or defaultSolver) == "search",
+        f"Unknown solver {solver or defaultSolver!r}!",
     )
-    starsFromMagimins = lpSum(
-        [index * i for index, i in enumerate(magiminStarVariables.values())]
+    testOrComplain(
+        objective != PotionOptimizationObjective.MOST_PROFITABLE_PLAN,
+        "Production plans come from getProductionPlan!",
     )
-    totalStars = starsFromMagimins + starsFromStability
-    prob += sum(magiminStarVariables.values()) == 1
-
-    basePotionPrice = lpSum(
-        [
-            v * p
-            for v, p in zip(magiminStarVariables.values(), potionBasePrices[potionType])
-        ]
+    testOrComplain(
+        (formulation or defaultFormulation) in formulations,
+        f"Unknown formulation {formulation or defaultFormulation!r}!",
     )
-
-    ingredientCosts = lpSum(
-        [
-            ingredientData[i]["basePrice"] * inventoryVariables[i]
-            for i in inventoryVariables.keys()
-        ]
+    assertFeasible(
+        ingredientInventory,
+        cauldron,
+        potionType,
+        objective,
+        minStability,
+        starLevel,
+        sensoryData,
     )
+    if stats is not None:
+        stats.solver = solver or defaultSolver
+    if useCache:
+        signature = problemSignature(
+            ingredientInventory,
+            cauldron,
+            potionType,
+            objective,
+            minStability,
+            starLevel,
+            sensoryData,
+            solver or defaultSolver,
+            formulation or defaultFormulation,
+        )
+        signature = f"{signature}-top{count}"
+        with span(stats, "cache"):
+            solutions = solutionCache.get(signature)
+        if stats is not None:
+            stats.cached = solutions is not missing
+        if solutions is missing:
+            solutions = getTopPotions(
+                ingredientInventory=ingredientInventory,
+                cauldron=cauldron,
+                potionType=potionType,
+                objective=objective,
+                minStability=minStability,
+                starLevel=starLevel,
+                sensoryData=sensoryData,
+                count=count,
+                useCache=False,
+                solver=solver,
+                formulation=formulation,
+                stats=stats,
+            )
+            solutionCache.put(signature, solutions)
+        return solutions
 
-    # Fiddle with the objective a bit
-    if objective == PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE:
-        prob += totalStars  # + ingredientQuantity / 2
-    elif objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
-        prob += starsFromMagimins + starsFromStability >= starLevel
-        prob += ingredientCosts - (M * ingredientQuantity)
-    elif objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH:
-        prob += ingredientQuantity == workingCauldron["maxIngredients"]
-        prob += perfectStarBonus == 1
-        # Product of base potion price and the number of ingredients
+    if (solver or defaultSolver) == "search":
+        from boxer.search import searchTopPotions
 
-        prob += basePotionPrice * workingCauldron["maxIngredients"] - ingredientCosts
-    solver = PULP_CBC_CMD(msg=0)
-    prob.solve(solver)
-    if LpStatus[prob.status] == "Optimal":
-        solution = {}
-        solution["ingredients"] = {
-            i: int(j.value()) for i, j in inventoryVariables.items() if j.value()
-        }
-        solution["magimins"] = {
-            "A": int(magiminAmount_A.value()),
-            "B": int(magiminAmount_B.value()),
-            "C": int(magiminAmount_C.value()),
-            "D": int(magiminAmount_D.value()),
-            "E": int(magiminAmount_E.value()),
-        }
-        solution["sensory"] = {}
-        for sense in SensoryType:
-            goodCount = badCount = 0
-            for item, amt in inventoryVariables.items():
-                if ingredientData[item][sense] == SensoryQuality.POSITIVE:
-                    goodCount += amt.value()
-                elif ingredientData[item][sense] == SensoryQuality.NEGATIVE:
-                    badCount += amt.value()
-            if goodCount and badCount:
-                totalCount = goodCount + badCount
-                goodFraction = goodCount / totalCount
-                badFraction = badCount / totalCount
-                solution["sensory"][sense] = {
-                    "good": goodFraction,
-                    "bad": badFraction,
-                }
-            elif goodCount:
-                solution["sensory"][sense] = {
-                    "good": 1,
-                    "bad": 0,
-                }
-            elif badCount:
-                solution["sensory"][sense] = {
-                    "good": 0,
-                    "bad": 1,
-                }
-        solution["totalMagimins"] = totalMagimins.value()
-        solution["deviance"] = totalDeviance.value()
-        solution["rawStability"] = totalDeviance.value() / totalMagimins.value()
-        stabilityPercenttString = 100 - round(
-            totalDeviance.value() / totalMagimins.value() * 100, 2
-        )
-        solution["percentStability"] = f"{stabilityPercenttString:.2f}"
-        solution["baseStars"] = sum(
-            ind * i.value()
-            for ind, i in enumerate(magiminStarVariables.values())
-            if i.value()
-        )
-        stabilityIndex = sum(
-            [
-                ind
-                for ind, i in enumerate(
-                    [
-                        perfectStarBonus,
-                        veryStableStarBonus,
-                        stableStarBonus,
-                        unstableStarPenalty,
-                    ]
-                )
-                if i.value()
-            ]
-        )
-        solution["stabilityRank"] = ["Perfect", "Very Stable", "Stable", "Unstable"][
-            stabilityIndex
-        ]
-        solution["stabilityStars"] = [2, 1, 0, -1][stabilityIndex]
-        solution["totalStars"] = totalStars.value()
-        solution["baseTier"] = titleEnumName(PotionTier(totalStars.value() // 6).name)
-        solution["normalizedStars"] = int(totalStars.value() % 6)
-        solution["ingredientsQuantity"] = ingredientQuantity.value()
-        solution["basePotionPrice"] = basePotionPrice.value()
-        solution["ingredientCosts"] = ingredientCosts.value()
-        solution["baseBatchPrice"] = (
-            basePotionPrice.value() * ingredientQuantity.value()
-        )
-        solution["baseNetProfit"] = (
-            basePotionPrice.value() * ingredientQuantity.value()
-            - ingredientCosts.value()
-        )
-        solution["actualBatchPrice"] = (
-            potionBasePrices[potionType][totalStars.value()]
-            * ingredientQuantity.value()
-        )
-        solution["actualNetProfit"] = (
-            potionBasePrices[potionType][totalStars.value()]
-            * ingredientQuantity.value()
-            - ingredientCosts.value()
+        with span(stats, "solve"):
+            solutions = searchTopPotions(
+                ingredientInventory=ingredientInventory,
+                cauldron=cauldron,
+                potionType=potionType,
+                objective=objective,
+                minStability=minStability,
+                starLevel=starLevel,
+                sensoryData=sensoryData,
+                count=count,
+            )
+        if stats is not None:
+            stats.recordProblem(None, "Optimal" if solutions else "Infeasible")
+        return solutions
+
+    solutions = []
+    with span(stats, "build"):
+        model = getPotionModel(
+            cauldron,
+            potionType,
+            objective,
+            needsPerfection(objective, minStability),
+            formulation or defaultFormulation,
         )
-        return solution
+    with model.lock:
+        with span(stats, "configure"):
+            model.configure(
+                ingredientInventory,
+                minStability=minStability,
+                starLevel=starLevel,
+                sensoryData=sensoryData,
+            )
+        # Cuts go on a copy, which shares everything else with the cached model
+        prob = model.prob.copy()
+        while len(solutions) < count:
+            with span(stats, "solve"):
+                status = solverEngines[solver or defaultSolver](prob)
+            if stats is not None:
+                stats.recordProblem(prob, status)
+            if status != "Optimal":
+                break
+            with span(stats, "extract"):
+                solutions.append(model.extractSolution())
+            model.excludeRecipe(prob, solutions[-1]["ingredients"], len(solutions))
+    return solutions
 
 
 def getOptimumPotionRecipe(
@@ -519,54 +1720,123 @@ def getOptimumPotionRecipe(
     tier=None,
     minStability=PotionStability.UNSTABLE,
     sensoryData=None,
+    useCache=True,
+    solver=None,
+    formulation=None,
+    topK=None,
+    warmStart=True,
+    initialRecipe=None,
+    mode="exact",
+    onHeuristicRecipe=None,
+    stopEvent=None,
+    stats=None,
 ):
-    # Validate completeness of parameters
+    # With topK, a list of that many best recipes instead of the single best.
+    # Pass a SolveStats as stats to find out where the time went, and the
+    # ingredients of a recipe close to the one wanted as initialRecipe, such as
+    # the last one, for the solver to start from. mode is one of modes; with
+    # "anytime", onHeuristicRecipe gets the heuristic's recipe, if it finds
+    # one, while the exact answer is still being worked out.
+    # Setting stopEvent, a threading.Event, gives up on a single recipe.
+    testOrComplain(mode in modes, f"Unknown mode {mode!r}!")
+    testOrComplain(
+        mode != "fast"
+        or (
+            topK is None
+            and objective != PotionOptimizationObjective.MOST_PROFITABLE_PLAN
+        ),
+        "Only exact solves can find several recipes or plan production!",
+    )
+    if (
+        mode == "anytime"
+        and objective != PotionOptimizationObjective.MOST_PROFITABLE_PLAN
+    ):
+        with span(stats, "heuristic"):
+            early = getOptimumPotionRecipe(
+                ingredientInventory=ingredientInventory,
+                cauldron=cauldron,
+                potionType=potionType,
+                objective=objective,
+                starLevel=starLevel,
+                tier=tier,
+                minStability=minStability,
+                sensoryData=sensoryData,
+                mode="fast",
+            )
+        if early is not None:
+            if onHeuristicRecipe is not None:
+                onHeuristicRecipe(early)
+            if initialRecipe is None:
+                initialRecipe = early["ingredients"]
+    if mode == "fast":
+        solver = "heuristic"
 
-    cauldron = englishToEnum[cauldron]
-    potionType = englishToEnum[potionType]
-    starLevel = int(starLevel) + englishToEnum[tier].value * 6
-    if sensoryData is None:
-        sensoryData = {
-            SensoryType.TASTE: SensoryQuality.ANY,
-            SensoryType.VISUAL: SensoryQuality.ANY,
-            SensoryType.AROMA: SensoryQuality.ANY,
-            SensoryType.SENSATION: SensoryQuality.ANY,
-            SensoryType.SOUND: SensoryQuality.ANY,
-        }
-    else:
-        sensoryTranslate = dict(
-            zip(
-                ["Any", "No Bad", "Good"],
-                [SensoryQuality.ANY, SensoryQuality.NEUTRAL, SensoryQuality.POSITIVE],
+    with span(stats, "translate"):
+        cauldron = gameInfo.englishToEnum[cauldron]
+        potionType = gameInfo.englishToEnum[potionType]
+        if tier is not None:
+            starLevel = int(starLevel) + gameInfo.englishToEnum[tier].value * 6
+        if sensoryData is None:
+            sensoryData = {
+                SensoryType.TASTE: SensoryQuality.ANY,
+                SensoryType.VISUAL: SensoryQuality.ANY,
+                SensoryType.AROMA: SensoryQuality.ANY,
+                SensoryType.SENSATION: SensoryQuality.ANY,
+                SensoryType.SOUND: SensoryQuality.ANY,
+            }
+        else:
+            sensoryTranslate = dict(
+                zip(
+                    ["Any", "No Bad", "Good"],
+                    [
+                        SensoryQuality.ANY,
+                        SensoryQuality.NEUTRAL,
+                        SensoryQuality.POSITIVE,
+                    ],
+                )
             )
+            sensoryData = {
+                gameInfo.englishToEnum[k.title()]: sensoryTranslate[v]
+                for k, v in sensoryData.items()
+            }
+            # print(sensoryData)
+
+    # Validate completeness of parameters
+    with span(stats, "validate"):
+        assertProblemIsComplete(
+            ingredientInventory=ingredientInventory,
+            cauldron=cauldron,
+            potionType=potionType,
+            objective=objective,
+            starLevel=starLevel,
+            tier=tier,
+            sensoryData=sensoryData,
         )
-        sensoryData = {
-            englishToEnum[k.title()]: sensoryTranslate[v]
-            for k, v in sensoryData.items()
-        }
-        # print(sensoryData)
-
-    assertProblemIsComplete(
-        ingredientInventory=ingredientInventory,
-        cauldron=cauldron,
-        potionType=potionType,
-        objective=objective,
-        starLevel=starLevel,
-        tier=tier,
-        sensoryData=sensoryData,
+
+    solve = partial(
+        getBestPotion,
+        warmStart=warmStart,
+        initialRecipe=initialRecipe,
+        stopEvent=stopEvent,
+        stats=stats,
     )
+    if topK is not None:
+        solve = partial(getTopPotions, count=topK, stats=stats)
 
     result = None
     if objective == PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE:
-        result = getBestPotion(
+        result = solve(
             ingredientInventory=ingredientInventory,
             cauldron=cauldron,
             potionType=potionType,
             objective=objective,
             sensoryData=sensoryData,
+            useCache=useCache,
+            solver=solver,
+            formulation=formulation,
         )
     elif objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
-        result = getBestPotion(
+        result = solve(
             ingredientInventory=ingredientInventory,
             cauldron=cauldron,
             potionType=potionType,
@@ -574,13 +1844,222 @@ def getOptimumPotionRecipe(
             starLevel=starLevel,
             minStability=minStability,
             sensoryData=sensoryData,
+            useCache=useCache,
+            solver=solver,
+            formulation=formulation,
         )
     elif objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH:
-        result = getBestPotion(
+        result = solve(
             ingredientInventory=ingredientInventory,
             cauldron=cauldron,
             potionType=potionType,
             objective=objective,
             sensoryData=sensoryData,
+            useCache=useCache,
+            solver=solver,
+            formulation=formulation,
         )
+    elif objective == PotionOptimizationObjective.MOST_PROFITABLE_PLAN:
+        with span(stats, "plan"):
+            result = getProductionPlan(
+                ingredientInventory=ingredientInventory,
+                cauldrons=[cauldron],
+                potionTypes=[potionType],
+                sensoryData=sensoryData,
+                solver=solver,
+                formulation=formulation,
+            )
     return result
+
+
+def getProductionPlan(
+    ingredientInventory=None,
+    cauldrons=(),
+    potionTypes=None,
+    sensoryData=None,
+    maxBrews=None,
+    rounds=20,
+    solver=None,
+    formulation=None,
+):
+    # Plans a run of most profitable batches (full and perfect, as for
+    # MOST_PROFITABLE_BATCH) that between them use no more than the inventory,
+    # maximizing their combined profit. Returns the batches' solutions, each
+    # tagged with its cauldron and potion type, most profitable first.
+    #
+    # Candidate recipes come from column generation: every round the LP
+    # relaxation of the plan puts a price on each ingredient, and each cached
+    # PotionModel is asked for the batch worth most at those prices. The final
+    # plan picks whole batches among all the candidates found.
+    testOrComplain(
+        ingredientInventory is not None,
+        "You have to specify ingredients with which to brew!",
+    )
+    testOrComplain(cauldrons, "You have to specify at least one cauldron!")
+    testOrComplain(
+        (solver or defaultSolver) in solverEngines,
+        "Production plans need a MILP solver!",
+    )
+    testOrComplain(
+        (formulation or defaultFormulation) in formulations,
+        f"Unknown formulation {formulation or defaultFormulation!r}!",
+    )
+    potionTypes = list(PotionType) if potionTypes is None else potionTypes
+    objective = PotionOptimizationObjective.MOST_PROFITABLE_BATCH
+
+    candidates = {}
+    prices = {}
+    brewPrice = 0
+    for _ in range(rounds):
+        found = False
+        for cauldron in cauldrons:
+            for potionType in potionTypes:
+                model = getPotionModel(
+                    cauldron,
+                    potionType,
+                    objective,
+                    True,
+                    formulation or defaultFormulation,
+                )
+                with model.lock:
+                    model.configure(
+                        ingredientInventory, sensoryData=sensoryData, ownedOnly=True
+                    )
+                    prob = model.prob.copy()
+                    prob.setObjective(
+                        model.prob.objective
+                        - lpSum(
+                            price * model.inventoryVariables[name]
+                            for name, price in prices.items()
+                            if name in model.inventoryVariables
+                        )
+                    )
+                    status = solverEngines[solver or defaultSolver](prob)
+                    if status != "Optimal":
+                        continue
+                    solution = model.extractSolution()
+                key = (
+                    cauldron,
+                    potionType,
+                    tuple(
+                        sorted((k.name, v) for k, v in solution["ingredients"].items())
+                    ),
+                )
+                reducedProfit = (
+                    solution["baseNetProfit"]
+                    - sum(
+                        prices.get(name, 0) * amount
+                        for name, amount in solution["ingredients"].items()
+                    )
+                    - brewPrice
+                )
+                if key not in candidates and reducedProfit > eenyminy:
+                    solution["cauldron"] = cauldron
+                    solution["potionType"] = potionType
+                    candidates[key] = solution
+                    found = True
+        if not found:
+            break
+        prices, brewPrice = planIngredientPrices(
+            ingredientInventory, list(candidates.values()), maxBrews
+        )
+
+    return choosePlan(ingredientInventory, list(candidates.values()), maxBrews, solver)
+
+
+def planProblem(ingredientInventory, candidates, maxBrews, cat):
+    prob = LpProblem("Production Plan", LpMaximize)
+    batches = [
+        LpVariable(f"Batch_{i}", lowBound=0, cat=cat) for i in range(len(candidates))
+    ]
+    prob += lpSum(
+        b * solution["baseNetProfit"] for b, solution in zip(batches, candidates)
+    )
+    uses = {}
+    for b, solution in zip(batches, candidates):
+        for name, amount in solution["ingredients"].items():
+            uses.setdefault(name, []).append((b, amount))
+    for name, terms in uses.items():
+        prob += (
+            LpAffineExpression(terms) <= ingredientInventory.get(name, 0),
+            f"Ingredient_{name.name}",
+        )
+    if maxBrews is not None:
+        prob += lpSum(batches) <= maxBrews, "Brews"
+    return prob, batches
+
+
+def planIngredientPrices(ingredientInventory, candidates, maxBrews):
+    # Duals of the plan's LP relaxation: what one more of each ingredient, and
+    # one more brew, would be worth to it
+    prob, batches = planProblem(ingredientInventory, candidates, maxBrews, "Continuous")
+    prob.solve(PULP_CBC_CMD(msg=0))
+    prices = {}
+    brewPrice = 0
+    for name, constraint in prob.constraints.items():
+        if name == "Brews":
+            brewPrice = max(constraint.pi or 0, 0)
+        elif constraint.pi:
+            prices[PotionIngredient[name[len("Ingredient_") :]]] = max(constraint.pi, 0)
+    return prices, brewPrice
+
+
+def choosePlan(ingredientInventory, candidates, maxBrews, solver):
+    if not candidates:
+        return []
+    prob, batches = planProblem(ingredientInventory, candidates, maxBrews, "Integer")
+    if solverEngines[solver or defaultSolver](prob) != "Optimal":
+        return []
+    plan = []
+    for b, solution in zip(batches, candidates):
+        for _ in range(round(b.value() or 0)):
+            plan.append(deepcopy(solution))
+    return sorted(plan, key=lambda solution: -solution["baseNetProfit"])
+
+
+# Inventory and cauldron shared by every request a batch worker handles
+_batchContext = {}
+
+
+def _initBatchWorker(ingredientInventory, cauldron):
+    _batchContext["ingredientInventory"] = ingredientInventory
+    _batchContext["cauldron"] = cauldron
+
+
+def _solveBatchRequest(request):
+    # One request that can't work out shouldn't cost the rest of the batch
+    # their answers
+    try:
+        return getOptimumPotionRecipe(
+            ingredientInventory=_batchContext["ingredientInventory"],
+            cauldron=_batchContext["cauldron"],
+            **request,
+        )
+    except BoxerException as error:
+        return {"error": str(error)}
+
+
+def getOptimumPotionRecipesBatch(
+    ingredientInventory=None,
+    cauldron=None,
+    requests=(),
+    maxWorkers=None,
+):
+    # Each request takes the keyword arguments of getOptimumPotionRecipe, minus
+    # the inventory and cauldron, e.g.
+    # {"potionType": "Health Potion", "tier": "Common", "starLevel": 3}
+    # Answers come back in order, each as getOptimumPotionRecipe would give
+    # it, or {"error": "..."} for a request it would have complained about.
+    requests = list(requests)
+    if not requests:
+        return []
+    workers = min(maxWorkers or os.cpu_count() or 1, len(requests))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_initBatchWorker,
+        initargs=(ingredientInventory, cauldron),
+    ) as executor:
+        # Workers keep their PotionModel cache, so hand out small chunks
+        # rather than one request per round trip
+        chunkSize = max(1, len(requests) // (4 * workers))
+        return list(executor.map(_solveBatchRequest, requests, chunksize=chunkSize))
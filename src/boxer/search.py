@@ -0,0 +1,523 @@
+from bisect import bisect_right
+from itertools import accumulate, product
+
+import numpy as np
+
+from boxer import gameInfo
+from boxer.gameInfo import PotionIngredient, PotionStability, SensoryQuality
+from boxer.gameInfo import sensoryIndex
+from boxer.optimization import (
+    PotionOptimizationObjective,
+    buildSolution,
+    excludedBySenses,
+)
+
+# Stability ranks in the order buildSolution indexes them, the stars each one
+# is worth, and how many tenths of the magimins its deviance may reach
+stabilityRanks = [
+    PotionStability.PERFECT,
+    PotionStability.VERY_STABLE,
+    PotionStability.STABLE,
+    PotionStability.UNSTABLE,
+]
+stabilityStars = [2, 1, 0, -1]
+stabilityShares = [0, 1, 3, 5]
+
+# Multipliers (per unit of ratio sum) tried when trading magimins off against
+# balance in balanceAllows
+lagrangeMultipliers = [0, 2, 8, 25, 75, 250]
+# Coins per magimin, in twentieths, tried when pricing the magimins a cheapest
+# recipe still has to find
+magiminPrices = [1, 2, 5, 10, 20, 40]
+
+
+def stabilityRankOf(deviance, totalMagimins):
+    # None once the deviance is past half the magimins; that can't be brewed
+    for rank, share in enumerate(stabilityShares):
+        if 10 * deviance <= share * totalMagimins:
+            return rank
+    return None
+
+
+def suffixTable(values, caps, limit, largest=True):
+    # table[i][k] is the best total of k picks among candidates i onwards, taking
+    # candidate j at most caps[j] times; rows stop at however many can be picked
+    table = [[0]]
+    picks = []
+    for value, cap in zip(reversed(values), reversed(caps)):
+        picks = sorted(picks + [value] * min(cap, limit), reverse=largest)[:limit]
+        table.append([0] + list(accumulate(picks)))
+    return table[::-1]
+
+
+def leastSums(values, caps, limit):
+    # Like suffixTable, element-wise over the trailing axes of a numpy array
+    # with one row per candidate, always taking the lowest values
+    dtype = np.float64 if values.dtype.kind == "f" else np.int64
+    table = np.zeros((len(caps) + 1, limit + 1) + values.shape[1:], dtype=dtype)
+    picks = values[:0]
+    for i in reversed(range(len(caps))):
+        picks = np.concatenate(
+            [picks, np.repeat(values[i : i + 1], min(caps[i], limit), axis=0)]
+        )
+        picks = np.sort(picks, axis=0)[:limit]
+        table[i, 1 : len(picks) + 1] = np.cumsum(picks, axis=0)
+        table[i, len(picks) + 1 :] = table[i, len(picks)]
+    return table
+
+
+def dualMultipliers(prices, gains, totals, caps, picks, neededTotal, rounds=300):
+    # Subgradient ascent on the Lagrangian dual of picking exactly picks
+    # candidates whose gains cancel out and whose magimins reach neededTotal,
+    # as cheaply as possible. Returns the best multipliers found for the gains
+    # and for the magimins.
+    pool = np.repeat(np.arange(len(caps)), np.minimum(caps, picks))
+    if len(pool) < picks:
+        return np.zeros(gains.shape[1]), 0.0
+    gainMultipliers = np.zeros(gains.shape[1])
+    magiminMultiplier = 0.0
+    best = (-np.inf, gainMultipliers, magiminMultiplier)
+    scale = 2.0
+    sinceBest = 0
+    for _ in range(rounds):
+        values = prices + gains @ gainMultipliers - magiminMultiplier * totals
+        chosen = pool[np.argpartition(values[pool], picks - 1)[:picks]]
+        dual = values[chosen].sum() + magiminMultiplier * neededTotal
+        if dual > best[0] + 1e-9:
+            best = (dual, gainMultipliers.copy(), magiminMultiplier)
+            sinceBest = 0
+        else:
+            sinceBest += 1
+            if sinceBest >= 20:
+                scale /= 2
+                sinceBest = 0
+        gainStep = gains[chosen].sum(axis=0)
+        magiminStep = neededTotal - totals[chosen].sum()
+        if magiminMultiplier <= 0 and magiminStep < 0:
+            magiminStep = 0
+        norm = gainStep @ gainStep + magiminStep * magiminStep
+        if not norm:
+            break
+        # Polyak steps towards a dual value a little over the best so far
+        step = scale * (abs(best[0]) * 0.2 + 1) / norm
+        gainMultipliers = gainMultipliers + step * gainStep
+        magiminMultiplier = max(0.0, magiminMultiplier + step * magiminStep)
+    return best[1], best[2]
+
+
+def searchBestPotion(
+    ingredientInventory=None,
+    cauldron=None,
+    potionType=None,
+    objective=PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+    minStability=PotionStability.UNSTABLE,
+    starLevel=None,
+    sensoryData=None,
+):
+    solutions = searchTopPotions(
+        ingredientInventory=ingredientInventory,
+        cauldron=cauldron,
+        potionType=potionType,
+        objective=objective,
+        minStability=minStability,
+        starLevel=starLevel,
+        sensoryData=sensoryData,
+        count=1,
+    )
+    return solutions[0] if solutions else None
+
+
+def searchTopPotions(
+    ingredientInventory=None,
+    cauldron=None,
+    potionType=None,
+    objective=PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+    minStability=PotionStability.UNSTABLE,
+    starLevel=None,
+    sensoryData=None,
+    count=5,
+):
+    # Depth-first branch and bound over ingredient multisets, answering the
+    # same question as the MILP in getBestPotion for the count best distinct
+    # recipes, best first. Magimins are kept as integer excesses over the
+    # potion's target ratio (scaled by the ratio sum), so deviance and
+    # stability are worked out exactly.
+    sensoryData = sensoryData or {}
+    profitable = objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH
+    cheapest = objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS
+
+    workingCauldron = gameInfo.cauldronProperties.loc[cauldron]
+    maxIngredients = int(workingCauldron["maxIngredients"])
+    thresholds = gameInfo.starRequirements.loc["magimins"].values.tolist()
+    # Star levels only go as far as one short of the last threshold
+    maxMagimins = min(int(workingCauldron["maxMagimins"]), thresholds[-1] - 1)
+    baseStarsOf = [
+        bisect_right(thresholds, total) - 1 for total in range(maxMagimins + 1)
+    ]
+    basePrices = gameInfo.potionBasePrices[potionType].tolist()
+    bestBasePrice = list(accumulate(basePrices, max))
+    ratios = [int(r) for r in gameInfo.potionRatios.loc[potionType]]
+    ratioSum = sum(ratios)
+    worstRank = max(
+        rank
+        for rank, stability in enumerate(stabilityRanks)
+        if stability.value >= minStability.value
+    )
+    perfectOnly = profitable or worstRank == 0
+
+    constrainedSenses = [
+        s
+        for s, quality in sensoryData.items()
+        if quality not in [SensoryQuality.ANY, SensoryQuality.NEGATIVE]
+    ]
+    excluded = excludedBySenses(constrainedSenses)
+
+    # One bit per thing a recipe has to contain: a magimin of every dimension
+    # the potion needs, and an ingredient meeting each sensory requirement
+    candidates = []
+    for name, quantity in ingredientInventory.items():
+        row = gameInfo.ingredientIndex[name]
+        if excluded[row]:
+            continue
+        cap = maxIngredients if profitable else min(int(quantity), maxIngredients)
+        if cap <= 0:
+            continue
+        magimins = gameInfo.ingredientMagimins[row].tolist()
+        # A single magimin the potion has no use for rules out perfection
+        if perfectOnly and any(m and not r for m, r in zip(magimins, ratios)):
+            continue
+        sensory = gameInfo.ingredientSensory[row].tolist()
+        total = sum(magimins)
+        excess = [m * ratioSum - total * r for m, r in zip(magimins, ratios)]
+        mask = 0
+        for bit, (m, r) in enumerate(zip(magimins, ratios)):
+            if r and m:
+                mask |= 1 << bit
+        for bit, s in enumerate(constrainedSenses, start=len(ratios)):
+            if sensory[sensoryIndex[s]] >= sensoryData[s]:
+                mask |= 1 << bit
+        candidates.append(
+            (
+                name,
+                cap,
+                magimins,
+                total,
+                excess,
+                int(gameInfo.ingredientPrices[row]),
+                mask,
+            )
+        )
+    fullMask = sum(1 << bit for bit, r in enumerate(ratios) if r)
+    fullMask |= ((1 << len(constrainedSenses)) - 1) << len(ratios)
+
+    # Perfect recipes have to cancel every excess exactly, which the signed
+    # weightings further down only capture loosely; multipliers tuned for each
+    # star level in play bound their cost much more tightly
+    perfectMultipliers = []
+    if perfectOnly and (cheapest or profitable) and candidates:
+        gainArray = np.array([c[4] for c in candidates], dtype=np.float64)
+        priceArray = np.array([c[5] for c in candidates], dtype=np.float64)
+        totalArray = np.array([c[3] for c in candidates], dtype=np.float64)
+        capArray = np.array([c[1] for c in candidates])
+        mostTotal = suffixTable([c[3] for c in candidates], capArray, maxIngredients)
+        mostStars = baseStarsOf[min(maxMagimins, mostTotal[0][-1])]
+        for baseStars in (
+            [min(max(0, starLevel - stabilityStars[0]), len(thresholds) - 1)]
+            if cheapest
+            else range(mostStars, -1, -1)
+        ):
+            perfectMultipliers.append(
+                dualMultipliers(
+                    priceArray,
+                    gainArray,
+                    totalArray,
+                    capArray,
+                    min(maxIngredients, capArray.sum()),
+                    thresholds[baseStars],
+                )
+            )
+        gainMultipliers = np.array([m[0] for m in perfectMultipliers]).T
+        magiminMultipliers = np.array([m[1] for m in perfectMultipliers])
+
+    # Well-balanced, magimin-heavy ingredients first (or simply the cheapest
+    # ones, when cost is what counts), so good incumbents turn up early and
+    # prune the rest of the tree
+    if perfectMultipliers:
+        # ...or the ones that look best under the multipliers for the highest
+        # star level
+        candidates.sort(
+            key=lambda c: c[5]
+            + np.dot(c[4], gainMultipliers[:, 0])
+            - magiminMultipliers[0] * c[3]
+        )
+    else:
+        candidates.sort(
+            key=lambda c: (
+                c[5] if cheapest else 0,
+                sum(abs(e) for e in c[4]) / c[3] if c[3] else float("inf"),
+                -c[3],
+                c[5],
+            )
+        )
+    names, caps, magiminRows, totals, excesses, prices, masks = (
+        zip(*candidates) if candidates else [()] * 7
+    )
+    mostMagimins = suffixTable(totals, caps, maxIngredients)
+    # How far the candidates from each point on can push every dimension's
+    # excess up or down
+    mostRaise = [
+        suffixTable([max(0, e[d]) for e in excesses], caps, maxIngredients)
+        for d in range(len(ratios))
+    ]
+    mostLower = [
+        suffixTable([max(0, -e[d]) for e in excesses], caps, maxIngredients)
+        for d in range(len(ratios))
+    ]
+    leastCost = suffixTable(prices, caps, maxIngredients, largest=False)
+    reachableMask = list(accumulate(reversed(masks), int.__or__, initial=0))[::-1]
+
+    # Every way of signing the excesses of the dimensions the potion uses; the
+    # others can only ever be in excess
+    usedDimensions = [d for d, r in enumerate(ratios) if r]
+    weightings = []
+    for signs in product([1, -1], repeat=len(usedDimensions)):
+        weighting = [1] * len(ratios)
+        for d, sign in zip(usedDimensions, signs):
+            weighting[d] = sign
+        weightings.append(weighting)
+    weightings = np.array(weightings, dtype=np.int64).T
+    multipliers = np.array(lagrangeMultipliers, dtype=np.int64) * ratioSum
+    shares = ratioSum * np.array(stabilityShares, dtype=np.int64)
+
+    # A recipe of a given rank needs 10 w.excess <= ratioSum * share * total for
+    # every weighting w, as its deviance is at least w.excess / ratioSum. Each
+    # unit of a candidate moves the left side less the right by
+    # balance[candidate, rank, w].
+    balance = (
+        10 * (np.array(excesses, dtype=np.int64).reshape(-1, len(ratios)) @ weightings)
+    )[:, None, :] - np.array(totals, dtype=np.int64)[:, None, None] * shares[:, None]
+    # Folding in the need to reach some number of magimins with a multiplier
+    # gives one sum per (rank, w, multiplier) that the picks have to bring
+    # under the slack; leastGains holds the lowest they can take it
+    leastGains = leastSums(
+        np.minimum(
+            balance[:, :, :, None]
+            - np.array(totals, dtype=np.int64)[:, None, None, None] * multipliers,
+            0,
+        ),
+        caps,
+        maxIngredients,
+    )
+    # Recipes that count cost price a unit of imbalance, and credit a unit of
+    # magimins, at going rates instead; leastPriced holds the lowest price
+    # plus those for exactly k picks, in 200 * ratioSum-ths of a coin
+    coinScale = 200 * ratioSum
+    balanceRates = np.array([0] + magiminPrices, dtype=np.int64)
+    magiminRates = 10 * ratioSum * np.array([0] + magiminPrices, dtype=np.int64)
+    leastPriced = (
+        leastSums(
+            (
+                coinScale * np.array(prices, dtype=np.int64)[:, None, None, None, None]
+                + balance[:, : worstRank + 1, :, None, None] * balanceRates[:, None]
+                - np.array(totals, dtype=np.int64)[:, None, None, None, None]
+                * magiminRates
+            ).astype(np.int32),
+            caps,
+            maxIngredients,
+        )
+        if cheapest or profitable
+        else None
+    )
+
+    if perfectMultipliers:
+        leastPerfectPriced = leastSums(
+            np.array(prices, dtype=np.float64)[:, None]
+            + np.array(excesses, dtype=np.float64) @ gainMultipliers
+            - np.array(totals, dtype=np.float64)[:, None] * magiminMultipliers,
+            caps,
+            maxIngredients,
+        )
+
+    def balanceAllows(start, slots, total, excess, rank, neededTotal):
+        slack = shares[rank] * total - 10 * (np.array(excess) @ weightings)
+        slack = slack[:, None] - multipliers * (neededTotal - total)
+        return not (leastGains[start, slots, rank] > slack).any()
+
+    def reachesStars(start, slots, total, excess, leastRank, mostTotal, stars):
+        # Whether candidates start onwards could lift the recipe to stars
+        for rank in range(leastRank, worstRank + 1):
+            baseStars = stars - stabilityStars[rank]
+            if baseStars >= len(thresholds) - 1:
+                continue
+            neededTotal = thresholds[max(baseStars, 0)]
+            if neededTotal > mostTotal:
+                continue
+            if balanceAllows(start, slots, total, excess, rank, neededTotal):
+                return True
+        return False
+
+    def leastExtraCost(start, slots, total, excess, leastRank, lastRank, neededTotal):
+        # Lower bound on what slots more candidates from start onwards cost if
+        # they are to bring the recipe to neededTotal magimins at some rank
+        # from leastRank to lastRank
+        missing = max(0, neededTotal - total)
+        slack = shares[:, None] * total - 10 * (np.array(excess) @ weightings)
+        leastBalanced = (
+            leastPriced[start, slots, leastRank : lastRank + 1]
+            - (slack[leastRank : lastRank + 1, :, None] * balanceRates)[..., None]
+            + magiminRates * missing
+        )
+        leastExtra = max(
+            leastCost[start][slots],
+            -(-int(leastBalanced.max(axis=(1, 2, 3)).min()) // coinScale),
+        )
+        if perfectMultipliers:
+            leastPerfect = (
+                leastPerfectPriced[start, slots]
+                + np.array(excess) @ gainMultipliers
+                + magiminMultipliers * (neededTotal - total)
+            ).max()
+            # Allow for rounding in the floating point sums
+            leastExtra = max(leastExtra, int(np.ceil(leastPerfect - 1e-6)))
+        return leastExtra
+
+    counts = [0] * len(candidates)
+    # Recipes found so far, best first, and the rank a new one has to beat once
+    # there are count of them
+    best = {"rank": None, "found": []}
+
+    def rankOf(quantity, total, excess, cost, mask):
+        if mask != fullMask:
+            return None
+        deviance = sum(-(-abs(e) // ratioSum) for e in excess)
+        stabilityRank = stabilityRankOf(deviance, total)
+        if stabilityRank is None or stabilityRank > worstRank:
+            return None
+        totalStars = baseStarsOf[total] + stabilityStars[stabilityRank]
+        if profitable:
+            if stabilityRank or quantity != maxIngredients:
+                return None
+            return (basePrices[baseStarsOf[total]] * maxIngredients - cost,)
+        if cheapest:
+            if totalStars < starLevel:
+                return None
+            return (quantity, -cost)
+        return (totalStars,)
+
+    def boundOf(start, quantity, total, excess, cost, mask):
+        # Best rank anything reachable by adding candidates start onwards could
+        # have, or None when nothing down there can be feasible
+        slots = min(maxIngredients - quantity, len(mostMagimins[start]) - 1)
+        if not slots or mask | reachableMask[start] != fullMask:
+            return None
+        if profitable and slots < maxIngredients - quantity:
+            return None
+        mostTotal = min(maxMagimins, total + mostMagimins[start][slots])
+        leastDeviance = sum(
+            -(
+                -max(0, e - mostLower[d][start][slots], -e - mostRaise[d][start][slots])
+                // ratioSum
+            )
+            for d, e in enumerate(excess)
+        )
+        leastRank = stabilityRankOf(leastDeviance, mostTotal)
+        if leastRank is None or leastRank > worstRank:
+            return None
+        if profitable:
+            if leastRank:
+                return None
+            # Weigh every star level still in balanced reach against what its
+            # magimins cost at the least
+            bound = None
+            for baseStars in range(baseStarsOf[mostTotal], -1, -1):
+                mostProfit = bestBasePrice[baseStars] * maxIngredients - cost
+                if bound is not None and mostProfit - leastCost[start][slots] <= bound:
+                    break
+                neededTotal = thresholds[baseStars]
+                if baseStars and not balanceAllows(
+                    start, slots, total, excess, 0, neededTotal
+                ):
+                    continue
+                profit = basePrices[baseStars] * maxIngredients - cost
+                profit -= leastExtraCost(start, slots, total, excess, 0, 0, neededTotal)
+                bound = profit if bound is None else max(bound, profit)
+            return None if bound is None else (bound,)
+        if cheapest:
+            if not reachesStars(
+                start, slots, total, excess, leastRank, mostTotal, starLevel
+            ):
+                return None
+            baseStars = max(0, starLevel - stabilityStars[leastRank])
+            leastExtra = leastExtraCost(
+                start, slots, total, excess, leastRank, worstRank, thresholds[baseStars]
+            )
+            return (quantity + slots, -cost - leastExtra)
+        totalStars = baseStarsOf[mostTotal] + stabilityStars[leastRank]
+        if best["rank"] is None or totalStars <= best["rank"][0]:
+            return (totalStars,)
+        # Only worth going on if the next star up really is within reach
+        if reachesStars(
+            start, slots, total, excess, leastRank, mostTotal, best["rank"][0] + 1
+        ):
+            return (totalStars,)
+        return best["rank"]
+
+    def visit(start, quantity, total, excess, cost, mask):
+        # Decide how many of candidate start to add, most first, then move on
+        # to the next candidate; every recipe is ranked when it is first made
+        bound = boundOf(start, quantity, total, excess, cost, mask)
+        if bound is None or (best["rank"] is not None and bound <= best["rank"]):
+            return
+        for amount in range(min(caps[start], maxIngredients - quantity), 0, -1):
+            newTotal = total + amount * totals[start]
+            if newTotal > maxMagimins:
+                continue
+            counts[start] = amount
+            newExcess = [e + amount * g for e, g in zip(excess, excesses[start])]
+            newCost = cost + amount * prices[start]
+            newMask = mask | masks[start]
+            rank = rankOf(quantity + amount, newTotal, newExcess, newCost, newMask)
+            if rank is not None and (best["rank"] is None or rank > best["rank"]):
+                best["found"].append((rank, counts.copy()))
+                best["found"].sort(key=lambda f: f[0], reverse=True)
+                del best["found"][count:]
+                if len(best["found"]) == count:
+                    best["rank"] = best["found"][-1][0]
+            visit(start + 1, quantity + amount, newTotal, newExcess, newCost, newMask)
+        counts[start] = 0
+        visit(start + 1, quantity, total, excess, cost, mask)
+
+    def solutionOf(recipe):
+        ingredients = {names[j]: amount for j, amount in enumerate(recipe) if amount}
+        ingredients = {
+            name: ingredients[name] for name in PotionIngredient if name in ingredients
+        }
+        magimins = [0] * len(ratios)
+        for j, amount in enumerate(recipe):
+            for d, m in enumerate(magiminRows[j]):
+                magimins[d] += amount * m
+        total = sum(magimins)
+        deviance = sum(
+            -(-abs(m * ratioSum - total * r) // ratioSum)
+            for m, r in zip(magimins, ratios)
+        )
+        stabilityRank = stabilityRankOf(deviance, total)
+        baseStars = baseStarsOf[total]
+        return buildSolution(
+            potionType,
+            ingredients=ingredients,
+            magimins=dict(zip("ABCDE", magimins)),
+            totalMagimins=float(total),
+            deviance=float(deviance),
+            baseStars=float(baseStars),
+            stabilityIndex=stabilityRank,
+            totalStars=float(baseStars + stabilityStars[stabilityRank]),
+            ingredientsQuantity=float(sum(ingredients.values())),
+            basePotionPrice=float(basePrices[baseStars]),
+            ingredientCosts=float(
+                sum(amount * prices[j] for j, amount in enumerate(recipe))
+            ),
+        )
+
+    visit(0, 0, 0, [0] * len(ratios), 0, 0)
+    return [solutionOf(recipe) for rank, recipe in best["found"]]
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from urllib.parse import parse_qs, urlparse
+
+from boxer import gameInfo
+from boxer.backend import SaveFileWatcher, read_reagents
+from boxer.cli import answerQuery, toJson
+from boxer.gameInfo import PotionStability, PotionType
+from boxer.optimization import (
+    PotionOptimizationObjective,
+    defaultFormulation,
+    getPotionModel,
+    needsPerfection,
+)
+
+logger = logging.getLogger(__name__)
+
+# Requests bigger than this are turned away rather than read
+maxBodySize = 1 << 20
+
+
+def warm(cauldrons=(), potionTypes=None):
+    # Loads every gameInfo table and builds the PotionModels for the given
+    # cauldrons up front, so that the first requests only pay for solving.
+    # Models stay cached as long as there are no more than getPotionModel
+    # keeps, so only that many are built.
+    gameInfo.loadAllTables()
+    potionTypes = list(PotionType) if potionTypes is None else potionTypes
+    room = getPotionModel.cache_info().maxsize
+    built = 0
+    for cauldron in cauldrons:
+        for potionType in potionTypes:
+            for objective in [
+                PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE,
+                PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+                PotionOptimizationObjective.MOST_PROFITABLE_BATCH,
+            ]:
+                if built == room:
+                    return built
+                getPotionModel(
+                    cauldron,
+                    potionType,
+                    objective,
+                    needsPerfection(objective, PotionStability.UNSTABLE),
+                    defaultFormulation,
+                )
+                built += 1
+    return built
+
+
+class RecipeServer(ThreadingHTTPServer):
+    # Answers recipe queries over HTTP from one long-lived process, so the
+    # tables, models and solution cache stay warm between requests. With a
+    # save file, queries that bring no ingredients of their own use its
+    # current contents, re-read only when the file changes. Clients may only
+    # name that save file, or those in saveDirectory.
+    daemon_threads = True
+
+    def __init__(self, address, save=None, saveDirectory=None):
+        self.watcher = None if save is None else SaveFileWatcher(save)
+        if self.watcher is not None:
+            # Better to refuse to start than to fail every request
+            self.watcher.poll()
+        self.watcherLock = Lock()
+        super().__init__(address, RecipeRequestHandler)
+        self.save = None if save is None else os.path.realpath(save)
+        self.saveDirectory = (
+            None if saveDirectory is None else os.path.realpath(saveDirectory)
+        )
+
+    def allowsSave(self, save):
+        path = os.path.realpath(save)
+        if path == self.save:
+            return True
+        return (
+            self.saveDirectory is not None
+            and os.path.commonpath([path, self.saveDirectory]) == self.saveDirectory
+        )
+
+    def inventory(self):
+        if self.watcher is None:
+            return None
+        with self.watcherLock:
+            self.watcher.poll()
+            return dict(self.watcher.inventory)
+
+
+class RecipeRequestHandler(BaseHTTPRequestHandler):
+    # GET  /health              {"status": "ok"}
+    # GET  /reagents[?save=...] the ingredients in a save file
+    # POST /reagents            the same, for {"save": "..."}
+    # POST /recipe              one query, as for boxer.cli.solveQuery
+    # POST /recipes             a list of queries, answered in order
+    # Save files named by clients have to be ones the server was given.
+    server_version = "Boxer"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def sendJson(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def readJson(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ValueError("Invalid Content-Length!")
+        if length > maxBodySize:
+            raise ValueError("Request body too large!")
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def saveRefused(self, save):
+        # Why a client-named save file won't be read, or None if it will
+        if not isinstance(save, str):
+            return "The save file has to be a path!"
+        if not self.server.allowsSave(save):
+            return f"Not allowed to read {save}!"
+        return None
+
+    def answer(self, query, inventory):
+        # answerQuery, for queries that only name save files they may read
+        refused = self.saveRefused(query["save"]) if "save" in query else None
+        if refused is None:
+            return answerQuery(query, inventory)
+        answer = {"error": refused}
+        if "id" in query:
+            answer = {"id": query["id"], **answer}
+        return answer
+
+    def reagents(self, save):
+        if save is None:
+            inventory = self.server.inventory()
+            if inventory is None:
+                return HTTPStatus.BAD_REQUEST, {"error": "No save file given!"}
+        else:
+            refused = self.saveRefused(save)
+            if refused is not None:
+                return HTTPStatus.FORBIDDEN, {"error": refused}
+            try:
+                inventory = read_reagents(save)
+            except (OSError, ValueError, IndexError, KeyError) as error:
+                return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        return HTTPStatus.OK, {"result": toJson(inventory)}
+
+    def do_GET(self):
+        self.respond(self.handleGet)
+
+    def do_POST(self):
+        self.respond(self.handlePost)
+
+    def respond(self, handler):
+        # Anything the handlers didn't see coming still gets an answer, rather
+        # than a dropped connection
+        try:
+            handler()
+        except Exception as error:
+            logger.exception("Failed to answer %s %s", self.command, self.path)
+            self.sendJson(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                {"error": f"Internal error: {error!r}"},
+            )
+
+    def handleGet(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self.sendJson(HTTPStatus.OK, {"status": "ok"})
+        elif url.path == "/reagents":
+            save = parse_qs(url.query).get("save", [None])[0]
+            self.sendJson(*self.reagents(save))
+        else:
+            self.sendJson(HTTPStatus.NOT_FOUND, {"error": f"No such page {url.path}"})
+
+    def handlePost(self):
+        path = urlparse(self.path).path
+        if path not in ["/recipe", "/recipes", "/reagents"]:
+            self.sendJson(HTTPStatus.NOT_FOUND, {"error": f"No such page {path}"})
+            return
+        try:
+            body = self.readJson()
+        except json.JSONDecodeError as error:
+            self.sendJson(HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {error}"})
+            return
+        except ValueError as error:
+            self.sendJson(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+
+        if path == "/reagents":
+            if not isinstance(body, dict):
+                body = {}
+            self.sendJson(*self.reagents(body.get("save")))
+        elif path == "/recipe":
+            if not isinstance(body, dict):
+                self.sendJson(
+                    HTTPStatus.BAD_REQUEST, {"error": "Expected a JSON object!"}
+                )
+                return
+            answer = self.answer(body, self.server.inventory())
+            status = HTTPStatus.BAD_REQUEST if "error" in answer else HTTPStatus.OK
+            self.sendJson(status, answer)
+        else:
+            if not isinstance(body, list) or not all(
+                isinstance(query, dict) for query in body
+            ):
+                self.sendJson(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": "Expected a JSON list of objects!"},
+                )
+                return
+            inventory = self.server.inventory()
+            self.sendJson(
+                HTTPStatus.OK, [self.answer(query, inventory) for query in body]
+            )
+
+
+def serve(host="127.0.0.1", port=8765, save=None, saveDirectory=None, cauldrons=()):
+    warm(cauldrons)
+    with RecipeServer((host, port), save=save, saveDirectory=saveDirectory) as server:
+        logger.info("Serving recipes on http://%s:%d", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,64 @@
+import os
+import pickle
+from collections import OrderedDict
+from copy import deepcopy
+from threading import Lock
+
+# Bump whenever the solution format or the model changes meaning, so stale
+# on-disk entries are simply never looked up again
+cacheVersion = 3
+
+# Marks a cache miss, since None is a valid (infeasible) cached answer
+missing = object()
+
+
+class SolutionCache:
+    # Bounded in-memory LRU of solved problems, optionally backed by a
+    # directory of pickled solutions that survives restarts
+    def __init__(self, maxSize=256, directory=None):
+        self.maxSize = maxSize
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return deepcopy(self.entries[key])
+        if self.directory is None:
+            return missing
+        try:
+            with open(self._path(key), "rb") as infile:
+                solution = pickle.load(infile)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return missing
+        self._remember(key, solution)
+        return deepcopy(solution)
+
+    def put(self, key, solution):
+        solution = deepcopy(solution)
+        self._remember(key, solution)
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            temporaryPath = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(temporaryPath, "wb") as outfile:
+                pickle.dump(solution, outfile)
+            os.replace(temporaryPath, self._path(key))
+
+    def _remember(self, key, solution):
+        with self.lock:
+            self.entries[key] = solution
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+solutionCache = SolutionCache(directory=os.environ.get("BOXER_CACHE_DIR"))
@@ -0,0 +1,83 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+
+def processorTime():
+    # Includes finished child processes, which is where CBC does its work
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class SolveStats:
+    # Where one request spent its time, and what it handed the solver. Pass an
+    # instance down as stats= and read it back once the request returns;
+    # onSpan, if given, is called with each phase's name, wall and CPU seconds
+    # as soon as the phase ends.
+    def __init__(self, onSpan=None):
+        self.onSpan = onSpan
+        self.spans = []
+        self.solver = None
+        self.status = None
+        self.variables = None
+        self.constraints = None
+        self.cached = False
+
+    @contextmanager
+    def span(self, name):
+        wallStart, cpuStart = time.perf_counter(), processorTime()
+        try:
+            yield self
+        finally:
+            wall = time.perf_counter() - wallStart
+            cpu = processorTime() - cpuStart
+            self.spans.append((name, wall, cpu))
+            if self.onSpan is not None:
+                self.onSpan(name, wall, cpu)
+
+    def recordProblem(self, prob, status):
+        self.status = status
+        if prob is not None:
+            self.variables = prob.numVariables()
+            self.constraints = prob.numConstraints()
+
+    @property
+    def wallTime(self):
+        return sum(wall for name, wall, cpu in self.spans)
+
+    @property
+    def cpuTime(self):
+        return sum(cpu for name, wall, cpu in self.spans)
+
+    def phases(self):
+        # Wall and CPU seconds per phase name, summed over repeated phases
+        phases = {}
+        for name, wall, cpu in self.spans:
+            total = phases.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            total["wall"] += wall
+            total["cpu"] += cpu
+        return phases
+
+    def asDict(self):
+        return {
+            "solver": self.solver,
+            "status": self.status,
+            "variables": self.variables,
+            "constraints": self.constraints,
+            "cached": self.cached,
+            "wallTime": self.wallTime,
+            "cpuTime": self.cpuTime,
+            "phases": self.phases(),
+        }
+
+    def __repr__(self):
+        return (
+            f"SolveStats(status={self.status!r}, variables={self.variables}, "
+            f"constraints={self.constraints}, wallTime={self.wallTime:.3f}, "
+            f"cpuTime={self.cpuTime:.3f})"
+        )
+
+
+def span(stats, name):
+    # stats.span(name), or nothing at all when nobody asked for stats
+    return nullcontext() if stats is None else stats.span(name)
@@ -0,0 +1,82 @@
+import os
+import random
+import sys
+import warnings
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from boxer import gameInfo  # noqa: E402
+from boxer.gameInfo import (  # noqa: E402
+    PotionIngredient,
+    PotionStability,
+    PotionType,
+    SensoryQuality,
+    SensoryType,
+)
+from boxer.optimization import PotionOptimizationObjective  # noqa: E402
+
+# Objectives a single recipe can be asked for
+recipeObjectives = [
+    PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE,
+    PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+    PotionOptimizationObjective.MOST_PROFITABLE_BATCH,
+]
+
+
+def randomInventory(seed, size=40):
+    # The same handful of each of size ingredients every run for a given seed
+    rng = random.Random(seed)
+    return {
+        name: rng.randint(1, 6) for name in rng.sample(list(PotionIngredient), size)
+    }
+
+
+def randomRequest(seed, objective):
+    # getBestPotion's keyword arguments for a request in one of the smaller
+    # cauldrons, which every engine answers in well under a second
+    rng = random.Random(seed)
+    cauldrons = gameInfo.cauldronProperties.sort_values(
+        ["maxIngredients", "maxMagimins"]
+    ).index[:12]
+    request = {
+        "ingredientInventory": randomInventory(seed, rng.randint(15, 40)),
+        "cauldron": rng.choice(list(cauldrons)),
+        "potionType": rng.choice(list(PotionType)),
+        "objective": objective,
+        "sensoryData": {
+            s: rng.choice([SensoryQuality.ANY] * 6 + [SensoryQuality.NEUTRAL])
+            for s in SensoryType
+        },
+    }
+    if objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
+        request["minStability"] = rng.choice(list(PotionStability))
+        request["starLevel"] = rng.randint(0, 12)
+    return request
+
+
+def objectiveValue(objective, solution):
+    # What the objective ranks recipes by, which tied recipes share
+    if solution is None:
+        return None
+    if objective == PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE:
+        return solution["totalStars"]
+    if objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
+        return (
+            solution["ingredientsQuantity"],
+            round(-solution["ingredientCosts"], 6),
+        )
+    return round(
+        solution["basePotionPrice"] * solution["ingredientsQuantity"]
+        - solution["ingredientCosts"],
+        6,
+    )
+
+
+@pytest.fixture(autouse=True)
+def quietPulp():
+    # PuLP warns about the spaces in the models' names on every build
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
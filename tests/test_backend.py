@@ -0,0 +1,267 @@
+import os
+import random
+
+import pytest
+
+from boxer.backend import (
+    SaveFile,
+    SaveFileWatcher,
+    inventory_delta,
+    parse_reagents,
+    read_reagents,
+)
+from boxer.gameInfo import PotionIngredient, enumToEnglish
+
+# A UTF-16 name whose "x" then "Ā" encode to 78 00 00 01, a null code
+# unit's worth of bytes that doesn't start on a code unit boundary
+oddlyAligned = "Ā"
+
+
+def reagentBytes(
+    name, quantity, wide=False, magimins=(), unknown0=2, unknown3=7, rng=None
+):
+    # One reagent record as the game writes it; the bytes the parser skips
+    # are random, nulls included, so that it can't lean on them
+    rng = rng or random.Random(0)
+
+    def filler(size):
+        return bytes(rng.choice([0, rng.randrange(256)]) for _ in range(size))
+
+    if wide:
+        head = b"\xff\xff\xff" + name.encode("utf-16-le") + b"\x00\x00"
+    else:
+        head = b"\x01\x02\x03" + name.encode("utf-8") + b"\x00"
+    unknown1 = filler(unknown0 + 1) + bytes([len(magimins)])
+    return (
+        head
+        + filler(0xE0)
+        + bytes([unknown0])
+        + filler(0x3)
+        + unknown1
+        + filler(0x3)
+        + b"".join(
+            bytes([magiminType, amount]) + filler(0x3)
+            for magiminType, amount in magimins
+        )
+        + filler(0x9)
+        + bytes([quantity])
+        + filler(0x3)
+        + bytes([unknown3])
+    )
+
+
+def saveBytes(records, trailing=b""):
+    # A save holding records, each made by reagentBytes
+    return (
+        bytes(range(0x1F)) + bytes([len(records)]) + b"\x00" * 0x4 + b"".join(records)
+    ) + trailing
+
+
+def englishName(ingredient):
+    return enumToEnglish[ingredient]
+
+
+def sampleRecords():
+    # What sampleSave's records hold, field by field
+    ingredients = list(PotionIngredient)[:6]
+    return [
+        {"ingredient": ingredients[0], "quantity": 3},
+        {
+            "ingredient": ingredients[1],
+            "quantity": 12,
+            "wide": True,
+            "magimins": [(0, 8)],
+        },
+        {
+            "ingredient": ingredients[2],
+            "quantity": 1,
+            "wide": True,
+            "magimins": [(1, 4), (2, 16)],
+            "suffix": oddlyAligned,
+        },
+        {
+            "ingredient": ingredients[3],
+            "quantity": 99,
+            "magimins": [(0, 1), (3, 2), (4, 3)],
+            "unknown3": 200,
+        },
+        {"ingredient": ingredients[4], "quantity": 0, "unknown0": 0},
+        {"ingredient": ingredients[5], "quantity": 255, "wide": True, "unknown0": 9},
+    ]
+
+
+def recordName(record):
+    return englishName(record["ingredient"]) + record.get("suffix", "")
+
+
+@pytest.fixture
+def sampleSave():
+    # Narrow and wide names, one ending in an oddly aligned pair of nulls,
+    # no to several magimin entries, and bytes past the last record
+    records = [
+        reagentBytes(
+            recordName(record),
+            record["quantity"],
+            wide=record.get("wide", False),
+            magimins=record.get("magimins", ()),
+            unknown0=record.get("unknown0", 2),
+            unknown3=record.get("unknown3", 7),
+        )
+        for record in sampleRecords()
+    ]
+    expected = {record["ingredient"]: record["quantity"] for record in sampleRecords()}
+    return saveBytes(records, trailing=b"\x00\xff" * 50), expected
+
+
+def testParseReagents(sampleSave):
+    data, expected = sampleSave
+    assert parse_reagents(data) == expected
+
+
+def testReadReagentsAgrees(sampleSave, tmp_path):
+    data, expected = sampleSave
+    (tmp_path / "save").write_bytes(data)
+    assert read_reagents(tmp_path / "save") == parse_reagents(data) == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def testRandomSaves(seed, tmp_path):
+    rng = random.Random(seed)
+    ingredients = rng.sample(list(PotionIngredient), rng.randint(0, 30))
+    records = []
+    expected = {}
+    for ingredient in ingredients:
+        wide = rng.random() < 0.3
+        name = englishName(ingredient)
+        if wide and rng.random() < 0.5:
+            name += oddlyAligned
+        expected[ingredient] = rng.randrange(256)
+        records.append(
+            reagentBytes(
+                name,
+                expected[ingredient],
+                wide=wide,
+                magimins=[
+                    (rng.randrange(5), rng.randrange(256))
+                    for _ in range(rng.randint(0, 5))
+                ],
+                unknown0=rng.randint(0, 12),
+                rng=rng,
+            )
+        )
+    data = saveBytes(records, trailing=bytes(rng.randrange(256) for _ in range(40)))
+    (tmp_path / "save").write_bytes(data)
+    assert parse_reagents(data) == read_reagents(tmp_path / "save") == expected
+
+
+def testLaterRecordsWin():
+    ingredient = PotionIngredient(1)
+    data = saveBytes(
+        [
+            reagentBytes(englishName(ingredient), 4),
+            reagentBytes(englishName(ingredient), 9, wide=True),
+        ]
+    )
+    assert parse_reagents(data) == {ingredient: 9}
+
+
+def testEmptySaves(tmp_path):
+    (tmp_path / "empty").write_bytes(b"")
+    assert read_reagents(tmp_path / "empty") == parse_reagents(b"") == {}
+    assert parse_reagents(saveBytes([])) == {}
+
+
+def testUnterminatedName():
+    data = saveBytes([reagentBytes(englishName(PotionIngredient(1)), 1)])
+    with pytest.raises(ValueError):
+        parse_reagents(data[: 0x24 + 0x3 + 4])
+
+
+def testSaveFileRecords(sampleSave, tmp_path):
+    data, expected = sampleSave
+    (tmp_path / "save").write_bytes(data)
+    with SaveFile(tmp_path / "save") as save:
+        assert len(save) == len(sampleRecords())
+        assert save.inventory() == parse_reagents(data) == expected
+        for record, built in zip(save, sampleRecords()):
+            assert record.name == recordName(built)
+            assert record.wide == built.get("wide", False)
+            assert record.ingredient == built["ingredient"]
+            assert record.quantity == built["quantity"]
+            assert record.magimins == {
+                "ABCDE"[magiminType]: amount
+                for magiminType, amount in built.get("magimins", ())
+            }
+            assert record.unknown0 == built.get("unknown0", 2)
+            assert len(record.unknown1) == record.unknown0 + 2
+            assert record.unknown1[-1] == len(built.get("magimins", ()))
+            assert record.unknown3 == built.get("unknown3", 7)
+
+
+def testEmptySaveFile(tmp_path):
+    (tmp_path / "empty").write_bytes(b"")
+    with SaveFile(tmp_path / "empty") as save:
+        assert len(save) == 0
+        assert save.inventory() == {}
+
+
+def testInventoryDelta():
+    old = {"a": 1, "b": 2, "c": 3}
+    new = {"b": 2, "c": 5, "d": 4}
+    assert inventory_delta(old, new) == {"a": -1, "c": 2, "d": 4}
+    assert inventory_delta(new, new) == {}
+    assert inventory_delta({}, new) == new
+
+
+def writeSave(path, data, mtime):
+    # Saves rewritten within the same clock tick would look unchanged
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def testWatcherReportsChanges(tmp_path):
+    first, second = list(PotionIngredient)[:2]
+    path = tmp_path / "save"
+    watcher = SaveFileWatcher(path)
+    assert watcher.poll() == {}
+
+    writeSave(path, saveBytes([reagentBytes(englishName(first), 3)]), 10**9)
+    assert watcher.poll() == {first: 3}
+    assert watcher.poll() == {}
+
+    # Touched but unchanged
+    writeSave(path, saveBytes([reagentBytes(englishName(first), 3)]), 2 * 10**9)
+    assert watcher.poll() == {}
+
+    writeSave(
+        path,
+        saveBytes(
+            [reagentBytes(englishName(first), 1), reagentBytes(englishName(second), 5)]
+        ),
+        3 * 10**9,
+    )
+    assert watcher.poll() == {first: -2, second: 5}
+    assert watcher.inventory == {first: 1, second: 5}
+
+
+def testWatcherWaitsOutPartialWrites(tmp_path):
+    ingredient = PotionIngredient(1)
+    data = saveBytes([reagentBytes(englishName(ingredient), 3)])
+    path = tmp_path / "save"
+    writeSave(path, data, 10**9)
+    watcher = SaveFileWatcher(path)
+    assert watcher.poll() == {ingredient: 3}
+
+    changed = saveBytes([reagentBytes(englishName(ingredient), 8)])
+    writeSave(path, changed[:0x30], 2 * 10**9)
+    assert watcher.poll() == {}
+    assert watcher.inventory == {ingredient: 3}
+    writeSave(path, changed, 3 * 10**9)
+    assert watcher.poll() == {ingredient: 5}
+
+
+def testWatcherRefusesWhatIsntASave(tmp_path):
+    path = tmp_path / "notes.txt"
+    writeSave(path, b"Not a save file at all, but long enough to try." * 4, 10**9)
+    with pytest.raises(ValueError):
+        SaveFileWatcher(path).poll()
@@ -0,0 +1,119 @@
+import io
+import json
+
+import pytest
+
+from conftest import randomInventory
+
+from boxer import cli
+from boxer.cli import answerQuery, main, solveQuery, toJson
+
+
+def baseQuery(**changes):
+    return {
+        "inventory": toJson(randomInventory(0)),
+        "cauldron": "Wooden Cauldron",
+        "type": "Health Potion",
+        "tier": "Minor",
+        "stars": 2,
+        **changes,
+    }
+
+
+def runJsonl(monkeypatch, capsys, queries, *arguments):
+    lines = [q if isinstance(q, str) else json.dumps(q) for q in queries]
+    monkeypatch.setattr("sys.stdin", io.StringIO("\n".join(lines) + "\n"))
+    assert main(["solve", "--jsonl", *arguments]) == 0
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def testSolveQuery():
+    result = solveQuery(baseQuery())["result"]
+    inventory = baseQuery()["inventory"]
+    assert result["totalStars"] >= 2
+    assert all(
+        amount <= inventory[name] for name, amount in result["ingredients"].items()
+    )
+
+
+def testTopK():
+    results = solveQuery(baseQuery(topK=2))["result"]
+    assert len(results) == 2
+
+
+@pytest.mark.parametrize(
+    "changes, message",
+    [
+        ({"sensory": "Good"}, "sensory qualities have to be an object"),
+        ({"stars": "3"}, "stars has to be a whole number"),
+        ({"stars": 2.5}, "stars has to be a whole number"),
+        ({"topK": True}, "topK has to be a whole number"),
+    ],
+)
+def testBadlyTypedQueries(changes, message):
+    answer = answerQuery(baseQuery(id=7, **changes))
+    assert answer["id"] == 7
+    assert message in answer["error"]
+
+
+def testUnknownNames():
+    answer = answerQuery(baseQuery(type="Troll Sweat Potion"))
+    assert answer["error"].startswith("Unknown")
+
+
+def testMissingInventory():
+    query = baseQuery()
+    del query["inventory"]
+    assert "ingredients" in answerQuery(query)["error"]
+
+
+def testJsonlKeepsGoing(monkeypatch, capsys):
+    answers = runJsonl(
+        monkeypatch,
+        capsys,
+        [
+            baseQuery(id=1),
+            "{not json",
+            baseQuery(id=2, stars="many"),
+            [1, 2],
+            "",
+            baseQuery(id=3, type="Mana Potion"),
+        ],
+    )
+    assert len(answers) == 5
+    assert "result" in answers[0] and answers[0]["id"] == 1
+    assert answers[1]["error"].startswith("Invalid JSON")
+    assert answers[2]["id"] == 2 and "whole number" in answers[2]["error"]
+    assert "JSON object" in answers[3]["error"]
+    assert "result" in answers[4] and answers[4]["id"] == 3
+
+
+def testJsonlSurvivesUnexpectedErrors(monkeypatch, capsys):
+    solve = cli.getOptimumPotionRecipe
+
+    def failOnMana(**kwargs):
+        if kwargs["potionType"] == "Mana Potion":
+            raise RuntimeError("boom")
+        return solve(**kwargs)
+
+    monkeypatch.setattr(cli, "getOptimumPotionRecipe", failOnMana)
+    answers = runJsonl(
+        monkeypatch,
+        capsys,
+        [baseQuery(id=1, type="Mana Potion"), baseQuery(id=2)],
+    )
+    assert answers[0] == {"id": 1, "error": "Internal error: RuntimeError('boom')"}
+    assert "result" in answers[1]
+
+
+def testFlagsAreDefaults(monkeypatch, capsys):
+    query = baseQuery()
+    del query["stars"]
+    (answer,) = runJsonl(monkeypatch, capsys, [query], "--stars", "4")
+    assert answer["result"]["totalStars"] >= 4
+
+
+def testAnytimePrintsAPreliminaryRecipe(monkeypatch, capsys):
+    answers = runJsonl(monkeypatch, capsys, [baseQuery(id=1, mode="anytime")])
+    assert [list(a) for a in answers] == [["id", "preliminary"], ["id", "result"]]
+    assert answers[0]["preliminary"]["ingredients"]
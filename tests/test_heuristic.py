@@ -0,0 +1,114 @@
+import pytest
+
+from conftest import objectiveValue, randomInventory, randomRequest, recipeObjectives
+
+from boxer import gameInfo
+from boxer.gameInfo import PotionStability, SensoryQuality
+from boxer.optimization import (
+    BoxerException,
+    PotionOptimizationObjective,
+    evaluateRecipes,
+    getBestPotion,
+    getOptimumPotionRecipe,
+    recipeArray,
+)
+from boxer.solveStats import SolveStats
+
+
+def assertBrewable(request, solution):
+    # Everything the request asks of a recipe, checked on its ingredients
+    objective = request["objective"]
+    batch = objective == PotionOptimizationObjective.MOST_PROFITABLE_BATCH
+    cauldron = gameInfo.cauldronProperties.loc[request["cauldron"]]
+    inventory = request["ingredientInventory"]
+    ingredients = solution["ingredients"]
+    assert all(
+        name in inventory and 0 < amount and (batch or amount <= inventory[name])
+        for name, amount in ingredients.items()
+    )
+    quantity = sum(ingredients.values())
+    assert quantity <= cauldron["maxIngredients"]
+    if batch:
+        assert quantity == cauldron["maxIngredients"]
+
+    figures = evaluateRecipes(
+        recipeArray([ingredients]), request["potionType"], request["cauldron"]
+    )
+    assert figures["feasible"][0]
+    assert figures["totalMagimins"][0] <= cauldron["maxMagimins"]
+    minStability = request.get("minStability", PotionStability.UNSTABLE)
+    if batch:
+        minStability = PotionStability.PERFECT
+    assert figures["stabilityIndex"][0] <= PotionStability.PERFECT.value - (
+        minStability.value
+    )
+    if objective == PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS:
+        assert figures["totalStars"][0] >= request["starLevel"]
+    for sense, quality in request["sensoryData"].items():
+        if quality == SensoryQuality.NEUTRAL:
+            assert solution["sensory"].get(sense, {"bad": 0})["bad"] == 0
+
+
+@pytest.mark.parametrize("objective", recipeObjectives, ids=lambda o: o.name)
+@pytest.mark.parametrize("seed", range(10))
+def testHeuristicRecipesCanBeBrewed(objective, seed):
+    request = randomRequest(seed, objective)
+    try:
+        exact = getBestPotion(**request, useCache=False, solver="cbc")
+    except BoxerException:
+        return
+    solution = getBestPotion(**request, solver="heuristic")
+    if solution is None:
+        return
+    assertBrewable(request, solution)
+    # No better than the optimum, or the optimum isn't one
+    assert exact is not None
+    assert objectiveValue(objective, solution) <= objectiveValue(objective, exact)
+
+
+def englishRequest(**kwargs):
+    return {
+        "ingredientInventory": randomInventory(0),
+        "cauldron": "Wooden Cauldron",
+        "potionType": "Health Potion",
+        "objective": PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE,
+        "useCache": False,
+        **kwargs,
+    }
+
+
+def testFastModeOnlyRunsTheHeuristic():
+    stats = SolveStats()
+    solution = getOptimumPotionRecipe(**englishRequest(), mode="fast", stats=stats)
+    assert stats.solver == "heuristic"
+    assert solution is not None
+
+
+def testAnytimeModeHandsOverTheHeuristicRecipeFirst():
+    events = []
+    stats = SolveStats(onSpan=lambda name, wall, cpu: events.append(name))
+    solution = getOptimumPotionRecipe(
+        **englishRequest(),
+        mode="anytime",
+        onHeuristicRecipe=lambda recipe: events.append(recipe),
+        stats=stats,
+    )
+    early = [event for event in events if isinstance(event, dict)]
+    assert len(early) == 1
+    # Before the exact solve even starts, and no better than its answer
+    assert events.index(early[0]) < events.index("solve")
+    objective = PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE
+    assert objectiveValue(objective, early[0]) <= objectiveValue(objective, solution)
+    assert objectiveValue(objective, solution) == objectiveValue(
+        objective, getOptimumPotionRecipe(**englishRequest(), mode="exact")
+    )
+
+
+def testFastModeCantFindSeveralRecipes():
+    with pytest.raises(BoxerException):
+        getOptimumPotionRecipe(**englishRequest(), mode="fast", topK=3)
+
+
+def testUnknownMode():
+    with pytest.raises(BoxerException):
+        getOptimumPotionRecipe(**englishRequest(), mode="slow")
@@ -0,0 +1,256 @@
+import threading
+from collections import Counter
+import time
+
+import pytest
+
+from conftest import objectiveValue, randomInventory, randomRequest, recipeObjectives
+
+from boxer import gameInfo, optimization
+from boxer.gameInfo import Cauldron, PotionType
+from boxer.optimization import (
+    BoxerException,
+    PotionOptimizationObjective,
+    formulations,
+    getBestPotion,
+    getOptimumPotionRecipe,
+    getOptimumPotionRecipesBatch,
+    getProductionPlan,
+    infeasibilityReasons,
+    recipeSolution,
+)
+
+
+def solveOrComplain(request, **kwargs):
+    try:
+        return getBestPotion(**request, useCache=False, **kwargs)
+    except BoxerException as error:
+        return str(error)
+
+
+@pytest.mark.parametrize("formulation", formulations)
+@pytest.mark.parametrize("objective", recipeObjectives, ids=lambda o: o.name)
+@pytest.mark.parametrize("seed", range(8))
+def testFormulationsReachTheSameOptimum(formulation, objective, seed):
+    request = randomRequest(seed, objective)
+    expected = solveOrComplain(request, solver="search")
+    solution = solveOrComplain(request, solver="cbc", formulation=formulation)
+    if isinstance(expected, str):
+        assert solution == expected
+        return
+    assert objectiveValue(objective, solution) == objectiveValue(objective, expected)
+    if solution is not None:
+        # Brewed, the recipe is worth what the model says it is
+        brewed = recipeSolution(
+            solution["ingredients"], request["potionType"], request["cauldron"]
+        )
+        assert objectiveValue(objective, brewed) == objectiveValue(objective, expected)
+        if "starLevel" in request:
+            assert brewed["totalStars"] >= request["starLevel"]
+
+
+@pytest.fixture
+def starts(monkeypatch):
+    # The warmStart each CBC solve is handed
+    starts = []
+    solve = optimization.solverEngines["cbc"]
+
+    def recordingSolve(prob, warmStart=False, stopEvent=None):
+        starts.append(warmStart)
+        return solve(prob, warmStart=warmStart, stopEvent=stopEvent)
+
+    monkeypatch.setitem(optimization.solverEngines, "cbc", recordingSolve)
+    return starts
+
+
+@pytest.mark.parametrize("formulation", formulations)
+def testOnlyRecipesThatFitAreStarts(formulation, starts):
+    objective = PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE
+    request = randomRequest(3, objective)
+    first = getBestPotion(
+        **request, useCache=False, solver="cbc", formulation=formulation
+    )
+
+    # Without the last recipe's ingredients, it can't be a start
+    without = {
+        **request,
+        "ingredientInventory": {
+            k: v
+            for k, v in request["ingredientInventory"].items()
+            if k not in first["ingredients"]
+        },
+    }
+    getBestPotion(**without, useCache=False, solver="cbc", formulation=formulation)
+    warm = getBestPotion(
+        **request,
+        useCache=False,
+        solver="cbc",
+        formulation=formulation,
+        initialRecipe=first["ingredients"],
+    )
+    assert starts[1:] == [False, True]
+    assert objectiveValue(objective, warm) == objectiveValue(objective, first)
+
+
+def batchRequests():
+    return [
+        {"potionType": potionType, "tier": "Minor", "starLevel": stars}
+        for potionType in ["Health Potion", "Mana Potion"]
+        for stars in [0, 2, 4]
+    ]
+
+
+def testBatchMatchesOneByOne():
+    inventory = randomInventory(0)
+    solutions = getOptimumPotionRecipesBatch(
+        inventory, "Wooden Cauldron", batchRequests(), maxWorkers=2
+    )
+    # Ties between equally good recipes may go either way
+    objective = PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS
+    assert [objectiveValue(objective, s) for s in solutions] == [
+        objectiveValue(
+            objective,
+            getOptimumPotionRecipe(
+                ingredientInventory=inventory, cauldron="Wooden Cauldron", **request
+            ),
+        )
+        for request in batchRequests()
+    ]
+
+
+def testBatchErrorsStayWithTheirRequest():
+    requests = batchRequests()[:2]
+    requests.insert(
+        1, {"potionType": "Health Potion", "tier": "Masterwork", "starLevel": 5}
+    )
+    solutions = getOptimumPotionRecipesBatch(
+        randomInventory(0), "Wooden Cauldron", requests, maxWorkers=2
+    )
+    assert len(solutions) == 3
+    assert "out of reach" in solutions[1]["error"]
+    assert "ingredients" in solutions[0] and "ingredients" in solutions[2]
+
+
+def testEmptyBatch():
+    assert getOptimumPotionRecipesBatch(randomInventory(0), "Wooden Cauldron") == []
+
+
+def slowRequest(solver):
+    # Seconds of branch and bound for either engine
+    cauldron = gameInfo.cauldronProperties.sort_values(
+        ["maxIngredients", "maxMagimins"]
+    ).index[-1]
+    return dict(
+        ingredientInventory=randomInventory(1, 200),
+        cauldron=cauldron,
+        potionType=PotionType.HEALTH_POTION,
+        objective=PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS,
+        starLevel=20,
+        solver=solver,
+        useCache=False,
+    )
+
+
+@pytest.mark.parametrize("solver", ["cbc", "highs"])
+def testStoppingGivesUpPartWay(solver):
+    stopEvent = threading.Event()
+    threading.Timer(0.2, stopEvent.set).start()
+    started = time.perf_counter()
+    with pytest.raises(BoxerException, match="Stopped!"):
+        getBestPotion(stopEvent=stopEvent, **slowRequest(solver))
+    assert time.perf_counter() - started < 1
+
+
+@pytest.mark.parametrize("objective", recipeObjectives, ids=lambda o: o.name)
+def testUnstoppedSolvesAreUnchanged(objective):
+    request = randomRequest(0, objective)
+    assert objectiveValue(
+        objective, getBestPotion(stopEvent=threading.Event(), **request, useCache=False)
+    ) == objectiveValue(objective, getBestPotion(**request, useCache=False))
+
+
+planPotionTypes = [PotionType.HEALTH_POTION, PotionType.MANA_POTION]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def testProductionPlansStayWithinTheInventory(seed):
+    inventory = randomInventory(seed)
+    cauldron = list(Cauldron)[0]
+    plan = getProductionPlan(inventory, [cauldron], planPotionTypes)
+    used = Counter()
+    for solution in plan:
+        used.update(solution["ingredients"])
+    assert all(amount <= inventory[name] for name, amount in used.items())
+
+    # Any one batch on its own is a plan too
+    batches = [
+        solveOrComplain(
+            dict(
+                ingredientInventory=inventory,
+                cauldron=cauldron,
+                potionType=potionType,
+                objective=PotionOptimizationObjective.MOST_PROFITABLE_BATCH,
+            )
+        )
+        for potionType in planPotionTypes
+    ]
+    bestBatch = max([0] + [s["baseNetProfit"] for s in batches if isinstance(s, dict)])
+    assert sum(s["baseNetProfit"] for s in plan) >= bestBatch - 1e-6
+
+
+def testProductionPlansKeepToMaxBrews():
+    plan = getProductionPlan(
+        randomInventory(1), [list(Cauldron)[0]], planPotionTypes, maxBrews=2
+    )
+    assert 0 < len(plan) <= 2
+
+
+def testOutOfReachStarLevels():
+    with pytest.raises(BoxerException) as caught:
+        getOptimumPotionRecipe(
+            ingredientInventory=randomInventory(0),
+            cauldron="Wooden Cauldron",
+            potionType="Health Potion",
+            tier="Masterwork",
+            starLevel=5,
+        )
+    assert "a Masterwork 5-star potion is out of reach" in str(caught.value)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def testReachableStarLevelsPassThePreCheck(seed):
+    request = randomRequest(seed, PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE)
+    best = getBestPotion(**request, useCache=False)
+    if best is None:
+        pytest.skip("Nothing can be brewed")
+    request["objective"] = PotionOptimizationObjective.CHEAPEST_FOR_GIVEN_STARS
+    request["starLevel"] = best["totalStars"]
+    assert infeasibilityReasons(**request) == []
+
+
+@pytest.fixture
+def unpruned(monkeypatch):
+    # Models with a binary for every star level, whatever the cauldron and
+    # inventory can reach
+    everyLevel = len(optimization.gameInfo.starRequirements.columns) - 1
+    optimization.getPotionModel.cache_clear()
+    monkeypatch.setattr(optimization, "reachableStarLevels", lambda _: everyLevel)
+    yield
+    optimization.getPotionModel.cache_clear()
+
+
+@pytest.mark.parametrize("formulation", formulations)
+@pytest.mark.parametrize("objective", recipeObjectives, ids=lambda o: o.name)
+def testPruningKeepsTheOptimum(formulation, objective, request):
+    requests = [randomRequest(seed, objective) for seed in range(6)]
+    pruned = [solveOrComplain(r, formulation=formulation) for r in requests]
+    request.getfixturevalue("unpruned")
+    for r, solution in zip(requests, pruned):
+        full = solveOrComplain(r, formulation=formulation)
+        if isinstance(solution, dict) and isinstance(full, dict):
+            assert objectiveValue(objective, solution) == objectiveValue(
+                objective, full
+            )
+        else:
+            # Out of reach before pruning means out of reach after it
+            assert not isinstance(full, dict), full
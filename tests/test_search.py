@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import objectiveValue, randomRequest, recipeObjectives
+
+from boxer.optimization import (
+    BoxerException,
+    getBestPotion,
+    getTopPotions,
+    recipeSolution,
+)
+
+
+def solveBoth(request, solve, **kwargs):
+    answers = []
+    for solver in ["cbc", "search"]:
+        try:
+            answers.append(solve(**request, useCache=False, solver=solver, **kwargs))
+        except BoxerException as error:
+            answers.append(str(error))
+    return answers
+
+
+@pytest.mark.parametrize("objective", recipeObjectives, ids=lambda o: o.name)
+@pytest.mark.parametrize("seed", range(8))
+def testSearchMatchesCbc(objective, seed):
+    milp, search = solveBoth(randomRequest(seed, objective), getBestPotion)
+    if isinstance(milp, str):
+        assert search == milp
+    else:
+        assert objectiveValue(objective, search) == objectiveValue(objective, milp)
+
+
+@pytest.mark.parametrize("objective", recipeObjectives, ids=lambda o: o.name)
+def testSearchTopPotionsMatchCbc(objective):
+    milp, search = solveBoth(randomRequest(100, objective), getTopPotions, count=3)
+    assert [objectiveValue(objective, s) for s in search] == [
+        objectiveValue(objective, s) for s in milp
+    ]
+
+
+@pytest.mark.parametrize("objective", recipeObjectives, ids=lambda o: o.name)
+def testSearchRecipesAreWhatTheySay(objective):
+    # The figures search reports are those of the ingredients it picked
+    request = randomRequest(200, objective)
+    solution = getBestPotion(**request, useCache=False, solver="search")
+    if solution is not None:
+        again = recipeSolution(
+            solution["ingredients"], request["potionType"], request["cauldron"]
+        )
+        assert again == solution
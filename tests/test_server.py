@@ -0,0 +1,182 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from conftest import randomInventory
+from test_backend import englishName, reagentBytes, saveBytes
+
+from boxer import server as serverModule
+from boxer.cli import toJson
+from boxer.server import RecipeServer
+
+
+def writeSave(path, inventory):
+    path.write_bytes(
+        saveBytes(
+            [
+                reagentBytes(englishName(name), amount)
+                for name, amount in inventory.items()
+            ]
+        )
+    )
+    return str(path)
+
+
+@pytest.fixture
+def startServer():
+    # Starts a RecipeServer on a free port; returns a function that sends it a
+    # request and gives back the status and decoded answer
+    servers = []
+
+    def start(save=None, saveDirectory=None):
+        recipeServer = RecipeServer(
+            ("127.0.0.1", 0), save=save, saveDirectory=saveDirectory
+        )
+        servers.append(recipeServer)
+        threading.Thread(target=recipeServer.serve_forever, daemon=True).start()
+        port = recipeServer.server_address[1]
+
+        def request(method, path, body=None, headers=None):
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            if body is not None and not isinstance(body, bytes):
+                body = json.dumps(body).encode("utf-8")
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            answer = json.loads(response.read())
+            connection.close()
+            return response.status, answer
+
+        return request
+
+    yield start
+    for recipeServer in servers:
+        recipeServer.shutdown()
+        recipeServer.server_close()
+
+
+def query(**changes):
+    return {
+        "cauldron": "Wooden Cauldron",
+        "type": "Health Potion",
+        "tier": "Minor",
+        "stars": 2,
+        **changes,
+    }
+
+
+def testHealth(startServer):
+    assert startServer()("GET", "/health") == (200, {"status": "ok"})
+
+
+def testUnknownPages(startServer):
+    request = startServer()
+    assert request("GET", "/recipe")[0] == 404
+    assert request("POST", "/health", {})[0] == 404
+
+
+def testRecipe(startServer):
+    inventory = toJson(randomInventory(0))
+    status, answer = startServer()("POST", "/recipe", query(inventory=inventory, id=4))
+    assert status == 200
+    assert answer["id"] == 4
+    assert answer["result"]["totalStars"] >= 2
+    assert all(
+        amount <= inventory[name]
+        for name, amount in answer["result"]["ingredients"].items()
+    )
+
+
+def testRecipeErrors(startServer):
+    request = startServer()
+    status, answer = request("POST", "/recipe", query())
+    assert status == 400 and "ingredients" in answer["error"]
+    status, answer = request("POST", "/recipe", [query()])
+    assert status == 400 and "JSON object" in answer["error"]
+    status, answer = request("POST", "/recipe", b"{not json")
+    assert status == 400 and answer["error"].startswith("Invalid JSON")
+    status, answer = request("POST", "/recipe", query(sensory="Good", inventory={}))
+    assert status == 400 and "sensory" in answer["error"]
+
+
+def testRecipes(startServer, tmp_path):
+    save = writeSave(tmp_path / "save", randomInventory(0))
+    status, answers = startServer(save=save)(
+        "POST",
+        "/recipes",
+        [query(id=1), query(id=2, type="Troll Sweat Potion"), query(id=3, stars=0)],
+    )
+    assert status == 200
+    assert [a["id"] for a in answers] == [1, 2, 3]
+    assert "result" in answers[0] and "result" in answers[2]
+    assert "error" in answers[1]
+    status, answer = startServer()("POST", "/recipes", {"queries": []})
+    assert status == 400
+
+
+def testReagents(startServer, tmp_path):
+    inventory = randomInventory(0, 10)
+    save = writeSave(tmp_path / "save", inventory)
+    request = startServer(save=save)
+    assert request("GET", "/reagents") == (200, {"result": toJson(inventory)})
+    assert request("POST", "/reagents", {}) == (200, {"result": toJson(inventory)})
+    assert request("GET", f"/reagents?save={save}")[0] == 200
+    assert request("POST", "/reagents", {"save": save})[0] == 200
+
+
+def testReagentsWithoutASave(startServer):
+    status, answer = startServer()("GET", "/reagents")
+    assert status == 400 and answer["error"] == "No save file given!"
+
+
+def testOnlyAllowedSavesAreRead(startServer, tmp_path):
+    (tmp_path / "allowed").mkdir()
+    save = writeSave(tmp_path / "save", randomInventory(0))
+    other = writeSave(tmp_path / "other", randomInventory(1))
+    nearby = writeSave(tmp_path / "allowed" / "save", randomInventory(2))
+    sneaky = str(tmp_path / "allowed" / ".." / "other")
+
+    request = startServer(save=save, saveDirectory=str(tmp_path / "allowed"))
+    assert request("GET", f"/reagents?save={nearby}")[0] == 200
+    for refused in [other, sneaky]:
+        status, answer = request("POST", "/reagents", {"save": refused})
+        assert status == 403 and answer["error"] == f"Not allowed to read {refused}!"
+        status, answer = request("POST", "/recipe", query(save=refused, id=5))
+        assert status == 400
+        assert answer == {"id": 5, "error": f"Not allowed to read {refused}!"}
+    status, answer = request("POST", "/reagents", {"save": 3})
+    assert status == 403 and answer["error"] == "The save file has to be a path!"
+    assert request("POST", "/recipe", query(save=nearby))[0] == 200
+
+
+def testServerRefusesWhatIsntASave(tmp_path):
+    notes = tmp_path / "notes.txt"
+    notes.write_bytes(b"Not a save file at all, but long enough to try." * 4)
+    with pytest.raises(ValueError):
+        RecipeServer(("127.0.0.1", 0), save=str(notes))
+
+
+def testBodySizeLimit(startServer, monkeypatch):
+    monkeypatch.setattr(serverModule, "maxBodySize", 100)
+    request = startServer()
+    status, answer = request("POST", "/recipe", {"padding": "x" * 200})
+    assert status == 400 and answer["error"] == "Request body too large!"
+
+
+@pytest.mark.parametrize("length", ["-5", "lots"])
+def testBadContentLength(startServer, length):
+    status, answer = startServer()(
+        "POST", "/recipe", b"{}", headers={"Content-Length": length}
+    )
+    assert status == 400 and answer["error"] == "Invalid Content-Length!"
+
+
+def testUnexpectedErrors(startServer, monkeypatch):
+    def fail(query, inventory=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(serverModule, "answerQuery", fail)
+    status, answer = startServer()("POST", "/recipe", query())
+    assert status == 500
+    assert answer == {"error": "Internal error: RuntimeError('boom')"}
@@ -0,0 +1,105 @@
+import pytest
+
+from conftest import randomInventory
+
+from boxer.gameInfo import Cauldron, PotionType
+from boxer.optimization import PotionOptimizationObjective, getBestPotion
+from boxer.solutionCache import SolutionCache, missing, solutionCache
+from boxer.solveStats import SolveStats
+
+
+@pytest.fixture(autouse=True)
+def emptyCache():
+    solutionCache.clear()
+    yield
+    solutionCache.clear()
+
+
+def testMissThenHit():
+    cache = SolutionCache()
+    assert cache.get("a") is missing
+    cache.put("a", {"ingredients": {"x": 1}})
+    assert cache.get("a") == {"ingredients": {"x": 1}}
+
+
+def testInfeasibleIsCached():
+    cache = SolutionCache()
+    cache.put("a", None)
+    assert cache.get("a") is None
+
+
+def testEntriesAreCopies():
+    cache = SolutionCache()
+    solution = {"ingredients": {"x": 1}}
+    cache.put("a", solution)
+    solution["ingredients"]["x"] = 2
+    cache.get("a")["ingredients"]["x"] = 3
+    assert cache.get("a") == {"ingredients": {"x": 1}}
+
+
+def testLeastRecentlyUsedIsEvicted():
+    cache = SolutionCache(maxSize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is missing
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def testDirectorySurvivesRestarts(tmp_path):
+    SolutionCache(directory=tmp_path).put("a", {"ingredients": {"x": 1}})
+    restarted = SolutionCache(directory=tmp_path)
+    assert restarted.get("a") == {"ingredients": {"x": 1}}
+    assert SolutionCache(directory=tmp_path).get("b") is missing
+
+
+def testEvictedEntriesComeBackFromDirectory(tmp_path):
+    cache = SolutionCache(maxSize=1, directory=tmp_path)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert "a" not in cache.entries
+    assert cache.get("a") == 1
+
+
+def testCorruptFileIsAMiss(tmp_path):
+    (tmp_path / "a.pickle").write_bytes(b"not a pickle")
+    assert SolutionCache(directory=tmp_path).get("a") is missing
+
+
+def solve(solver="cbc", **kwargs):
+    stats = SolveStats()
+    solution = getBestPotion(
+        ingredientInventory=randomInventory(0),
+        cauldron=Cauldron.WOODEN_CAULDRON,
+        potionType=PotionType.HEALTH_POTION,
+        objective=PotionOptimizationObjective.BEST_FOR_GIVEN_TYPE,
+        solver=solver,
+        stats=stats,
+        **kwargs,
+    )
+    return solution, stats
+
+
+def testGetBestPotionHitsTheCache():
+    first, firstStats = solve()
+    second, secondStats = solve()
+    assert not firstStats.cached
+    assert secondStats.cached
+    assert first == second
+
+
+def testCacheIsKeyedOnTheEngine():
+    solve(solver="cbc")
+    solution, stats = solve(solver="search")
+    assert not stats.cached
+    assert stats.solver == "search"
+    solution, stats = solve(solver="cbc", formulation="interval")
+    assert not stats.cached
+
+
+def testUseCacheFalseBypassesTheCache():
+    solve()
+    solution, stats = solve(useCache=False)
+    assert not stats.cached